@@ -0,0 +1,213 @@
+"""
+Bulk Evaluator
+Parallel evaluation of expression files too large to stream line by line.
+
+The input file is memory-mapped and cut into newline-aligned byte ranges;
+finding a cut only looks at the bytes around it, so the parent never reads
+or copies the data. Each worker process maps the same file, decodes and
+evaluates its ranges a block at a time and writes their results to a part
+file. The parent then joins the parts into the output with block copies, so
+the input is read once, sequentially, by the workers, and no per-line file
+I/O happens in the parent.
+
+Two output formats are supported:
+
+    text     expression<TAB>result per non-blank line, as `main.py --eval` prints
+    binary   one 9-byte record per input line (blank lines included, so record i
+             is line i): a little-endian float64 value and a status byte
+             (STATUS_OK, STATUS_ERROR or STATUS_BLANK); the value is NaN unless
+             the status is STATUS_OK
+"""
+
+import mmap
+import os
+import shutil
+import struct
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from calculator_engine import CalculatorEngine
+
+
+# Binary record: float64 value, status byte
+RECORD = struct.Struct('<dB')
+STATUS_OK = 0
+STATUS_ERROR = 1
+STATUS_BLANK = 2
+
+FORMATS = ('text', 'binary')
+
+# Bytes decoded and evaluated at a time within a range
+BLOCK_SIZE = 1 << 22
+# Files smaller than this are evaluated in-process
+PARALLEL_MIN_BYTES = 1 << 20
+# Smallest range handed to a worker, so tiny files aren't split into many parts
+MIN_RANGE_BYTES = 1 << 18
+# Buffer size for joining part files
+COPY_BUFFER_SIZE = 1 << 20
+
+_NAN_RECORDS = {
+    STATUS_ERROR: RECORD.pack(float('nan'), STATUS_ERROR),
+    STATUS_BLANK: RECORD.pack(float('nan'), STATUS_BLANK),
+}
+
+
+def split_ranges(data, parts: int) -> List[Tuple[int, int]]:
+    """
+    Split data (bytes or an mmap) into at most parts (start, end) byte ranges
+    of about equal size, each ending just after a newline or at the end of data.
+    """
+    size = len(data)
+    bounds = [0]
+    for i in range(1, parts):
+        target = max(size * i // parts, bounds[-1])
+        newline = data.find(b'\n', target)
+        if newline < 0 or newline + 1 >= size:
+            break
+        if newline + 1 > bounds[-1]:
+            bounds.append(newline + 1)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def iter_blocks(data, start: int, end: int, block_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """
+    Yield the bytes of data[start:end] in blocks of whole lines, about block_size
+    each; a line longer than block_size is yielded as one block.
+    """
+    position = start
+    while position < end:
+        block_end = min(end, position + block_size)
+        if block_end < end:
+            newline = data.rfind(b'\n', position, block_end)
+            if newline < 0:
+                newline = data.find(b'\n', block_end, end)
+            block_end = end if newline < 0 else newline + 1
+        yield data[position:block_end]
+        position = block_end
+
+
+def _block_lines(block: bytes) -> List[str]:
+    """Decode a block of whole lines, without line endings."""
+    lines = block.decode('utf-8', errors='replace').split('\n')
+    if block.endswith(b'\n'):
+        lines.pop()
+    return [line[:-1] if line.endswith('\r') else line for line in lines]
+
+
+def _binary_record(engine: CalculatorEngine, expression: str) -> bytes:
+    """Evaluate expression into a binary record."""
+    if not expression.strip():
+        return _NAN_RECORDS[STATUS_BLANK]
+    try:
+        return RECORD.pack(float(engine.evaluate_value(expression)), STATUS_OK)
+    except Exception:
+        return _NAN_RECORDS[STATUS_ERROR]
+
+
+def evaluate_range(engine: CalculatorEngine, input_path: str, start: int, end: int,
+                   output_path: str, output_format: str = 'text') -> Dict[str, int]:
+    """
+    Evaluate the lines in bytes [start, end) of input_path and write their
+    results to output_path in output_format.
+    Returns counts of 'expressions' evaluated and 'errors' among them.
+    """
+    expressions = errors = 0
+    with open(input_path, 'rb') as source, open(output_path, 'wb') as out, \
+            mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for block in iter_blocks(data, start, end):
+            lines = _block_lines(block)
+            if output_format == 'binary':
+                records = b''.join([_binary_record(engine, line) for line in lines])
+                statuses = records[RECORD.size - 1::RECORD.size]
+                blanks = statuses.count(STATUS_BLANK)
+                expressions += len(lines) - blanks
+                errors += statuses.count(STATUS_ERROR)
+                out.write(records)
+            else:
+                evaluate = engine.evaluate_expression
+                results = [(line, evaluate(line)) for line in lines if line.strip()]
+                expressions += len(results)
+                errors += sum(1 for _, result in results if result == "?")
+                out.write(''.join([f"{line}\t{result}\n" for line, result in results]).encode('utf-8'))
+    return {'expressions': expressions, 'errors': errors}
+
+
+def evaluate_file(input_path: str, output_path: str, output_format: str = 'text',
+                  workers: Optional[int] = None,
+                  engine: Optional[CalculatorEngine] = None) -> Dict[str, int]:
+    """
+    Evaluate every line of input_path into output_path (see the module
+    docstring for the formats), across worker processes each running an
+    engine configured like engine.
+    Returns counts of 'expressions' evaluated, 'errors' among them and the
+    'ranges' the input was split into.
+    """
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown output format: {output_format!r}")
+    if engine is None:
+        engine = CalculatorEngine()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    
+    size = os.path.getsize(input_path)
+    if size == 0:
+        open(output_path, 'wb').close()
+        return {'expressions': 0, 'errors': 0, 'ranges': 0}
+    
+    if workers <= 1 or size < PARALLEL_MIN_BYTES:
+        counts = evaluate_range(engine, input_path, 0, size, output_path, output_format)
+        counts['ranges'] = 1
+        return counts
+    
+    # A few ranges per worker keeps the pool balanced when lines differ in cost
+    parts = max(1, min(workers * 4, size // MIN_RANGE_BYTES))
+    with open(input_path, 'rb') as source, \
+            mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        ranges = split_ranges(data, parts)
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    directory, name = os.path.split(os.path.abspath(output_path))
+    part_paths = [os.path.join(directory, f".{name}.{os.getpid()}.{i}.part") for i in range(len(ranges))]
+    tasks = [(input_path, start, end, part_path, output_format)
+             for (start, end), part_path in zip(ranges, part_paths)]
+    counts = {'expressions': 0, 'errors': 0, 'ranges': len(ranges)}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(engine._worker_config(),)) as executor:
+            for range_counts in executor.map(_evaluate_task, tasks):
+                counts['expressions'] += range_counts['expressions']
+                counts['errors'] += range_counts['errors']
+        
+        with open(output_path, 'wb') as out:
+            for part_path in part_paths:
+                with open(part_path, 'rb') as part:
+                    shutil.copyfileobj(part, out, COPY_BUFFER_SIZE)
+    finally:
+        for part_path in part_paths:
+            if os.path.exists(part_path):
+                os.unlink(part_path)
+    return counts
+
+
+def read_binary_results(path: str) -> Iterator[Tuple[float, int]]:
+    """Yield (value, status) records from a binary results file."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return RECORD.iter_unpack(data[:len(data) - len(data) % RECORD.size])
+
+
+# Engine instance owned by each bulk worker process
+_worker_engine: Optional[CalculatorEngine] = None
+
+
+def _init_worker(config: Dict[str, Any]) -> None:
+    """Build the per-process engine once when a pool worker starts."""
+    global _worker_engine
+    _worker_engine = CalculatorEngine._from_worker_config(config)
+
+
+def _evaluate_task(task: Tuple[str, int, int, str, str]) -> Dict[str, int]:
+    """Evaluate one (input path, start, end, part path, format) range in a pool worker."""
+    input_path, start, end, part_path, output_format = task
+    return evaluate_range(_worker_engine, input_path, start, end, part_path, output_format)
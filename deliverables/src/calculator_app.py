@@ -5,41 +5,134 @@ Main application window with UI components and event handling.
 
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QGridLayout, QPushButton, QLineEdit, QComboBox,
-                            QLabel, QFrame)
-from PyQt6.QtCore import Qt, QTimer
+                            QLabel, QFrame, QApplication)
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QFont, QKeySequence, QShortcut
 
 from calculator_engine import CalculatorEngine
+from debounce_policy import DebouncePolicy
+from evaluation_worker import AsyncEvaluator
 from history_manager import HistoryManager
+from incremental_evaluator import IncrementalEvaluator
+
+
+# Styles for the whole window: displays by object name, buttons by their buttonType property
+STYLESHEET = """
+    QLineEdit#expressionInput, QLabel#resultDisplay {
+        background-color: black;
+        color: white;
+        border: 1px solid #666;
+        padding: 5px;
+    }
+    QPushButton[buttonType="number"] {
+        background-color: #f0f0f0;
+        color: black;
+        border: 1px solid #ccc;
+        border-radius: 8px;
+    }
+    QPushButton[buttonType="number"]:hover {
+        background-color: #e0e0e0;
+    }
+    QPushButton[buttonType="number"]:pressed {
+        background-color: #d0d0d0;
+    }
+    QPushButton[buttonType="operator"] {
+        background-color: #ff9500;
+        color: black;
+        border: 1px solid #e6860e;
+        border-radius: 8px;
+    }
+    QPushButton[buttonType="operator"]:hover {
+        background-color: #e6860e;
+    }
+    QPushButton[buttonType="operator"]:pressed {
+        background-color: #cc7a0d;
+    }
+    QPushButton[buttonType="function"] {
+        background-color: #a6a6a6;
+        color: black;
+        border: 1px solid #8c8c8c;
+        border-radius: 8px;
+    }
+    QPushButton[buttonType="function"]:hover {
+        background-color: #8c8c8c;
+    }
+    QPushButton[buttonType="function"]:pressed {
+        background-color: #737373;
+    }
+"""
 
 
 class CalculatorApp(QMainWindow):
     """Main calculator application window."""
     
+    # Emitted once, after the window's first paint
+    first_frame = pyqtSignal()
+    
     def __init__(self):
         """Initialize the calculator application."""
         super().__init__()
         
-        # Initialize core components
+        # Initialize core components; history is read after the first frame
         self.engine = CalculatorEngine()
-        self.history = HistoryManager()
+        self.evaluator = IncrementalEvaluator(self.engine)
+        self.history = HistoryManager(load=False)
         
         # UI state
         self.current_expression = ""
         self.cursor_position = 0
+        self._first_frame_shown = False
         
         # Setup UI
+        self.apply_stylesheet()
         self.init_ui()
         self.setup_keyboard_shortcuts()
         
-        # Setup real-time calculation timer
+        # Setup real-time calculation timer; its delay adapts to evaluation cost
+        self.debounce = DebouncePolicy()
         self.calc_timer = QTimer()
         self.calc_timer.setSingleShot(True)
         self.calc_timer.timeout.connect(self.update_result)
         
+        # Evaluation runs on a worker thread; only results for the latest text are shown
+        self.async_evaluator = AsyncEvaluator(self.evaluator, self, policy=self.debounce)
+        self.async_evaluator.result_ready.connect(self.result_field.setText)
+        
         # Initialize display
         self.reset_calculator()
     
+    def apply_stylesheet(self):
+        """
+        Install STYLESHEET on the application, or on this window if the
+        application already has a different stylesheet of its own.
+        """
+        app = QApplication.instance()
+        if not app.styleSheet():
+            app.setStyleSheet(STYLESHEET)
+        elif app.styleSheet() != STYLESHEET:
+            self.setStyleSheet(STYLESHEET)
+    
+    def showEvent(self, event):
+        """Center the window on its screen when first shown."""
+        if not self._first_frame_shown:
+            screen = self.screen().availableGeometry()
+            self.move(screen.x() + (screen.width() - self.width()) // 2,
+                      screen.y() + (screen.height() - self.height()) // 2)
+        super().showEvent(event)
+    
+    def paintEvent(self, event):
+        """Paint the window; after the first frame, schedule the deferred startup work."""
+        super().paintEvent(event)
+        if not self._first_frame_shown:
+            self._first_frame_shown = True
+            self.first_frame.emit()
+            QTimer.singleShot(0, self.finish_startup)
+    
+    def finish_startup(self):
+        """Startup work that doesn't need to hold up the first frame: reading saved history."""
+        if not self.history.loaded:
+            self.history.load_history()
+    
     def init_ui(self):
         """Initialize user interface components."""
         self.setWindowTitle("Professional Calculator")
@@ -48,13 +141,7 @@ class CalculatorApp(QMainWindow):
         # Set window properties for better macOS behavior
         self.setWindowFlags(Qt.WindowType.Window | Qt.WindowType.WindowCloseButtonHint | Qt.WindowType.WindowMinimizeButtonHint)
         
-        # Center window on screen
-        from PyQt6.QtGui import QScreen
-        from PyQt6.QtWidgets import QApplication
-        screen = QScreen.availableGeometry(QApplication.primaryScreen())
-        x = (screen.width() - self.width()) // 2
-        y = (screen.height() - self.height()) // 2
-        self.move(x, y)
+        # Centered on screen in showEvent
         
         # Central widget
         central_widget = QWidget()
@@ -90,14 +177,7 @@ class CalculatorApp(QMainWindow):
         self.input_field.setFont(QFont("Monaco", 14))  # Monospace font
         self.input_field.setMaxLength(60)
         self.input_field.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        self.input_field.setStyleSheet("""
-            QLineEdit {
-                background-color: black;
-                color: white;
-                border: 1px solid #666;
-                padding: 5px;
-            }
-        """)
+        self.input_field.setObjectName('expressionInput')
         self.input_field.textChanged.connect(self.on_input_changed)
         self.input_field.cursorPositionChanged.connect(self.on_cursor_changed)
         
@@ -121,14 +201,7 @@ class CalculatorApp(QMainWindow):
         self.result_field.setFont(QFont("Monaco", 14))
         self.result_field.setAlignment(Qt.AlignmentFlag.AlignLeft)
         self.result_field.setMinimumHeight(30)
-        self.result_field.setStyleSheet("""
-            QLabel { 
-                color: white; 
-                background-color: black;
-                padding: 5px;
-                border: 1px solid #666;
-            }
-        """)
+        self.result_field.setObjectName('resultDisplay')
         
         result_layout.addWidget(self.result_field, 1)
         parent_layout.addWidget(result_frame)
@@ -184,7 +257,8 @@ class CalculatorApp(QMainWindow):
             (')', 6, 3, 1, 1, 'operator'), # Close parenthesis - full width
         ]
         
-        # Create buttons
+        # Create buttons; one font shared by all, styled by type through STYLESHEET
+        button_font = QFont("Arial", 16)
         self.buttons = {}
         for button_info in buttons:
             text, row, col, row_span, col_span, button_type = button_info
@@ -193,57 +267,10 @@ class CalculatorApp(QMainWindow):
             if button_type == 'empty' or text == '':
                 continue
             
-                
             button = QPushButton(text)
             button.setMinimumHeight(60)
-            button.setFont(QFont("Arial", 16))
-            
-            # Style buttons by type (with black text)
-            if button_type == 'number':
-                button.setStyleSheet("""
-                    QPushButton {
-                        background-color: #f0f0f0;
-                        color: black;
-                        border: 1px solid #ccc;
-                        border-radius: 8px;
-                    }
-                    QPushButton:hover {
-                        background-color: #e0e0e0;
-                    }
-                    QPushButton:pressed {
-                        background-color: #d0d0d0;
-                    }
-                """)
-            elif button_type == 'operator':
-                button.setStyleSheet("""
-                    QPushButton {
-                        background-color: #ff9500;
-                        color: black;
-                        border: 1px solid #e6860e;
-                        border-radius: 8px;
-                    }
-                    QPushButton:hover {
-                        background-color: #e6860e;
-                    }
-                    QPushButton:pressed {
-                        background-color: #cc7a0d;
-                    }
-                """)
-            elif button_type == 'function':
-                button.setStyleSheet("""
-                    QPushButton {
-                        background-color: #a6a6a6;
-                        color: black;
-                        border: 1px solid #8c8c8c;
-                        border-radius: 8px;
-                    }
-                    QPushButton:hover {
-                        background-color: #8c8c8c;
-                    }
-                    QPushButton:pressed {
-                        background-color: #737373;
-                    }
-                """)
+            button.setFont(button_font)
+            button.setProperty('buttonType', button_type)
             
             # Connect button click
             button.clicked.connect(lambda checked, t=text: self.on_button_click(t))
@@ -303,8 +330,10 @@ class CalculatorApp(QMainWindow):
     def on_input_changed(self):
         """Handle input field text changes."""
         try:
-            # Trigger calculation with small delay for real-time feedback
-            self.calc_timer.start(100)  # 100ms delay
+            # Results still being computed for the previous text are now stale
+            self.async_evaluator.invalidate()
+            # Trigger calculation, waiting longer while evaluations are expensive
+            self.calc_timer.start(self.debounce.next_delay())
         except Exception as e:
             print(f"Error in input change handler: {e}")
             self.result_field.setText("?")
@@ -314,16 +343,17 @@ class CalculatorApp(QMainWindow):
         self.cursor_position = self.input_field.cursorPosition()
     
     def update_result(self):
-        """Update the result display based on current input."""
+        """Start evaluating the current input; the result display updates when it finishes."""
         try:
             expression = self.input_field.text().strip()
             
             if not expression:
+                self.async_evaluator.invalidate()
                 self.result_field.setText("0")
                 return
             
-            result = self.engine.evaluate_expression(expression)
-            self.result_field.setText(str(result))
+            # Only the text after the edit position is re-parsed
+            self.async_evaluator.submit(self.input_field.text(), self.cursor_position)
         except Exception as e:
             print(f"Error updating result: {e}")
             self.result_field.setText("?")
@@ -337,36 +367,34 @@ class CalculatorApp(QMainWindow):
     def save_current_calculation(self):
         """Save current calculation to history."""
         expression = self.input_field.text().strip()
-        result = self.result_field.text()
+        if not expression:
+            return
+        
+        # The display may still show the previous text's result while the
+        # debounce timer or worker catches up, so evaluate the text being saved
+        self.calc_timer.stop()
+        result = self.async_evaluator.evaluate_now(self.input_field.text(), self.cursor_position)
+        self.result_field.setText(result)
         
-        if expression and result != "0":
+        if result != "0":
             self.history.save_calculation(expression, result)
     
     def show_recall_menu(self):
-        """Show recall menu with saved calculations."""
-        history_items = self.history.get_history_items()
-        
-        if not history_items:
+        """Show recall dialog with saved calculations."""
+        # Include what other calculator windows saved meanwhile
+        self.history.refresh()
+        if not self.history.history_items:
             return
         
-        # Create dropdown menu (simplified - using dialog for now)
-        # In a full implementation, this would be a proper dropdown
-        from PyQt6.QtWidgets import QInputDialog
-        
-        items = [self.history.format_history_display(item) for item in history_items]
-        
-        item, ok = QInputDialog.getItem(
-            self, 'Recall Calculation', 'Select calculation:', items, 0, False
-        )
-        
-        if ok and item:
-            # Find selected history item
-            selected_index = items.index(item)
-            selected_item = history_items[selected_index]
-            
-            # Load expression into input field
-            self.input_field.setText(selected_item['expression'])
-            self.input_field.setFocus()
+        # Imported on first use: defining its list model builds many Qt enum types
+        from recall_dialog import RecallDialog
+        dialog = RecallDialog(self.history, self)
+        if dialog.exec() == RecallDialog.DialogCode.Accepted:
+            selected_item = dialog.selected_item()
+            if selected_item is not None:
+                # Load expression into input field
+                self.input_field.setText(selected_item['expression'])
+        self.input_field.setFocus()
     
     def keyPressEvent(self, event):
         """Handle keyboard input."""
@@ -3,34 +3,108 @@ Calculator Engine
 Core calculation logic and expression parsing with safety and error handling.
 """
 
-import ast
 import operator
+import os
 import re
-from typing import Union, Optional
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from expression_parser import parse_expression, parse_tokens, tokenize
+from optimizer import optimize_program
+from stack_machine import Program, compile_program, compile_tokens
+
+if TYPE_CHECKING:
+    from fractions import Fraction
+    from compiled_plans import PlanCache
+    from engine_metrics import EngineMetrics
 
 
 class CalculatorEngine:
     """Safe calculator engine with expression parsing and evaluation."""
     
-    # Supported operators
+    # Supported operators, by AST operator node class name (ast itself is
+    # imported only by the backends that build trees)
     OPERATORS = {
-        ast.Add: operator.add,
-        ast.Sub: operator.sub,
-        ast.Mult: operator.mul,
-        ast.Div: operator.truediv,
-        ast.USub: operator.neg,
-        ast.UAdd: operator.pos,
+        'Add': operator.add,
+        'Sub': operator.sub,
+        'Mult': operator.mul,
+        'Div': operator.truediv,
+        'USub': operator.neg,
+        'UAdd': operator.pos,
     }
     
-    def __init__(self):
-        """Initialize calculator engine."""
+    # Characters allowed in calculator input
+    ALLOWED_CHARACTERS = frozenset('0123456789+-*/.() ')
+    
+    # Parser backends: 'stack' (single-pass tokenizer compiled to a postfix
+    # program for a non-recursive stack machine), 'ast' (regex preprocessing +
+    # ast.parse) or 'pratt' (single-pass tokenizer + precedence-climbing parser)
+    BACKENDS = ('stack', 'ast', 'pratt')
+    
+    # Arithmetic modes: 'float' (binary floats), 'exact' (rationals) or
+    # 'adaptive' (floats, re-evaluated exactly near a rounding boundary)
+    ARITHMETIC_MODES = ('float', 'exact', 'adaptive')
+    
+    # Relative float error allowed per instruction (a literal's conversion or
+    # an operation) of the unoptimized program when adaptive arithmetic checks
+    # for a nearby rounding boundary: an ulp, twice what one rounding can add,
+    # leaving headroom for error carried through cancelling sums
+    ADAPTIVE_ERROR_PER_INSTRUCTION = 2.0 ** -52
+    
+    # Batches smaller than this are evaluated in-process by evaluate_many
+    PARALLEL_THRESHOLD = 10000
+    
+    # Evaluations of one program shape (its postfix code, whatever the
+    # constants) after which the stack backend runs it as generated code
+    # (see stack_machine.Program.promote)
+    TIER_THRESHOLD = 32
+    
+    # Program shapes whose evaluations are counted, least recently used dropped first
+    SHAPE_TABLE_SIZE = 4096
+    
+    def __init__(self, cache_size: int = 1024, backend: str = 'stack',
+                 arithmetic: str = 'adaptive', optimize: bool = False):
+        """
+        Initialize calculator engine.
+        cache_size bounds the LRU cache of compiled expressions (0 disables it).
+        backend selects how expressions are compiled (see BACKENDS).
+        arithmetic selects how results are computed (see ARITHMETIC_MODES).
+        optimize runs the optimizer pass (see optimizer) over stack-backend
+        programs as they are compiled, so cached and generated code use the
+        optimized form.
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown parser backend: {backend}")
+        if arithmetic not in self.ARITHMETIC_MODES:
+            raise ValueError(f"Unknown arithmetic mode: {arithmetic}")
+        
+        self.backend = backend
+        self.arithmetic = arithmetic
         self.max_decimal_places = 8
         self.min_representable = 1e-8
+        self.tier_threshold = self.TIER_THRESHOLD  # 0 keeps every program interpreted
+        self.optimize = optimize
+        self.nodes_removed = 0  # Instructions removed by the optimizer
+        
+        # LRU cache: normalized expression -> (compiled form, result, settings)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple[Any, str, Tuple]]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+        
+        # Program code -> [evaluations, generated function or None]. Separate
+        # from the result cache: a cached result is returned without running
+        # any code, so only evaluations count towards promotion
+        self._shapes: "OrderedDict[tuple, list]" = OrderedDict()
+        
+        self.metrics: Optional['EngineMetrics'] = None  # Set by enable_metrics()
+        self.plans: Optional['PlanCache'] = None  # Set by load_plans()
     
     def is_valid_input_character(self, char: str) -> bool:
         """Check if character is allowed in calculator input."""
-        allowed_chars = set('0123456789+-*/.() ')
-        return char in allowed_chars
+        return char in self.ALLOWED_CHARACTERS
     
     def validate_expression(self, expression: str) -> bool:
         """
@@ -39,17 +113,16 @@ class CalculatorEngine:
         """
         if not expression or not expression.strip():
             return False
-            
+        
         # Check for allowed characters only
-        for char in expression:
-            if not self.is_valid_input_character(char):
-                return False
+        if not self.ALLOWED_CHARACTERS.issuperset(expression):
+            return False
         
         # Basic structure validation
         clean_expr = expression.strip()
         if not clean_expr:
             return False
-            
+        
         # Check for balanced parentheses
         paren_count = 0
         for char in clean_expr:
@@ -70,43 +143,582 @@ class CalculatorEngine:
         if not expression or not expression.strip():
             return "?"
         
-        # Clean and validate expression
+        # Clean expression; spaces never change the meaning of an expression
         clean_expr = expression.strip()
+        key = clean_expr.replace(' ', '')
+        settings = (self.max_decimal_places, self.min_representable, self.arithmetic)
+        
+        entry = self._cache.get(key)
+        if entry is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            compiled, result, cached_settings = entry
+            if cached_settings == settings:
+                return result
+            # Formatting settings changed since caching - reuse the compiled form
+            self._count_hit(compiled)
+            result = self._evaluate_compiled(compiled)
+            self._cache[key] = (compiled, result, settings)
+            return result
+        
+        self.cache_misses += 1
+        try:
+            compiled = self._compile_expression(clean_expr)
+        except Exception:
+            compiled = None
+        self._count_hit(compiled)
+        result = self._evaluate_compiled(compiled)
+        
+        if self.cache_size > 0:
+            self._cache[key] = (compiled, result, settings)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self.cache_evictions += 1
+        
+        return result
+    
+    def evaluate_value(self, expression: str):
+        """
+        Evaluate expression to its unformatted value: an int or float, or a
+        Fraction where the arithmetic mode computed it exactly. Bypasses the
+        result cache, which holds formatted results.
+        Raises ValueError or SyntaxError for invalid expressions and
+        ArithmeticError (e.g. ZeroDivisionError) for failed evaluations.
+        """
+        compiled = self._compile_expression(expression.strip())
+        self._count_hit(compiled)
+        return self._compute(compiled)[0]
+    
+    def compile_definition(self, expression: str) -> Program:
+        """
+        Compile expression, which may use variable names, into a stack
+        Program whatever the backend (optimized if enabled).
+        Raises ValueError for invalid expressions.
+        """
+        return self._optimize(compile_program(expression, names=True))
+    
+    def evaluate_program(self, program: Program, values: Optional[Mapping[str, Any]] = None,
+                         exact_values: Optional[Mapping[str, Any]] = None) -> Tuple[str, Any]:
+        """
+        Evaluate a program from compile_definition with its variables taken
+        from values, or from exact_values (if given) for exact runs.
+        Returns (formatted result, value); the value is None if evaluation
+        failed (including on an undefined variable).
+        """
+        self._count_hit(program)
+        try:
+            value, exact = self._compute(program, values, exact_values)
+            return (self._format_exact(value) if exact else self._format_result(value)), value
+        except Exception:
+            return "?", None
+    
+    def evaluate_many(self, expressions: Iterable[str], workers: Optional[int] = None,
+                      chunksize: Optional[int] = None) -> List[str]:
+        """
+        Evaluate many expressions, returning results in input order.
+        Small batches (or workers=1) run in-process; larger batches are split into
+        chunks across a process pool with one engine built per worker.
+        """
+        expressions = list(expressions)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        
+        if workers <= 1 or len(expressions) < self.PARALLEL_THRESHOLD:
+            return [self.evaluate_expression(expression) for expression in expressions]
+        
+        from concurrent.futures import ProcessPoolExecutor
+        
+        if chunksize is None:
+            # A few chunks per worker keeps the pool balanced without excess IPC
+            chunksize = max(1, -(-len(expressions) // (workers * 4)))
+        chunks = [expressions[i:i + chunksize] for i in range(0, len(expressions), chunksize)]
+        
+        results: List[str] = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self._worker_config(),)) as executor:
+            for chunk_results in executor.map(_evaluate_chunk, chunks):
+                results.extend(chunk_results)
+        return results
+    
+    def _worker_config(self) -> Dict[str, Any]:
+        """Settings needed to build an equivalent engine in a worker process."""
+        return {
+            'cache_size': self.cache_size,
+            'backend': self.backend,
+            'arithmetic': self.arithmetic,
+            'max_decimal_places': self.max_decimal_places,
+            'min_representable': self.min_representable,
+            'tier_threshold': self.tier_threshold,
+            'optimize': self.optimize,
+            'plan_cache': None if self.plans is None else self.plans.path,
+            'max_plans': None if self.plans is None else self.plans.max_plans,
+        }
+    
+    @classmethod
+    def _from_worker_config(cls, config: Dict[str, Any]) -> 'CalculatorEngine':
+        """Build an engine from _worker_config() settings."""
+        engine = cls(cache_size=config['cache_size'], backend=config['backend'],
+                     arithmetic=config['arithmetic'], optimize=config['optimize'])
+        engine.max_decimal_places = config['max_decimal_places']
+        engine.min_representable = config['min_representable']
+        engine.tier_threshold = config['tier_threshold']
+        if config['plan_cache'] is not None:
+            engine.load_plans(config['plan_cache'], config['max_plans'])
+        return engine
+    
+    def clear_cache(self) -> None:
+        """Clear the compiled-expression cache and shape counts and reset the cache and optimizer counters."""
+        self._cache.clear()
+        self._shapes.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+        self.nodes_removed = 0
+    
+    def cache_info(self) -> Dict[str, int]:
+        """Get compiled-expression cache statistics."""
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'evictions': self.cache_evictions,
+            'size': len(self._cache),
+            'max_size': self.cache_size,
+            'compiled': sum(1 for compiled, _, _ in self._cache.values()
+                            if isinstance(compiled, Program) and compiled.function is not None),
+            'compiled_shapes': sum(1 for _, function in self._shapes.values() if function is not None),
+            'nodes_removed': self.nodes_removed,
+        }
+    
+    def export_plan(self, expression: str) -> bytes:
+        """
+        Validate, preprocess and compile expression and serialize the result
+        as a compiled plan (see compiled_plans), which evaluate_plan() or a
+        plan cache can use in another run or process without parsing.
+        Invalid expressions give a plan that evaluates to "?".
+        Raises ValueError unless the backend is 'stack'.
+        """
+        from compiled_plans import dump_plan
+        
+        if self.backend != 'stack':
+            raise ValueError("Compiled plans need the stack backend")
+        try:
+            program = self._compile_expression(expression.strip())
+        except (ValueError, SyntaxError):
+            program = None
+        return dump_plan(program)
+    
+    def evaluate_plan(self, plan) -> str:
+        """
+        Evaluate a plan from export_plan() and format the result, like
+        evaluate_expression. Raises ValueError for data that isn't a plan of
+        this version.
+        """
+        from compiled_plans import load_plan
+        
+        program = load_plan(plan)
+        self._count_hit(program)
+        return self._evaluate_compiled(program)
+    
+    def load_plans(self, path, max_plans: Optional[int] = None) -> int:
+        """
+        Load the plan cache file at path in one read (it needn't exist yet).
+        From then on the stack backend compiles an expression from its
+        stored plan instead of parsing it, and stores plans for expressions
+        it had to parse; save_plans() writes them back. Once the cache holds
+        max_plans (default compiled_plans.MAX_PLANS), no more are stored.
+        Returns the number of plans loaded.
+        """
+        from compiled_plans import MAX_PLANS, PlanCache
+        
+        self.plans = PlanCache(path, MAX_PLANS if max_plans is None else max_plans)
+        return self.plans.load()
+    
+    def save_plans(self) -> bool:
+        """Write the plan cache back if plans were added. Returns whether it was written."""
+        return self.plans is not None and self.plans.save()
+    
+    def enable_metrics(self, dump_path: Optional[str] = None,
+                       dump_interval: float = 60.0) -> 'EngineMetrics':
+        """
+        Start collecting per-stage timings and error counts (see engine_metrics).
+        If dump_path is given, a JSON snapshot is written there at most every
+        dump_interval seconds. Returns the fresh EngineMetrics.
+        """
+        from engine_metrics import EngineMetrics
+        
+        self.metrics = EngineMetrics(dump_path, dump_interval)
+        # Shadow the hot-path methods with timed versions, so a disabled
+        # engine runs exactly the uninstrumented code
+        self.evaluate_expression = self._evaluate_instrumented
+        self._compile_expression = self._compile_instrumented
+        self._evaluate_compiled = self._evaluate_compiled_instrumented
+        return self.metrics
+    
+    def disable_metrics(self) -> Optional['EngineMetrics']:
+        """Stop collecting metrics, returning what was collected."""
+        for name in ('evaluate_expression', '_compile_expression', '_evaluate_compiled'):
+            self.__dict__.pop(name, None)
+        metrics, self.metrics = self.metrics, None
+        return metrics
+    
+    def metrics_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Get a snapshot of the collected metrics, or None if metrics are disabled."""
+        return self.metrics.snapshot() if self.metrics is not None else None
+    
+    def tier_info(self, expression: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the execution tier and counters of a cached expression; hits
+        counts its evaluations (cache hits that return the stored result
+        run no code and aren't counted).
+        tier is 'interpreted' or 'compiled' for stack-backend programs and
+        'ast' for the other backends. Returns None if the expression is not
+        cached or did not compile.
+        """
+        entry = self._cache.get(expression.strip().replace(' ', ''))
+        if entry is None or entry[0] is None:
+            return None
+        
+        compiled = entry[0]
+        if not isinstance(compiled, Program):
+            return {'tier': 'ast'}
+        return {
+            'tier': compiled.tier,
+            'hits': compiled.hits,
+            'interpreted_runs': compiled.interpreted_runs,
+            'compiled_runs': compiled.compiled_runs,
+            'instructions': len(compiled),
+        }
+    
+    def _compile_expression(self, clean_expr: str):
+        """
+        Validate, preprocess and compile expression into a Program (stack
+        backend) or an AST node (ast and pratt backends).
+        Raises ValueError or SyntaxError for invalid expressions.
+        """
+        if self.backend == 'stack':
+            if self.plans is not None:
+                return self._compile_with_plans(clean_expr)
+            return self._compile_stack(clean_expr)
+        if self.backend == 'pratt':
+            # Tokenizer and parser validate characters and parentheses themselves
+            return parse_expression(clean_expr)
         
         if not self.validate_expression(clean_expr):
+            raise ValueError("Invalid expression")
+        
+        # Replace common issues
+        clean_expr = self._preprocess_expression(clean_expr)
+        # Parse expression into AST
+        import ast
+        return compile(clean_expr, '<expression>', 'eval', ast.PyCF_ONLY_AST).body
+    
+    def _compile_with_plans(self, clean_expr: str) -> Program:
+        """Stack-backend compilation through the plan cache: load a stored plan, or compile and store one."""
+        key, program = self._load_stored_plan(clean_expr)
+        if program is None:
+            program = self._store_plan(key, clean_expr, self._compile_stack)
+        return program
+    
+    def _compile_stack(self, clean_expr: str) -> Program:
+        """Stack-backend compilation without the plan cache."""
+        return self._optimize(compile_program(clean_expr))
+    
+    def _load_stored_plan(self, clean_expr: str) -> Tuple[str, Optional[Program]]:
+        """
+        Look up expression's plan. Returns its key and the stored program, or
+        None if there is none (a damaged or other-version plan is dropped).
+        Raises ValueError if the plan records an invalid expression.
+        """
+        from compiled_plans import load_plan, plan_key
+        
+        key = plan_key(clean_expr, self.optimize and self.arithmetic != 'exact')
+        plan = self.plans.get(key)
+        if plan is None:
+            return key, None
+        try:
+            program = load_plan(plan)
+        except ValueError:
+            self.plans.discard(key)  # Compiled again by the caller
+            return key, None
+        if program is None:
+            raise ValueError("Invalid expression")
+        return key, program
+    
+    def _store_plan(self, key: str, clean_expr: str, compile_new: Callable[[str], Program]) -> Program:
+        """
+        Compile expression with compile_new and store its plan (or that it is
+        invalid) under key, unless the plan cache is full.
+        """
+        from compiled_plans import dump_plan
+        
+        try:
+            program = compile_new(clean_expr)
+        except (ValueError, SyntaxError):
+            if not self.plans.full:
+                self.plans.put(key, dump_plan(None))
+            raise
+        if not self.plans.full:
+            self.plans.put(key, dump_plan(program))
+        return program
+    
+    def _optimize(self, program: Program) -> Program:
+        """Run the optimizer over program if enabled, counting the instructions removed."""
+        # Exact runs use the unoptimized program, so exact mode has nothing to gain
+        if not self.optimize or self.arithmetic == 'exact':
+            return program
+        program, removed = optimize_program(program)
+        self.nodes_removed += removed
+        return program
+    
+    def _evaluate_compiled(self, compiled) -> str:
+        """Evaluate a compiled expression and format the result."""
+        if compiled is None:
             return "?"
         
         try:
-            # Replace common issues
-            clean_expr = self._preprocess_expression(clean_expr)
-            # Parse expression into AST
-            node = ast.parse(clean_expr, mode='eval')
-            
-            # Evaluate the AST safely
-            result = self._evaluate_node(node.body)
+            result, exact = self._compute(compiled)
+            return self._format_exact(result) if exact else self._format_result(result)
+        except (SyntaxError, ValueError, TypeError, ZeroDivisionError, OverflowError):
+            return "?"
+        except Exception:
+            return "?"
+    
+    def _compute(self, compiled, values: Optional[Mapping[str, Any]] = None,
+                 exact_values: Optional[Mapping[str, Any]] = None) -> Tuple[Any, bool]:
+        """
+        Evaluate a compiled expression in the current arithmetic mode, with
+        variables (stack programs only) taken from values, or from
+        exact_values (if given) for exact runs.
+        Returns (value, exact): exact tells whether value is a Fraction to
+        format with _format_exact rather than _format_result.
+        """
+        if exact_values is None:
+            exact_values = values
+        if self.arithmetic == 'exact':
+            return self._run(compiled, True, exact_values), True
+        
+        result = self._run(compiled, False, values)
+        if type(result) is float and self._needs_exact(result, self._instruction_count(compiled)):
+            return self._run(compiled, True, exact_values), True
+        return result, False
+    
+    def _evaluate_instrumented(self, expression: str) -> Union[float, str]:
+        """evaluate_expression, timed as a whole; installed by enable_metrics()."""
+        hits = self.cache_hits
+        start = time.perf_counter()
+        result = type(self).evaluate_expression(self, expression)
+        self.metrics.record_request(time.perf_counter() - start, self.cache_hits != hits)
+        return result
+    
+    def _compile_instrumented(self, clean_expr: str):
+        """_compile_expression with each stage timed and failures counted by type."""
+        metrics = self.metrics
+        try:
+            if self.backend == 'stack' and self.plans is not None:
+                start = time.perf_counter()
+                try:
+                    key, program = self._load_stored_plan(clean_expr)
+                finally:
+                    metrics.record_stage('plan', time.perf_counter() - start)
+                if program is None:
+                    program = self._store_plan(key, clean_expr, self._compile_stages)
+                return program
+            return self._compile_stages(clean_expr)
+        except Exception as e:
+            metrics.record_error(e)
+            raise
+    
+    def _compile_stages(self, clean_expr: str):
+        """The steps of _compile_expression (without the plan cache), each timed as a stage."""
+        metrics = self.metrics
+        clock = time.perf_counter
+        if self.backend == 'ast':
+            start = clock()
+            valid = self.validate_expression(clean_expr)
+            metrics.record_stage('validation', clock() - start)
+            if not valid:
+                raise ValueError("Invalid expression")
             
-            # Handle special cases
-            if isinstance(result, (int, float)):
-                if abs(result) < self.min_representable and result != 0:
-                    return "Too Small"
-                
-                # Format result with max decimal places
-                if isinstance(result, float):
-                    # Remove trailing zeros, limit decimal places
-                    formatted = f"{result:.{self.max_decimal_places}f}".rstrip('0').rstrip('.')
-                    if '.' not in formatted and abs(result) < 1e15:
-                        return str(int(result))
-                    return formatted
-                else:
-                    return str(result)
+            start = clock()
+            clean_expr = self._preprocess_expression(clean_expr)
+            metrics.record_stage('preprocessing', clock() - start)
             
-            return str(result)
+            import ast
+            start = clock()
+            compiled = compile(clean_expr, '<expression>', 'eval', ast.PyCF_ONLY_AST).body
+        else:
+            # The tokenizer validates characters and parentheses as it goes
+            start = clock()
+            tokens = tokenize(clean_expr)
+            metrics.record_stage('preprocessing', clock() - start)
             
-        except (SyntaxError, ValueError, TypeError, ZeroDivisionError, OverflowError):
+            start = clock()
+            compiled = compile_tokens(tokens) if self.backend == 'stack' else parse_tokens(tokens)
+        metrics.record_stage('parse', clock() - start)
+        
+        if self.backend == 'stack' and self.optimize:
+            start = clock()
+            compiled = self._optimize(compiled)
+            metrics.record_stage('optimize', clock() - start)
+        return compiled
+    
+    def _evaluate_compiled_instrumented(self, compiled) -> str:
+        """_evaluate_compiled with evaluation and formatting timed and failures counted by type."""
+        if compiled is None:
             return "?"
-        except Exception:
+        
+        metrics = self.metrics
+        clock = time.perf_counter
+        try:
+            start = clock()
+            result, exact = self._compute(compiled)
+            metrics.record_stage('evaluate', clock() - start)
+            
+            start = clock()
+            formatted = self._format_exact(result) if exact else self._format_result(result)
+            metrics.record_stage('format', clock() - start)
+            return formatted
+        except Exception as e:
+            metrics.record_error(e)
             return "?"
     
+    def _count_hit(self, compiled) -> None:
+        """
+        Count an evaluation of a stack-backend program. Once its shape has been
+        evaluated tier_threshold times, generated code is built for it and
+        shared by every program of that shape, cached or not.
+        """
+        if not isinstance(compiled, Program):
+            return
+        compiled.hits += 1
+        if compiled.function is not None or self.tier_threshold <= 0:
+            return
+        
+        shapes = self._shapes
+        shape = shapes.get(compiled.code)
+        if shape is None:
+            shape = shapes[compiled.code] = [0, None]
+            if len(shapes) > self.SHAPE_TABLE_SIZE:
+                shapes.popitem(last=False)
+        else:
+            shapes.move_to_end(compiled.code)
+        
+        shape[0] += 1
+        if shape[1] is None and shape[0] >= self.tier_threshold and compiled.promote():
+            shape[1] = compiled.function
+        compiled.function = shape[1]
+    
+    def _run(self, compiled, exact: bool = False, values: Optional[Mapping[str, Any]] = None):
+        """Evaluate a compiled expression to a number, with rational arithmetic if exact."""
+        if isinstance(compiled, Program):
+            return compiled.evaluate(exact, values)
+        # Evaluate the AST safely
+        return self._evaluate_exact(compiled) if exact else self._evaluate_node(compiled)
+    
+    def _format_result(self, result) -> str:
+        """Format evaluated value for display."""
+        # Handle special cases
+        if isinstance(result, (int, float)):
+            if abs(result) < self.min_representable and result != 0:
+                return "Too Small"
+            
+            # Format result with max decimal places
+            if isinstance(result, float):
+                # Remove trailing zeros, limit decimal places
+                formatted = f"{result:.{self.max_decimal_places}f}".rstrip('0').rstrip('.')
+                if '.' not in formatted and abs(result) < 1e15:
+                    # From the rounded text: int(result) would truncate 52.99999999999999 to 52
+                    return str(int(formatted))
+                return formatted
+            else:
+                return str(result)
+        
+        return str(result)
+    
+    def _needs_exact(self, value, instructions: int = 1) -> bool:
+        """
+        Check if a float result must be recomputed exactly before formatting.
+        In exact mode every result must be; in adaptive mode, one that lies
+        close enough to a rounding boundary of max_decimal_places (or to zero)
+        for the rounding error of its instructions (see _instruction_count)
+        to change the output.
+        """
+        if self.arithmetic != 'adaptive' or not isinstance(value, float):
+            return self.arithmetic == 'exact'
+        
+        scaled = abs(value) * 10 ** self.max_decimal_places
+        if scaled < 1:
+            # Tiny results are often cancellation error, e.g. 0.1 + 0.2 - 0.3
+            return True
+        return abs(scaled % 1 - 0.5) <= scaled * instructions * self.ADAPTIVE_ERROR_PER_INSTRUCTION
+    
+    @staticmethod
+    def _instruction_count(compiled) -> int:
+        """
+        Number of instructions (literals and operations) of compiled's
+        unoptimized stack program; an AST has one node per instruction.
+        """
+        if isinstance(compiled, Program):
+            return len(compiled.source if compiled.source is not None else compiled)
+        count = 0
+        pending = [compiled]
+        while pending:
+            node = pending.pop()
+            count += 1
+            if hasattr(node, 'operand'):
+                pending.append(node.operand)
+            elif hasattr(node, 'left'):
+                pending.append(node.left)
+                pending.append(node.right)
+        return count
+    
+    def _evaluate_exact(self, node) -> 'Fraction':
+        """
+        Recursively evaluate AST node with rational arithmetic.
+        Float literals are taken at their shortest decimal representation.
+        """
+        import ast  # Already loaded by whichever backend built node
+        # Imported on first use: fractions pulls in decimal and is rarely needed
+        from fractions import Fraction
+        
+        if isinstance(node, ast.Constant):
+            value = node.value
+            return Fraction(repr(value)) if isinstance(value, float) else Fraction(value)
+        elif isinstance(node, ast.UnaryOp):
+            operand = self._evaluate_exact(node.operand)
+            return self.OPERATORS[type(node.op).__name__](operand)
+        elif isinstance(node, ast.BinOp):
+            left = self._evaluate_exact(node.left)
+            right = self._evaluate_exact(node.right)
+            
+            # Handle division by zero
+            if isinstance(node.op, ast.Div) and right == 0:
+                raise ZeroDivisionError("Division by zero")
+            
+            return self.OPERATORS[type(node.op).__name__](left, right)
+        else:
+            raise ValueError(f"Unsupported node type: {type(node)}")
+    
+    def _format_exact(self, result: 'Fraction') -> str:
+        """Format an exact result, rounding half-even to max_decimal_places."""
+        from fractions import Fraction
+        
+        if result != 0 and abs(result) < Fraction(repr(self.min_representable)):
+            return "Too Small"
+        
+        places = self.max_decimal_places
+        scaled = round(result * 10 ** places)
+        if scaled == 0:
+            return "0"
+        
+        sign = '-' if scaled < 0 else ''
+        digits = str(abs(scaled)).rjust(places + 1, '0')
+        if places == 0:
+            return sign + digits
+        
+        fraction = digits[-places:].rstrip('0')
+        return sign + digits[:-places] + ('.' + fraction if fraction else '')
+    
     def _preprocess_expression(self, expression: str) -> str:
         """Preprocess expression to handle common formatting issues."""
         # Remove extra spaces
@@ -132,13 +744,13 @@ class CalculatorEngine:
     
     def _evaluate_node(self, node) -> Union[int, float]:
         """Recursively evaluate AST node."""
+        import ast  # Already loaded by whichever backend built node
+        
         if isinstance(node, ast.Constant):
             return node.value
-        elif isinstance(node, ast.Num):  # For older Python versions
-            return node.n
         elif isinstance(node, ast.UnaryOp):
             operand = self._evaluate_node(node.operand)
-            return self.OPERATORS[type(node.op)](operand)
+            return self.OPERATORS[type(node.op).__name__](operand)
         elif isinstance(node, ast.BinOp):
             left = self._evaluate_node(node.left)
             right = self._evaluate_node(node.right)
@@ -147,7 +759,7 @@ class CalculatorEngine:
             if isinstance(node.op, ast.Div) and right == 0:
                 raise ZeroDivisionError("Division by zero")
             
-            return self.OPERATORS[type(node.op)](left, right)
+            return self.OPERATORS[type(node.op).__name__](left, right)
         else:
             raise ValueError(f"Unsupported node type: {type(node)}")
     
@@ -175,4 +787,19 @@ class CalculatorEngine:
             if not current_number or current_number[-1] in operators:
                 return current_input + '0.'
         
-        return current_input + new_char
\ No newline at end of file
+        return current_input + new_char
+
+
+# Engine instance owned by each evaluate_many worker process
+_worker_engine: Optional[CalculatorEngine] = None
+
+
+def _init_worker(config: Dict[str, Any]) -> None:
+    """Build the per-process engine once when a pool worker starts."""
+    global _worker_engine
+    _worker_engine = CalculatorEngine._from_worker_config(config)
+
+
+def _evaluate_chunk(expressions: List[str]) -> List[str]:
+    """Evaluate one chunk of expressions in a pool worker."""
+    return [_worker_engine.evaluate_expression(expression) for expression in expressions]
\ No newline at end of file
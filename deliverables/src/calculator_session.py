@@ -0,0 +1,300 @@
+"""
+Calculator Session
+Named variables with dependency-tracked recomputation, like cells of a small spreadsheet.
+
+Each definition, e.g. `total = base*(1+rate)`, is compiled once into a stack
+program whose variables are filled in when it runs. The session keeps a
+dependency graph between definitions. Redefining a variable re-runs only
+the definitions downstream of it, in topological order, and stops early
+along any path where a recomputed value came out unchanged. Definitions that
+use an undefined variable evaluate to "?" until it is defined.
+
+Variables hold the engine's float results. When adaptive arithmetic re-runs
+a definition exactly, its variables are given their exact values, computed
+on demand from their own definitions and kept until an input changes, so
+`a = 0.1+0.2` then `a - 0.3` gives 0 just as `0.1+0.2-0.3` does.
+"""
+
+import re
+from collections.abc import Mapping
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set
+
+from calculator_engine import CalculatorEngine
+from stack_machine import Program, exact_value
+
+
+# name = expression; the name follows the tokenizer's variable name rules
+ASSIGNMENT_RE = re.compile(r'\s*([A-Za-z_][A-Za-z_0-9]*)\s*=(.*)', re.DOTALL)
+NAME_RE = re.compile(r'[A-Za-z_][A-Za-z_0-9]*')
+
+
+class Definition:
+    """A named expression and its latest result."""
+    
+    __slots__ = ('name', 'expression', 'program', 'dependencies', 'value', 'result')
+    
+    def __init__(self, name: str, expression: str, program: Program):
+        """Initialize definition, not yet evaluated."""
+        self.name = name
+        self.expression = expression
+        self.program = program
+        self.dependencies: FrozenSet[str] = program.names
+        self.value: Any = None  # None while the result is an error
+        self.result = "?"
+    
+    def __repr__(self) -> str:
+        """Readable representation."""
+        return f"Definition({self.name!r}, {self.expression!r}, result={self.result!r})"
+
+
+class CalculatorSession:
+    """Variables defined by expressions, kept up to date as their inputs change."""
+    
+    def __init__(self, engine: Optional[CalculatorEngine] = None):
+        """
+        Initialize an empty session; engine compiles, evaluates and formats.
+        The default engine runs the optimizer, since definitions are re-run
+        with new variable values while their literal parts stay folded.
+        """
+        self.engine = engine if engine is not None else CalculatorEngine(optimize=True)
+        self.definitions: Dict[str, Definition] = {}
+        self.values: Dict[str, Any] = {}             # Name -> value, None after an error
+        self._dependents: Dict[str, Set[str]] = {}   # Name -> definitions using it
+        self._exact: Dict[str, Any] = {}             # Name -> exact value (None after an error), on demand
+        self._exact_values = _ExactValues(self)
+        self.last_recomputed: List[str] = []         # Definitions evaluated by the last change
+    
+    def execute(self, line: str) -> str:
+        """
+        Run one line of input: `name = expression` defines (or redefines)
+        name, anything else is evaluated with the current variables.
+        Returns the result, or "?" for invalid input.
+        """
+        match = ASSIGNMENT_RE.fullmatch(line)
+        try:
+            if match:
+                name, expression = match.groups()
+                self.define(name, expression)
+                return self.definitions[name].result
+            return self.evaluate(line)
+        except ValueError:
+            return "?"
+    
+    def evaluate(self, expression: str) -> str:
+        """
+        Evaluate expression with the current variables, without defining anything.
+        Raises ValueError if expression is invalid.
+        """
+        program = self.engine.compile_definition(expression)
+        return self.engine.evaluate_program(program, self.values, self._exact_values)[0]
+    
+    def define(self, name: str, expression: str) -> List[str]:
+        """
+        Define name as expression and recompute what depends on it.
+        Returns the names evaluated, in order (name first).
+        Raises ValueError for an invalid name or expression or a circular
+        definition; the session is then unchanged.
+        """
+        if not NAME_RE.fullmatch(name):
+            raise ValueError(f"Invalid variable name: {name!r}")
+        definition = Definition(name, expression.strip(), self.engine.compile_definition(expression))
+        if self._depends_on(definition.dependencies, name):
+            raise ValueError(f"Circular definition of {name}")
+        
+        self._unlink(name)
+        self.definitions[name] = definition
+        for dependency in definition.dependencies:
+            self._dependents.setdefault(dependency, set()).add(name)
+        return self._recompute(name)
+    
+    def remove(self, name: str) -> List[str]:
+        """
+        Remove the definition of name; definitions using it become "?".
+        Returns the names re-evaluated. Raises KeyError if name isn't defined.
+        """
+        if name not in self.definitions:
+            raise KeyError(name)
+        self._unlink(name)
+        del self.definitions[name]
+        return self._recompute(name)
+    
+    def result(self, name: str) -> str:
+        """Get the formatted result of a definition. Raises KeyError if undefined."""
+        return self.definitions[name].result
+    
+    def recalculate(self) -> List[str]:
+        """
+        Re-evaluate every definition in dependency order, e.g. after the
+        engine's formatting or arithmetic settings changed.
+        Returns the names evaluated.
+        """
+        order = self._topological_order(self.definitions)
+        self._exact.clear()
+        for name in order:
+            self._evaluate(self.definitions[name])
+        self.last_recomputed = order
+        return order
+    
+    def _unlink(self, name: str) -> None:
+        """Remove the dependency edges of name's current definition, if any."""
+        old = self.definitions.get(name)
+        if old is None:
+            return
+        for dependency in old.dependencies:
+            users = self._dependents.get(dependency)
+            if users is not None:
+                users.discard(name)
+                if not users:
+                    del self._dependents[dependency]
+    
+    def _depends_on(self, names: FrozenSet[str], target: str) -> bool:
+        """Check if any of names is target or is defined (transitively) in terms of it."""
+        seen: Set[str] = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name == target:
+                return True
+            if name in seen:
+                continue
+            seen.add(name)
+            definition = self.definitions.get(name)
+            if definition is not None:
+                pending.extend(definition.dependencies)
+        return False
+    
+    def _topological_order(self, roots: Iterable[str]) -> List[str]:
+        """
+        Get roots and every definition downstream of them, each after all the
+        definitions it uses (reverse postorder of an iterative depth-first
+        search along dependent edges).
+        """
+        dependents = self._dependents
+        visited: Set[str] = set()
+        postorder: List[str] = []
+        for root in roots:
+            if root in visited:
+                continue
+            visited.add(root)
+            # (name, iterator over its dependents); no recursion however long the chain
+            stack = [(root, iter(dependents.get(root, ())))]
+            while stack:
+                name, users = stack[-1]
+                for user in users:
+                    if user not in visited:
+                        visited.add(user)
+                        stack.append((user, iter(dependents.get(user, ()))))
+                        break
+                else:
+                    stack.pop()
+                    postorder.append(name)
+        postorder.reverse()
+        return [name for name in postorder if name in self.definitions]
+    
+    def _recompute(self, changed: str) -> List[str]:
+        """
+        Re-evaluate changed and the definitions downstream of it. A definition
+        is only re-run if one of its dependencies changed value, or, if it
+        was computed exactly, was re-run at all (its exact value may differ
+        with the same float value).
+        Returns the names evaluated, in order.
+        """
+        changed_names: Set[str] = set()
+        evaluated_names: Set[str] = set()
+        self._exact.pop(changed, None)
+        if changed not in self.definitions:
+            # Removed: its value is gone, so everything using it changes
+            self.values.pop(changed, None)
+            changed_names.add(changed)
+        
+        evaluated: List[str] = []
+        for name in self._topological_order((changed,)):
+            definition = self.definitions[name]
+            self._exact.pop(name, None)
+            if name != changed and changed_names.isdisjoint(definition.dependencies) and (
+                    isinstance(definition.value, (int, float))
+                    or evaluated_names.isdisjoint(definition.dependencies)):
+                continue
+            previous = self.values.get(name)
+            self._evaluate(definition)
+            evaluated.append(name)
+            evaluated_names.add(name)
+            if not _same_value(previous, definition.value):
+                changed_names.add(name)
+        
+        self.last_recomputed = evaluated
+        return evaluated
+    
+    def _evaluate(self, definition: Definition) -> None:
+        """Evaluate a definition with the current variables and store its value."""
+        definition.result, definition.value = self.engine.evaluate_program(
+            definition.program, self.values, self._exact_values)
+        self.values[definition.name] = definition.value
+    
+    def exact_value(self, name: str):
+        """
+        Get the exact (Fraction) value of a variable, or None if it is
+        undefined or its exact evaluation fails. Computed on first use,
+        along with any upstream exact values not yet known.
+        """
+        if name in self._exact:
+            return self._exact[name]
+        definition = self.definitions.get(name)
+        if definition is None:
+            return None
+        
+        # Upstream definitions first (postorder along dependency edges), without recursion
+        order: List[str] = []
+        visited = {name}
+        stack = [(name, iter(definition.dependencies))]
+        while stack:
+            current, dependencies = stack[-1]
+            for dependency in dependencies:
+                if dependency not in visited and dependency not in self._exact and dependency in self.definitions:
+                    visited.add(dependency)
+                    stack.append((dependency, iter(self.definitions[dependency].dependencies)))
+                    break
+            else:
+                stack.pop()
+                order.append(current)
+        
+        for current in order:
+            program = self.definitions[current].program
+            try:
+                self._exact[current] = exact_value(program.evaluate(True, self._exact_values))
+            except (ArithmeticError, NameError):
+                self._exact[current] = None
+        return self._exact[name]
+
+
+class _ExactValues(Mapping):
+    """Read-only view of a session's variables as exact values, for the engine's exact runs."""
+    
+    def __init__(self, session: CalculatorSession):
+        """Initialize view over session."""
+        self._session = session
+    
+    def __getitem__(self, name: str):
+        """Exact value of name; KeyError if it has none."""
+        value = self._session.exact_value(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+    
+    def get(self, name: str, default=None):
+        """Exact value of name, or default."""
+        value = self._session.exact_value(name)
+        return default if value is None else value
+    
+    def __iter__(self) -> Iterator[str]:
+        """Names of the session's definitions."""
+        return iter(self._session.definitions)
+    
+    def __len__(self) -> int:
+        """Number of definitions."""
+        return len(self._session.definitions)
+
+
+def _same_value(old, new) -> bool:
+    """Check if two values are interchangeable; repr keeps 0.0 and -0.0 (and 1 and 1.0) apart."""
+    return type(old) is type(new) and repr(old) == repr(new)
@@ -0,0 +1,270 @@
+"""
+Compiled Plans
+Versioned binary serialization of compiled stack programs, and a bounded file of them keyed by expression.
+
+A plan is what the stack backend makes of an expression once it has been
+validated, tokenized and compiled (and optimized, if enabled): its postfix
+code, constants, variable slots and temporary slot count, plus the
+unoptimized program an optimized one keeps for exact runs. An expression
+found invalid is stored as a plan too, so it isn't parsed again either.
+Loading a plan rebuilds the Program without touching the tokenizer: the
+nested tuples Program holds are decoded by marshal in one C call, then
+checked (opcodes, constant and temporary slot indices, stack depth) so a
+damaged plan is rejected instead of failing when it runs.
+
+Plan layout:
+
+    magic b'CPLN', version (u8), marshal format version (u8)
+    marshal data: None for an invalid expression, otherwise
+        (code, constants, variables, temps, source)
+    code is a tuple of (opcode, index) pairs, constants are ints and floats
+    (None in variable slots), variables are (constant index, name) pairs and
+    source is the same tuple for the unoptimized program, or None
+
+A PlanCache file is a header (magic b'CPLC', version, marshal format version)
+followed by the marshal data of a dict from key (plan_key) to plan bytes. It
+is decoded with one marshal call; plans are decoded only when their
+expression is evaluated. A full cache takes no new plans: batch runs read
+their inputs in the same order each time, which a least-recently-used policy
+would turn into a miss for every expression once there are more than fit. Like .pyc files, plan
+files are trusted local data. Files or plans written by another version are
+ignored, and the expressions in them compiled afresh.
+"""
+
+import functools
+import itertools
+import marshal
+import os
+from typing import Dict, Optional
+
+from stack_machine import DIV, LOAD_CONST, LOAD_TEMP, NEG, POS, STORE_TEMP, Program
+
+
+PLAN_MAGIC = b'CPLN'
+PLAN_VERSION = 2
+
+CACHE_MAGIC = b'CPLC'
+CACHE_VERSION = 2
+
+# Plans a PlanCache holds by default; no more are added once it is full
+MAX_PLANS = 10000
+
+_PLAN_HEADER = PLAN_MAGIC + bytes((PLAN_VERSION, marshal.version))
+_CACHE_HEADER = CACHE_MAGIC + bytes((CACHE_VERSION, marshal.version))
+
+_NUMBER_TYPES = frozenset((int, float))
+
+# Everything marshal.loads raises for data it can't decode
+_DECODE_ERRORS = (ValueError, EOFError, TypeError)
+
+
+def plan_key(expression: str, optimized: bool) -> str:
+    """
+    Key of expression's plan: the expression without spaces (which never
+    change its meaning), marked with whether the program was optimized.
+    """
+    return ('+' if optimized else '-') + expression.replace(' ', '')
+
+
+def dump_plan(program: Optional[Program]) -> bytes:
+    """
+    Serialize program; None stands for an invalid expression.
+    Raises ValueError if a constant isn't an int or float.
+    """
+    if program is None:
+        return _PLAN_HEADER + marshal.dumps(None)
+    source = program.source
+    return _PLAN_HEADER + marshal.dumps(_program_tuple(program, None if source is None else
+                                                       _program_tuple(source, None)))
+
+
+def _program_tuple(program: Program, source: Optional[tuple]) -> tuple:
+    """The plan form of program (see the module docstring)."""
+    for value in program.constants:
+        if value is not None and type(value) not in (int, float):
+            raise ValueError(f"Constant can't be stored in a plan: {value!r}")
+    return program.code, program.constants, program.variables, program.temps, source
+
+
+def load_plan(data) -> Optional[Program]:
+    """
+    Rebuild the program serialized in data (bytes or a memoryview); None for
+    an invalid expression.
+    Raises ValueError if data isn't a plan of this version or is damaged.
+    """
+    if data[:len(_PLAN_HEADER)] != _PLAN_HEADER:
+        raise ValueError("Not a compiled plan of this version")
+    try:
+        plan = marshal.loads(data[len(_PLAN_HEADER):])
+    except _DECODE_ERRORS as e:
+        raise ValueError(f"Corrupt compiled plan: {e}") from None
+    if plan is None:
+        return None
+    
+    try:
+        code, constants, variables, temps, source = plan
+        if source is not None:
+            source_code, source_constants, source_variables, source_temps, nested = source
+            if nested is not None:
+                raise ValueError("nested source program")
+            _check_program(source_code, source_constants, source_variables, source_temps)
+            source = Program(source_code, source_constants, source_variables, source_temps)
+        _check_program(code, constants, variables, temps)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Corrupt compiled plan: {e}") from None
+    return Program(code, constants, variables, temps, source=source)
+
+
+def _check_program(code: tuple, constants: tuple, variables: tuple, temps: int) -> None:
+    """
+    Check decoded program parts describe a program the interpreter and code
+    generator can run: variables in empty constant slots, numeric constants
+    elsewhere, and code that passes _check_code.
+    Raises ValueError (or TypeError for parts of the wrong type).
+    """
+    if type(constants) is not tuple or type(variables) is not tuple:
+        raise TypeError("program parts must be tuples")
+    
+    if not variables and _NUMBER_TYPES.issuperset(map(type, constants)):
+        _check_code(code, len(constants), temps)
+        return
+    
+    slots = set()
+    for index, name in variables:
+        if type(index) is not int or not 0 <= index < len(constants) or constants[index] is not None \
+                or type(name) is not str:
+            raise ValueError(f"bad variable {name!r}")
+        slots.add(index)
+    for index, value in enumerate(constants):
+        if type(value) not in (int, float) and not (value is None and index in slots):
+            raise ValueError(f"bad constant {value!r}")
+    _check_code(code, len(constants), temps)
+
+
+# Programs of one shape share their code, so each shape is checked once
+@functools.lru_cache(maxsize=4096)
+def _check_code(code: tuple, constant_count: int, temps: int) -> None:
+    """
+    Check code only uses known opcodes, constant and temporary slots in
+    range, temporary slots after they are stored, and a stack that never
+    underflows and ends holding one value.
+    Raises ValueError (or TypeError for parts of the wrong type).
+    """
+    if type(code) is not tuple:
+        raise TypeError("code must be a tuple")
+    if type(temps) is not int or temps < 0:
+        raise ValueError(f"bad temporary slot count {temps!r}")
+    
+    stored = set()
+    depth = 0
+    for opcode, index in code:
+        if opcode == LOAD_CONST:
+            if type(index) is not int or not 0 <= index < constant_count:
+                raise ValueError(f"constant index {index!r} out of range")
+            depth += 1
+        elif opcode == LOAD_TEMP:
+            if index not in stored:
+                raise ValueError(f"temporary slot {index!r} loaded before it is stored")
+            depth += 1
+        elif opcode == STORE_TEMP:
+            if type(index) is not int or not 0 <= index < temps or not depth:
+                raise ValueError(f"bad store to temporary slot {index!r}")
+            stored.add(index)
+        elif index is not None or type(opcode) is not int or not NEG <= opcode <= DIV:
+            raise ValueError(f"bad instruction {(opcode, index)!r}")
+        elif opcode <= POS:
+            if not depth:
+                raise ValueError("stack underflow")
+        elif depth < 2:
+            raise ValueError("stack underflow")
+        else:
+            depth -= 1
+    if depth != 1:
+        raise ValueError(f"program leaves {depth} values on the stack")
+
+
+class PlanCache:
+    """
+    Plans by key (see plan_key), kept in one file that is loaded in bulk.
+    Holds at most max_plans; once full, put() adds no more.
+    """
+    
+    def __init__(self, path, max_plans: int = MAX_PLANS):
+        """Initialize empty cache backed by path; call load() to read it."""
+        self.path = path
+        self.max_plans = max_plans
+        self._plans: Dict[str, bytes] = {}
+        self._dirty = False
+    
+    def __len__(self) -> int:
+        """Number of plans."""
+        return len(self._plans)
+    
+    def __contains__(self, key: str) -> bool:
+        """Check if a plan is stored for key."""
+        return key in self._plans
+    
+    @property
+    def full(self) -> bool:
+        """Whether the cache holds max_plans, so put() only replaces stored plans."""
+        return len(self._plans) >= self.max_plans
+    
+    def get(self, key: str) -> Optional[bytes]:
+        """Get the plan stored for key, or None."""
+        return self._plans.get(key)
+    
+    def put(self, key: str, plan: bytes) -> None:
+        """Store plan for key unless the cache is full; written by the next save()."""
+        plans = self._plans
+        if len(plans) < self.max_plans or key in plans:
+            plans[key] = plan
+            self._dirty = True
+    
+    def discard(self, key: str) -> None:
+        """Forget the plan for key, e.g. one that failed to load."""
+        if self._plans.pop(key, None) is not None:
+            self._dirty = True
+    
+    def load(self) -> int:
+        """
+        Read the plans in the file, replacing the cache's contents (the
+        first max_plans of them if there are more). A missing, damaged or
+        other-version file loads nothing. Returns the number of plans.
+        """
+        self._plans = {}
+        self._dirty = False
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        
+        if data[:len(_CACHE_HEADER)] != _CACHE_HEADER:
+            return 0
+        try:
+            plans = marshal.loads(memoryview(data)[len(_CACHE_HEADER):])
+        except _DECODE_ERRORS:
+            return 0
+        if type(plans) is not dict:
+            return 0
+        
+        if len(plans) > self.max_plans:
+            plans = dict(itertools.islice(plans.items(), self.max_plans))
+        self._plans = {key: plan for key, plan in plans.items() if type(key) is str and type(plan) is bytes}
+        return len(self._plans)
+    
+    def save(self) -> bool:
+        """
+        Write all plans to the file if any were added since it was loaded,
+        replacing it atomically so readers never see a partial file.
+        Returns whether the file was written.
+        """
+        if not self._dirty:
+            return False
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(_CACHE_HEADER)
+            f.write(marshal.dumps(self._plans))
+        os.replace(temp_path, self.path)
+        self._dirty = False
+        return True
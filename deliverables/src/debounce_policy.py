@@ -0,0 +1,64 @@
+"""
+Debounce Policy
+Chooses the real-time calculation delay from a moving estimate of evaluation cost.
+
+Cheap expressions are evaluated almost as soon as the text changes. As
+measured evaluation time rises, the delay backs off proportionally so an
+expensive expression is re-run at most every few keystrokes instead of on
+each one.
+"""
+
+from collections import deque
+from typing import Deque, Optional
+
+
+class DebouncePolicy:
+    """Adaptive debounce delay driven by an exponential moving average of evaluation cost."""
+    
+    def __init__(self, min_delay: int = 0, max_delay: int = 500, fast_cost: float = 0.005,
+                 cost_multiplier: float = 2.0, smoothing: float = 0.3, history: int = 64):
+        """
+        Initialize policy. Delays are in milliseconds, costs in seconds.
+        Evaluations estimated to take at most fast_cost get min_delay; slower
+        ones wait cost_multiplier times the estimate, capped at max_delay.
+        smoothing is the weight of each new measurement in the estimate, and
+        the last history chosen delays are kept in delays.
+        """
+        if not 0 < smoothing <= 1:
+            raise ValueError("smoothing must be in (0, 1]")
+        if min_delay < 0 or max_delay < min_delay:
+            raise ValueError("Delays must satisfy 0 <= min_delay <= max_delay")
+        
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.fast_cost = fast_cost
+        self.cost_multiplier = cost_multiplier
+        self.smoothing = smoothing
+        
+        self.estimate: Optional[float] = None  # Seconds; None until the first measurement
+        self.delays: Deque[int] = deque(maxlen=history)
+    
+    def record(self, cost: float) -> None:
+        """Fold one measured evaluation time (seconds) into the estimate."""
+        if self.estimate is None:
+            self.estimate = cost
+        else:
+            self.estimate += self.smoothing * (cost - self.estimate)
+    
+    def delay_for(self, estimate: Optional[float]) -> int:
+        """Get the delay (milliseconds) for an estimated evaluation cost."""
+        if estimate is None or estimate <= self.fast_cost:
+            return self.min_delay
+        delay = round(estimate * self.cost_multiplier * 1000)
+        return max(self.min_delay, min(self.max_delay, delay))
+    
+    def next_delay(self) -> int:
+        """Choose the delay for the next evaluation and record it in delays."""
+        delay = self.delay_for(self.estimate)
+        self.delays.append(delay)
+        return delay
+    
+    def reset(self) -> None:
+        """Forget the cost estimate and chosen delays."""
+        self.estimate = None
+        self.delays.clear()
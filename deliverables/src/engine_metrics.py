@@ -0,0 +1,121 @@
+"""
+Engine Metrics
+Opt-in per-stage timers and outcome counters for CalculatorEngine.
+
+Stages are plan, validation, preprocessing, parse, optimize, evaluate and format.
+The 'ast' backend runs each as a separate step. The 'stack' and 'pratt'
+backends validate while tokenizing, so their tokenizer time is reported as
+preprocessing and they record no validation stage. optimize is only timed
+for the 'stack' backend with the optimizer enabled, and plan (looking up and
+decoding a stored compiled plan) only for the 'stack' backend with a plan
+cache loaded; expressions without a stored plan then go through the other
+stages. Cache hits skip straight to the result and are counted instead of timed.
+
+Enable with CalculatorEngine.enable_metrics(); while disabled the engine runs
+its normal uninstrumented methods, so the only cost is not collecting.
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+
+STAGES = ('plan', 'validation', 'preprocessing', 'parse', 'optimize', 'evaluate', 'format')
+
+
+class EngineMetrics:
+    """Stage timers, request counters and error counts by exception type."""
+    
+    def __init__(self, dump_path: Optional[str] = None, dump_interval: float = 60.0):
+        """
+        Initialize empty metrics.
+        If dump_path is given, a JSON snapshot is written there at most every
+        dump_interval seconds, checked as requests are recorded.
+        """
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self.dump_errors = 0  # Periodic dumps that failed to write
+        self.reset()
+    
+    def reset(self) -> None:
+        """Clear all timers and counters."""
+        # stage -> [count, total seconds, max seconds]
+        self._stages: Dict[str, List[float]] = {stage: [0, 0.0, 0.0] for stage in STAGES}
+        self.errors: Dict[str, int] = {}
+        self.requests = 0
+        self.cache_hits = 0
+        self.total_time = 0.0
+        self.started = time.time()
+        self._next_dump = time.monotonic() + self.dump_interval
+    
+    def record_stage(self, stage: str, seconds: float) -> None:
+        """Add one timed run of stage."""
+        entry = self._stages[stage]
+        entry[0] += 1
+        entry[1] += seconds
+        if seconds > entry[2]:
+            entry[2] = seconds
+    
+    def record_error(self, error: BaseException) -> None:
+        """Count an evaluation that failed with error."""
+        name = type(error).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+    
+    def record_request(self, seconds: float, cache_hit: bool) -> None:
+        """Count one evaluate_expression call and dump a snapshot if one is due."""
+        self.requests += 1
+        self.total_time += seconds
+        if cache_hit:
+            self.cache_hits += 1
+        if self.dump_path is not None and time.monotonic() >= self._next_dump:
+            try:
+                self.dump()
+            except OSError:
+                # Metrics must never make an evaluation fail; retry next interval
+                self.dump_errors += 1
+                self._next_dump = time.monotonic() + self.dump_interval
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Get a JSON-serializable copy of all timers and counters (times in microseconds)."""
+        stages = {}
+        for stage, (count, total, longest) in self._stages.items():
+            stages[stage] = {
+                'count': count,
+                'total_us': total * 1e6,
+                'mean_us': total * 1e6 / count if count else 0.0,
+                'max_us': longest * 1e6,
+            }
+        return {
+            'requests': self.requests,
+            'cache_hits': self.cache_hits,
+            'errors': dict(self.errors),
+            'total_us': self.total_time * 1e6,
+            'stages': stages,
+            'since': self.started,
+        }
+    
+    def dump(self, path: Optional[str] = None) -> None:
+        """
+        Write a snapshot as JSON to path (default dump_path), replacing it atomically.
+        Raises OSError if it can't be written.
+        """
+        # Imported on first dump: tempfile is slow to import and rarely needed
+        import tempfile
+        
+        path = os.path.abspath(path or self.dump_path)
+        # A unique temporary name in the target directory, so engines dumping
+        # to the same path never write over each other's partial file
+        fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.",
+                                         suffix='.tmp', dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, indent=2)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+        self._next_dump = time.monotonic() + self.dump_interval
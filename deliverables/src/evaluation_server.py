@@ -0,0 +1,357 @@
+"""
+Evaluation Server
+asyncio service that evaluates expressions sent as line-delimited JSON over TCP or a Unix socket.
+
+Each request is one line holding a JSON object {"expression": "2+3", "id": 7};
+each response is one line {"id": 7, "result": "5"}, or {"id": 7, "error": "..."}
+for a malformed request. The id is optional and echoed back when given.
+Clients may pipeline: any number of requests can be sent without waiting, and
+responses come back on the same connection in request order.
+
+All complete request lines in one read from a connection are queued together,
+and requests from all connections share one queue. A single batcher task takes
+everything waiting in the queue (up to max_batch_size requests) and evaluates
+it as one batch, so under load each batch grows with the backlog while an idle
+server answers a lone request immediately. Backpressure is applied at three
+points: the shared queue is bounded, a connection with max_pipeline unanswered
+requests is not read from until responses have been written, and responses
+wait for the socket to drain before more are written.
+"""
+
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from calculator_engine import CalculatorEngine
+
+
+DEFAULT_ADDRESS = '127.0.0.1:8765'
+
+# Longest accepted request line; deeply nested expressions can be long
+MAX_LINE_LENGTH = 1 << 20
+
+# Bytes read from a connection at a time; all complete lines in a read are queued together
+READ_SIZE = 1 << 16
+
+# Marks the end of a connection's response stream
+_CLOSE = object()
+
+# Non-ASCII characters are escaped, so any string json.loads accepts (lone
+# surrogates included) can be written back
+_encode_string = json.JSONEncoder().encode
+
+
+def parse_address(address: str) -> Tuple[Optional[str], Optional[int], Optional[str]]:
+    """
+    Split a listen address into (host, port, path).
+    Addresses containing '/' (or starting with 'unix:') are Unix socket paths;
+    otherwise the address is host:port, :port or a bare port number.
+    """
+    if address.startswith('unix:'):
+        return None, None, address[len('unix:'):]
+    if '/' in address:
+        return None, None, address
+    
+    host, _, port = address.rpartition(':')
+    if not port.isdigit():
+        raise ValueError(f"Invalid listen address: {address}")
+    return host or '127.0.0.1', int(port), None
+
+
+def encode_response(request_id: Any, key: str, value: str) -> bytes:
+    """Encode one response line, the same as json.dumps of {'id': ..., key: value}."""
+    # Built by hand: json.dumps of a whole dict costs more than the evaluation
+    body = f'"{key}": {_encode_string(value)}}}\n'
+    if request_id is None:
+        return ('{' + body).encode('utf-8')
+    encoded_id = str(request_id) if type(request_id) is int else json.dumps(request_id)
+    return f'{{"id": {encoded_id}, {body}'.encode('utf-8')
+
+
+def decode_request(line: bytes) -> Tuple[Any, Optional[str], Optional[str]]:
+    """
+    Decode one request line into (id, expression, error).
+    Exactly one of expression and error is None; the id is None when absent
+    or unreadable.
+    """
+    try:
+        request = json.loads(line)
+    except (ValueError, RecursionError):
+        # RecursionError: nesting too deep for the decoder, e.g. '[' * 100000
+        return None, None, "Invalid JSON"
+    if not isinstance(request, dict):
+        return None, None, "Request must be a JSON object"
+    
+    expression = request.get('expression')
+    if not isinstance(expression, str):
+        return request.get('id'), None, "Request needs a string 'expression'"
+    return request.get('id'), expression, None
+
+
+class EvaluationServer:
+    """Line-delimited JSON evaluation service with micro-batching."""
+    
+    def __init__(self, engine: Optional[CalculatorEngine] = None, max_batch_size: int = 1024,
+                 max_batch_delay: float = 0.0, max_pending: int = 1024, max_pipeline: int = 4096):
+        """
+        Initialize server.
+        max_batch_size bounds how many requests are evaluated together.
+        max_batch_delay is how long (seconds) a batch smaller than
+        max_batch_size waits for more requests; 0 batches only what is
+        already queued, which keeps latency lowest.
+        max_pending bounds the reads waiting in the shared queue and
+        max_pipeline the unanswered requests of one connection.
+        """
+        self.engine = engine if engine is not None else CalculatorEngine()
+        self.max_batch_size = max_batch_size
+        self.max_batch_delay = max_batch_delay
+        self.max_pending = max_pending
+        self.max_pipeline = max_pipeline
+        
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers: Dict[asyncio.Task, asyncio.StreamWriter] = {}  # Open connections
+        
+        self.requests = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.connections = 0
+    
+    async def start(self, address: str = DEFAULT_ADDRESS) -> None:
+        """Start listening on address (see parse_address) and start the batcher."""
+        host, port, path = parse_address(address)
+        self._queue = asyncio.Queue(self.max_pending)
+        self._batcher = asyncio.create_task(self._batch_loop())
+        
+        if path is not None:
+            if os.path.exists(path):
+                os.unlink(path)  # Stale socket from an earlier run
+            self._server = await asyncio.start_unix_server(self._handle_connection, path)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port)
+    
+    @property
+    def address(self) -> str:
+        """Address actually listened on, e.g. with the port chosen for port 0."""
+        name = self._server.sockets[0].getsockname()
+        if isinstance(name, str):
+            return name
+        return f"{name[0]}:{name[1]}"
+    
+    async def serve_forever(self) -> None:
+        """Serve until cancelled."""
+        await self._server.serve_forever()
+    
+    async def close(self) -> None:
+        """Stop accepting connections, drop open ones and stop the batcher."""
+        if self._server is not None:
+            self._server.close()
+        # Aborting ends each handler the same way a client disconnect does,
+        # including those waiting on a client that stopped reading
+        for writer in self._handlers.values():
+            writer.transport.abort()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+        if self._server is not None:
+            await self._server.wait_closed()
+    
+    def stats(self) -> Dict[str, int]:
+        """Get request and batching counters."""
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'largest_batch': self.largest_batch,
+            'connections': self.connections,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+        }
+    
+    def evaluate_batch(self, expressions: List[str]) -> List[str]:
+        """Evaluate one batch of expressions, returning results in order."""
+        evaluate = self.engine.evaluate_expression
+        return [evaluate(expression) for expression in expressions]
+    
+    async def _batch_loop(self) -> None:
+        """Take queued reads in batches, evaluate them together and resolve their futures."""
+        queue = self._queue
+        
+        while True:
+            batch = [await queue.get()]
+            size = self._drain_queue(batch, len(batch[0][0]))
+            if size < self.max_batch_size and self.max_batch_delay > 0:
+                await asyncio.sleep(self.max_batch_delay)
+                size = self._drain_queue(batch, size)
+            
+            try:
+                results = self.evaluate_batch([expression for expressions, _ in batch
+                                               for expression in expressions])
+            except Exception as e:
+                # Fail this batch's requests rather than the batcher, which every connection needs
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                start = 0
+                for expressions, future in batch:
+                    end = start + len(expressions)
+                    if not future.done():
+                        future.set_result(results[start:end])
+                    start = end
+            
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, size)
+            # queue.get() doesn't suspend while reads are waiting; let readers and writers run
+            await asyncio.sleep(0)
+    
+    def _drain_queue(self, batch: list, size: int) -> int:
+        """Move already queued reads into batch until it holds max_batch_size requests."""
+        queue = self._queue
+        while size < self.max_batch_size and not queue.empty():
+            item = queue.get_nowait()
+            batch.append(item)
+            size += len(item[0])
+        return size
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter) -> None:
+        """Read pipelined requests from one connection and queue them for evaluation."""
+        self.connections += 1
+        loop = asyncio.get_running_loop()
+        handler = asyncio.current_task()
+        self._handlers[handler] = writer
+        window = _Window(self.max_pipeline)
+        # One entry per read, in order: (entries, future of the read's results)
+        pending: asyncio.Queue = asyncio.Queue()
+        responder = asyncio.create_task(self._write_responses(pending, writer, window))
+        buffer = b''
+        
+        try:
+            while True:
+                # Too many unanswered requests: stop reading and let TCP push back on the client
+                await window.wait_for_room()
+                data = await reader.read(READ_SIZE)
+                if data:
+                    buffer += data
+                    end = buffer.rfind(b'\n')
+                    if end < 0:
+                        if len(buffer) > MAX_LINE_LENGTH:
+                            # The rest of the stream can't be framed
+                            window.count += 1
+                            pending.put_nowait(([encode_response(None, 'error', "Request too long")], None))
+                            break
+                        continue
+                    lines = buffer[:end].split(b'\n')
+                    buffer = buffer[end + 1:]
+                else:
+                    # A last request may lack its newline
+                    lines = [buffer]
+                
+                # Entries are request ids awaiting a result, or encoded error responses
+                entries: list = []
+                expressions: List[str] = []
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    request_id, expression, error = decode_request(line)
+                    if error is not None:
+                        entries.append(encode_response(request_id, 'error', error))
+                    else:
+                        entries.append(request_id)
+                        expressions.append(expression)
+                
+                if entries:
+                    window.count += len(entries)
+                    future = None
+                    if expressions:
+                        self.requests += len(expressions)
+                        future = loop.create_future()
+                        await self._queue.put((expressions, future))
+                    pending.put_nowait((entries, future))
+                if not data:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            pending.put_nowait(_CLOSE)
+            await responder
+            writer.close()
+            del self._handlers[handler]
+    
+    async def _write_responses(self, pending: asyncio.Queue, writer: asyncio.StreamWriter,
+                               window: '_Window') -> None:
+        """Write each read's responses in request order once its results are ready."""
+        failed = False  # Client went away; keep consuming so the reader never waits for room
+        
+        while True:
+            item = await pending.get()
+            if item is _CLOSE:
+                break
+            entries, future = item
+            try:
+                results = iter(await future) if future is not None else iter(())
+            except Exception:
+                results = None  # Evaluating the batch failed
+            
+            if not failed:
+                chunks = [entry if isinstance(entry, bytes) else
+                          encode_response(entry, 'error', "Evaluation failed") if results is None else
+                          encode_response(entry, 'result', next(results))
+                          for entry in entries]
+                try:
+                    writer.write(b''.join(chunks))
+                    await writer.drain()
+                except ConnectionError:
+                    failed = True
+            window.release(len(entries))
+
+
+class _Window:
+    """A connection's count of unanswered requests, with a wait for room below a limit."""
+    
+    __slots__ = ('limit', 'count', '_room')
+    
+    def __init__(self, limit: int):
+        """Initialize an empty window."""
+        self.limit = limit
+        self.count = 0
+        self._room = asyncio.Event()
+    
+    async def wait_for_room(self) -> None:
+        """Wait until fewer than limit requests are unanswered."""
+        while self.count >= self.limit:
+            self._room.clear()
+            await self._room.wait()
+    
+    def release(self, answered: int) -> None:
+        """Record that answered requests have been written."""
+        self.count -= answered
+        self._room.set()
+
+
+async def serve(address: str = DEFAULT_ADDRESS, server: Optional[EvaluationServer] = None) -> None:
+    """Run an evaluation server on address until cancelled."""
+    if server is None:
+        server = EvaluationServer()
+    await server.start(address)
+    print(f"Serving on {server.address}", file=sys.stderr)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def run_server(address: str = DEFAULT_ADDRESS) -> int:
+    """Run an evaluation server until interrupted."""
+    try:
+        asyncio.run(serve(address))
+    except KeyboardInterrupt:
+        pass
+    return 0
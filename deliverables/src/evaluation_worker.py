@@ -0,0 +1,140 @@
+"""
+Evaluation Worker
+Runs expression evaluation on a worker thread so slow expressions never block the GUI.
+
+Every submission and every invalidation advances a generation counter. Results
+carry the generation they were computed for and are dropped on arrival unless
+it is still current, so the display only ever shows the result for the latest
+text. A single worker thread evaluates at a time, which keeps the incremental
+evaluator's state confined to one thread; a submission that has not started
+when a newer one arrives is taken back out of the queue instead of being run.
+"""
+
+import time
+from typing import Dict, Optional
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+# Single-thread pool shared by all AsyncEvaluators, created on first use.
+# It lives as long as the process: destroying a pool waits for its thread, which
+# deadlocks if the thread is still emitting a result while the GIL is held.
+_pool: Optional[QThreadPool] = None
+
+
+def evaluation_pool() -> QThreadPool:
+    """Get the shared single-thread evaluation pool."""
+    global _pool
+    if _pool is None:
+        _pool = QThreadPool()
+        _pool.setMaxThreadCount(1)
+    return _pool
+
+
+class _TaskSignals(QObject):
+    """Signals emitted by evaluation tasks (QRunnable can't define signals)."""
+    
+    finished = pyqtSignal(int, str, float)  # generation, result, seconds taken
+
+
+class EvaluationTask(QRunnable):
+    """Evaluates one version of the input text on a pool thread."""
+    
+    def __init__(self, evaluator, text: str, cursor: Optional[int], generation: int,
+                 signals: _TaskSignals):
+        """Initialize task for text as it was at generation."""
+        super().__init__()
+        # Kept alive by AsyncEvaluator until finished, so tryTake never sees a deleted task
+        self.setAutoDelete(False)
+        self.evaluator = evaluator
+        self.text = text
+        self.cursor = cursor
+        self.generation = generation
+        self.signals = signals
+    
+    def run(self):
+        """Evaluate and report the result with its generation and cost."""
+        start = time.perf_counter()
+        try:
+            result = str(self.evaluator.evaluate(self.text, self.cursor))
+        except Exception as e:
+            print(f"Error evaluating expression: {e}")
+            result = "?"
+        self.signals.finished.emit(self.generation, result, time.perf_counter() - start)
+
+
+class AsyncEvaluator(QObject):
+    """
+    Evaluates input text off the GUI thread and emits result_ready only for the latest text.
+    evaluator is any object with evaluate(text, cursor), e.g. IncrementalEvaluator.
+    """
+    
+    result_ready = pyqtSignal(str)
+    
+    def __init__(self, evaluator, parent: Optional[QObject] = None, policy=None):
+        """
+        Initialize evaluator; evaluations run on the shared evaluation_pool().
+        If a DebouncePolicy is given, every evaluation's cost is recorded in it.
+        """
+        super().__init__(parent)
+        self.evaluator = evaluator
+        self.policy = policy
+        self.generation = 0
+        self.dropped = 0   # Results discarded because newer input arrived
+        self.skipped = 0   # Submissions superseded before they started
+        
+        self._pool = evaluation_pool()
+        self._signals = _TaskSignals()
+        self._signals.finished.connect(self._on_finished)
+        self._tasks: Dict[int, EvaluationTask] = {}  # Unfinished tasks by generation
+    
+    def invalidate(self) -> None:
+        """Mark every submitted evaluation as stale, e.g. because the text changed."""
+        self.generation += 1
+    
+    def submit(self, text: str, cursor: Optional[int] = None) -> int:
+        """Queue evaluation of text, superseding earlier submissions. Returns its generation."""
+        self.generation += 1
+        self._take_queued()
+        
+        task = EvaluationTask(self.evaluator, text, cursor, self.generation, self._signals)
+        self._tasks[self.generation] = task
+        self._pool.start(task)
+        return self.generation
+    
+    def evaluate_now(self, text: str, cursor: Optional[int] = None) -> str:
+        """
+        Evaluate text on the calling thread and return the result, superseding
+        earlier submissions. Waits for a running evaluation to finish first,
+        so the evaluator is still only used by one thread at a time.
+        """
+        self.generation += 1
+        self._take_queued()
+        self._pool.waitForDone()
+        try:
+            return str(self.evaluator.evaluate(text, cursor))
+        except Exception as e:
+            print(f"Error evaluating expression: {e}")
+            return "?"
+    
+    def wait(self, msecs: int = -1) -> bool:
+        """Block until queued evaluations on the shared pool finish; returns False on timeout."""
+        return self._pool.waitForDone(msecs)
+    
+    def _take_queued(self) -> None:
+        """Take submissions that haven't started back out of the pool."""
+        for generation, task in list(self._tasks.items()):
+            if self._pool.tryTake(task):
+                del self._tasks[generation]
+                self.skipped += 1
+    
+    def _on_finished(self, generation: int, result: str, cost: float) -> None:
+        """Deliver a result on the GUI thread if its input is still current."""
+        self._tasks.pop(generation, None)
+        # Stale results still measure how expensive the input is
+        if self.policy is not None:
+            self.policy.record(cost)
+        if generation != self.generation:
+            self.dropped += 1
+            return
+        self.result_ready.emit(result)
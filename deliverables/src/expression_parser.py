@@ -0,0 +1,173 @@
+"""
+Expression Parser
+Single-pass tokenizer and precedence-climbing (Pratt) parser for calculator expressions.
+
+Produces the same AST nodes as ast.parse on the preprocessed expression, so the
+engine's evaluator can be shared between parser backends.
+"""
+
+import functools
+import re
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    import ast
+
+
+# One token per number run (digits and dots) or single character, spaces removed first
+_TOKEN_RE = re.compile(r'[0-9.]+|.')
+# The same, plus one token per variable name
+_NAMED_TOKEN_RE = re.compile(r'[0-9.]+|[A-Za-z_][A-Za-z_0-9]*|.')
+_DOTS_RE = re.compile(r'\.{2,}')
+
+DIGITS = frozenset('0123456789')
+NUMBER_START = frozenset('0123456789.')
+NAME_START = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_')
+# Last characters of an operand that a '(' multiplies implicitly
+OPERAND_END = DIGITS | NAME_START
+# Operators that may not repeat (a run of up to two '-' is allowed)
+NON_REPEATING = frozenset('+*/')
+
+# Binary operator precedence (higher binds tighter)
+BINARY_PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2}
+
+
+@functools.lru_cache(maxsize=None)
+def _ast_nodes():
+    """
+    The ast module and the binary and unary operator nodes shared by every
+    parsed tree. Imported on the first parse: the tokenizer doesn't need it.
+    """
+    import ast
+    binary = {'+': ast.Add(), '-': ast.Sub(), '*': ast.Mult(), '/': ast.Div()}
+    unary = {'+': ast.UAdd(), '-': ast.USub()}
+    return ast, binary, unary
+
+
+def tokenize(expression: str, names: bool = False) -> List[str]:
+    """
+    Split expression into tokens in a single pass.
+    Applies the engine's preprocessing rules: spaces are ignored, repeated
+    operators are rejected, runs of dots collapse to one, and implicit
+    multiplication is inserted for 2(3), (2)3 and (2)(3).
+    With names, variable names (letters, digits and underscores, not
+    starting with a digit) are tokens too, multiplied implicitly like
+    numbers in 2x, (2)x and x(2).
+    Raises ValueError for invalid characters or operator sequences.
+    """
+    tokens: List[str] = []
+    append = tokens.append
+    prev = ''   # Previous source token
+    prev2 = ''  # Token before that
+    
+    for token in (_NAMED_TOKEN_RE if names else _TOKEN_RE).findall(expression.replace(' ', '')):
+        char = token[0]
+        if char in NUMBER_START:
+            token = collapse_dots(token)
+            if prev == ')' and char != '.':
+                append('*')
+        elif char == '(':
+            if prev and (prev == ')' or prev[-1] in OPERAND_END):
+                append('*')
+        elif char == '-':
+            if prev == '-' and prev2 == '-':
+                raise ValueError("Invalid operator sequence")
+        elif char in NON_REPEATING:
+            if prev in NON_REPEATING:
+                raise ValueError("Invalid operator sequence")
+        elif names and char in NAME_START:
+            if prev and (prev == ')' or prev[0] in NUMBER_START):
+                append('*')
+        elif char != ')':
+            raise ValueError(f"Invalid character: {char!r}")
+        
+        append(token)
+        prev2 = prev
+        prev = token
+    
+    return tokens
+
+
+def collapse_dots(text: str) -> str:
+    """Collapse runs of decimal points in a number token to a single dot."""
+    if '..' in text:
+        return _DOTS_RE.sub('.', text)
+    return text
+
+
+def parse_number(text: str):
+    """Convert a number token to int or float using Python literal rules."""
+    if '.' in text:
+        if text == '.' or text.count('.') > 1:
+            raise ValueError(f"Invalid number: {text}")
+        return float(text)
+    
+    # Python rejects leading zeros in non-zero integer literals (e.g. 007)
+    if len(text) > 1 and text[0] == '0' and text.strip('0'):
+        raise ValueError(f"Invalid number: {text}")
+    return int(text)
+
+
+class _PrattParser:
+    """Precedence-climbing parser over a token list."""
+    
+    def __init__(self, tokens: List[str]):
+        """Initialize parser state."""
+        self.tokens = tokens
+        self.pos = 0
+        self.ast, self.binary_nodes, self.unary_nodes = _ast_nodes()
+    
+    def parse(self) -> 'ast.expr':
+        """Parse a complete expression."""
+        node = self.expression(0)
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Unexpected token: {self.tokens[self.pos]!r}")
+        return node
+    
+    def expression(self, min_precedence: int) -> 'ast.expr':
+        """Parse operators binding tighter than min_precedence (left associative)."""
+        left = self.prefix()
+        tokens = self.tokens
+        
+        while self.pos < len(tokens):
+            op = tokens[self.pos]
+            precedence = BINARY_PRECEDENCE.get(op)
+            if precedence is None or precedence <= min_precedence:
+                break
+            self.pos += 1
+            right = self.expression(precedence)
+            left = self.ast.BinOp(left, self.binary_nodes[op], right)
+        
+        return left
+    
+    def prefix(self) -> 'ast.expr':
+        """Parse a number, parenthesized group or unary operator."""
+        if self.pos >= len(self.tokens):
+            raise ValueError("Unexpected end of expression")
+        
+        token = self.tokens[self.pos]
+        self.pos += 1
+        
+        if token[0] in NUMBER_START:
+            return self.ast.Constant(parse_number(token))
+        if token in self.unary_nodes:
+            # Unary operators bind tighter than any binary operator
+            return self.ast.UnaryOp(self.unary_nodes[token], self.prefix())
+        if token == '(':
+            node = self.expression(0)
+            if self.pos >= len(self.tokens) or self.tokens[self.pos] != ')':
+                raise ValueError("Unbalanced parentheses")
+            self.pos += 1
+            return node
+        
+        raise ValueError(f"Unexpected token: {token!r}")
+
+
+def parse_tokens(tokens: List[str]) -> 'ast.expr':
+    """Parse a token list into an AST expression node."""
+    return _PrattParser(tokens).parse()
+
+
+def parse_expression(expression: str) -> 'ast.expr':
+    """Tokenize and parse expression into an AST expression node."""
+    return _PrattParser(tokenize(expression)).parse()
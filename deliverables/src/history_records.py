@@ -0,0 +1,99 @@
+"""
+History Records
+Compact history items and read-only views over them.
+
+A HistoryRecord holds an expression and its result in two slots instead of a
+per-item dict, and interns both strings so repeated calculations (and the
+many identical results such as "?") share one string object. Records support
+item access by key, so code written for the {'expression': ..., 'result': ...}
+dicts keeps working; as_dict() converts for callers that need a real dict.
+"""
+
+import sys
+from typing import Dict, Iterator, Sequence, Union
+
+from history_index import HistorySearchIndex
+
+
+class HistoryRecord:
+    """One saved calculation."""
+    
+    __slots__ = ('expression', 'result')
+    
+    KEYS = ('expression', 'result')
+    
+    def __init__(self, expression: str, result: str):
+        """Initialize record, interning its strings."""
+        self.expression = sys.intern(expression)
+        self.result = sys.intern(result)
+    
+    @classmethod
+    def from_dict(cls, item: Dict[str, str]) -> 'HistoryRecord':
+        """Build a record from a history item dict."""
+        return cls(item['expression'], item['result'])
+    
+    def as_dict(self) -> Dict[str, str]:
+        """Get the record as a history item dict."""
+        return {'expression': self.expression, 'result': self.result}
+    
+    def __getitem__(self, key: str) -> str:
+        """Get a field by dict key, for code written against history item dicts."""
+        if key == 'expression':
+            return self.expression
+        if key == 'result':
+            return self.result
+        raise KeyError(key)
+    
+    def keys(self):
+        """Field names, as for a history item dict."""
+        return self.KEYS
+    
+    def __eq__(self, other) -> bool:
+        """Records are equal to records or dicts with the same fields."""
+        if isinstance(other, HistoryRecord):
+            return self.expression == other.expression and self.result == other.result
+        if isinstance(other, dict):
+            return other == self.as_dict()
+        return NotImplemented
+    
+    __hash__ = None  # Equal to dicts, which aren't hashable
+    
+    def __repr__(self) -> str:
+        """Readable representation."""
+        return f"HistoryRecord({self.expression!r}, {self.result!r})"
+
+
+class HistoryView(Sequence):
+    """
+    Live read-only sequence of a history's records, most recent first.
+    Indexing reads straight from the history's storage without copying it.
+    """
+    
+    __slots__ = ('_index',)
+    
+    def __init__(self, index: HistorySearchIndex):
+        """Initialize view over the records held by index."""
+        self._index = index
+    
+    def __len__(self) -> int:
+        """Number of records."""
+        return len(self._index)
+    
+    def __getitem__(self, position: Union[int, slice]):
+        """Get the record at position (0 is the most recent), or a list for a slice."""
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        count = len(self._index)
+        if position < 0:
+            position += count
+        if not 0 <= position < count:
+            raise IndexError("history index out of range")
+        return self._index.item(self._index.end - 1 - position)
+    
+    def __iter__(self) -> Iterator[HistoryRecord]:
+        """Iterate records, most recent first."""
+        return self._index.iter_newest()
+    
+    def __repr__(self) -> str:
+        """Short representation; the records can be many."""
+        return f"<HistoryView of {len(self)} records>"
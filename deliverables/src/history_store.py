@@ -0,0 +1,495 @@
+"""
+History Store
+Persistent storage backends for calculation history.
+"""
+
+import json
+import mmap
+import os
+from array import array
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+
+# Block size used when reading the history log backwards from its end
+READ_BLOCK_SIZE = 1 << 16
+
+# The log is compacted once it holds this many times max_items records
+COMPACT_FACTOR = 2
+
+# Logs are never compacted below this many records
+COMPACT_MIN_RECORDS = 64
+
+
+def is_valid_item(item) -> bool:
+    """Check that a loaded history item has string expression and result fields."""
+    return (isinstance(item, dict) and
+            'expression' in item and 'result' in item and
+            isinstance(item['expression'], str) and
+            isinstance(item['result'], str))
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """
+    Replace path with data so readers see either the old or the new file.
+    Writes a temporary file in the same directory, syncs it and renames it over path.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_name = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    fd = os.open(temp_name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_name, path)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except OSError:
+            pass
+        raise
+
+
+class HistoryStore:
+    """Base class for history storage backends."""
+    
+    def __init__(self, path: Union[str, Path]):
+        """Initialize store for the file at path."""
+        self.path = Path(path)
+    
+    def load(self, max_items: int) -> List[Dict[str, str]]:
+        """Load up to max_items valid history items, most recent first."""
+        raise NotImplementedError
+    
+    def append(self, item: Dict[str, str], max_items: int) -> None:
+        """Persist a new most recent item, keeping at least max_items items."""
+        raise NotImplementedError
+    
+    def clear(self) -> None:
+        """Remove all stored items."""
+        write_atomic(self.path, b'')
+    
+    def changes(self) -> Optional[List[Dict[str, str]]]:
+        """
+        Get items other writers appended since the last load, append or
+        changes call, oldest first, or None if the history must be reloaded.
+        Backends that aren't shared between processes never have any.
+        """
+        return []
+
+
+class JsonHistoryStore(HistoryStore):
+    """
+    Stores history as a single JSON array, most recent first.
+    Every save rewrites the whole file; kept for compatibility with older versions.
+    """
+    
+    def load(self, max_items: int) -> List[Dict[str, str]]:
+        """Load up to max_items valid history items, most recent first."""
+        if not self.path.exists():
+            return []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            return []
+        return [item for item in data if is_valid_item(item)][:max_items]
+    
+    def append(self, item: Dict[str, str], max_items: int) -> None:
+        """Rewrite the file with item added in front."""
+        try:
+            items = self.load(max_items)
+        except ValueError:
+            items = []
+        items.insert(0, item)
+        self._write(items[:max_items])
+    
+    def clear(self) -> None:
+        """Remove all stored items."""
+        self._write([])
+    
+    def _write(self, items: List[Dict[str, str]]) -> None:
+        """Write items as a JSON array."""
+        write_atomic(self.path, json.dumps(items, indent=2, ensure_ascii=False).encode('utf-8'))
+
+
+class LogHistoryStore(HistoryStore):
+    """
+    Stores history as an append-only log of JSON records, one per line, oldest first.
+    Saving appends one line. Loading reads backwards from the end of the file
+    until max_items records are found, so its cost does not depend on how long
+    the log has grown. The log is periodically compacted to its newest records
+    with a crash-safe rewrite. Files in the JsonHistoryStore format are migrated
+    on first write.
+    """
+    
+    @property
+    def path(self) -> Path:
+        """Log file location."""
+        return self._path
+    
+    @path.setter
+    def path(self, path: Union[str, Path]) -> None:
+        """Point the store at another file and forget what is known about the old one."""
+        self._path = Path(path)
+        self._records: Optional[int] = None  # Records in the log, None if unknown
+    
+    def load(self, max_items: int) -> List[Dict[str, str]]:
+        """Load up to max_items valid history items, most recent first."""
+        items, complete = self._read_newest(max_items)
+        self._records = len(items) if complete else None
+        return items
+    
+    def append(self, item: Dict[str, str], max_items: int) -> None:
+        """Append item to the log, compacting it when it has grown too long."""
+        if self._records is None or self._records >= max(COMPACT_MIN_RECORDS,
+                                                        max_items * COMPACT_FACTOR):
+            self.compact(max_items)
+        
+        line = json.dumps(item, ensure_ascii=False) + '\n'
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+        self._records += 1
+    
+    def clear(self) -> None:
+        """Remove all stored items."""
+        super().clear()
+        self._records = 0
+    
+    def compact(self, max_items: int) -> None:
+        """Rewrite the log with only its newest max_items records."""
+        try:
+            items, _ = self._read_newest(max_items)
+        except (ValueError, IOError, OSError):
+            # Unreadable or corrupted history is dropped, as load_history does
+            items = []
+        data = ''.join(json.dumps(item, ensure_ascii=False) + '\n' for item in reversed(items))
+        write_atomic(self.path, data.encode('utf-8'))
+        self._records = len(items)
+    
+    def _read_newest(self, max_items: int) -> Tuple[List[Dict[str, str]], bool]:
+        """
+        Read up to max_items valid records, most recent first.
+        Also returns whether the whole log was read and ends cleanly, so appending
+        to it needs no compaction first.
+        """
+        if max_items <= 0 or not self.path.exists():
+            return [], False
+        
+        with open(self.path, 'rb') as f:
+            if f.read(1) == b'[':
+                # Legacy JSON array; rewriting it as a log drops the array format
+                f.seek(0)
+                data = json.loads(f.read().decode('utf-8'))
+                if not isinstance(data, list):
+                    return [], False
+                return [item for item in data if is_valid_item(item)][:max_items], False
+            
+            position = f.seek(0, os.SEEK_END)
+            if position > 0:
+                f.seek(-1, os.SEEK_END)
+            # A crash mid-append can leave a torn last line that the next record would join
+            clean_end = position == 0 or f.read(1) == b'\n'
+            items: List[Dict[str, str]] = []
+            partial = b''  # Start of the earliest line read so far
+            
+            while position > 0:
+                size = min(READ_BLOCK_SIZE, position)
+                position -= size
+                f.seek(position)
+                lines = (f.read(size) + partial).split(b'\n')
+                # The first line may continue in the previous block
+                partial = lines[0] if position > 0 else b''
+                start = 1 if position > 0 else 0
+                
+                for line in reversed(lines[start:]):
+                    item = _parse_record(line)
+                    if item is not None:
+                        items.append(item)
+                        if len(items) == max_items:
+                            # Older records may remain; the next append compacts them away
+                            return items, False
+        
+        return items, clean_end
+
+
+def _parse_record(line: bytes) -> Optional[Dict[str, str]]:
+    """Decode one log line, returning None for blank, torn or invalid records."""
+    if not line.strip():
+        return None
+    try:
+        item = json.loads(line.decode('utf-8'))
+    except ValueError:
+        return None
+    return item if is_valid_item(item) else None
+
+
+@contextmanager
+def locked(lock_path: Path, exclusive: bool) -> Iterator[int]:
+    """
+    Hold an advisory lock on lock_path (created if missing), shared or
+    exclusive, yielding its file descriptor. Windows has no shared locks,
+    so readers lock exclusively there.
+    """
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        elif msvcrt is not None:
+            # Locks the first byte, wherever the generation is read or written
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        yield fd
+    finally:
+        if fcntl is None and msvcrt is not None:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)  # Also releases a flock
+
+
+def _read_generation(lock_fd: int) -> int:
+    """Read the log generation kept in a lock file (0 if it has none)."""
+    os.lseek(lock_fd, 0, os.SEEK_SET)
+    try:
+        return int(os.read(lock_fd, 32) or 0)
+    except ValueError:
+        return 0
+
+
+def _write_generation(lock_fd: int, generation: int) -> None:
+    """Store the log generation in a lock file."""
+    os.lseek(lock_fd, 0, os.SEEK_SET)
+    os.write(lock_fd, str(generation).encode('ascii'))
+    os.ftruncate(lock_fd, len(str(generation)))
+
+
+class SharedHistoryStore(LogHistoryStore):
+    """
+    An append-only log that several processes can share.
+    
+    Writers append and compact under an exclusive advisory lock on a
+    companion lock file, opening the log only once they hold it, so no
+    process ever appends to a log another one has just replaced. The lock
+    file also holds a generation number, bumped whenever the log is
+    rewritten.
+    
+    Readers keep the byte offset of every record they have seen, found by
+    scanning a memory map of the log, and the log's identity, size and
+    modification time. changes() compares those with a single stat and,
+    only if the log grew, maps it again and parses just the new records.
+    A rewritten log (new inode or generation) is reported for reloading.
+    """
+    
+    @property
+    def path(self) -> Path:
+        """Log file location."""
+        return self._path
+    
+    @path.setter
+    def path(self, path: Union[str, Path]) -> None:
+        """Point the store at another file and forget what is known about the old one."""
+        LogHistoryStore.path.fset(self, path)
+        self.lock_path = self._path.with_name(self._path.name + '.lock')
+        self._forget()
+    
+    def _forget(self) -> None:
+        """Drop the index, so the next changes() call asks for a reload."""
+        self._offsets = array('q')   # Start offset of each complete line in the log
+        self._consumed = 0           # End of the last complete line indexed
+        self._own: List[Tuple[int, int]] = []  # Own records beyond _consumed, as (start, end)
+        self._identity: Optional[Tuple[int, int]] = None  # (device, inode) of the indexed log
+        self._generation = -1
+        self._stat: Optional[tuple] = None  # Log stat when last in sync, for the fast check
+        self._missing = False  # The log didn't exist when loaded, so all of a new one is news
+    
+    def load(self, max_items: int) -> List[Dict[str, str]]:
+        """Load up to max_items valid history items, most recent first, and index the log."""
+        self._forget()
+        if not self.path.exists():
+            self._records = 0
+            self._missing = True
+            return []
+        with locked(self.lock_path, exclusive=False) as lock_fd:
+            self._generation = _read_generation(lock_fd)
+            with open(self.path, 'rb') as f:
+                status = os.fstat(f.fileno())
+                self._identity = (status.st_dev, status.st_ino)
+                self._stat = _stat_key(status)
+                if status.st_size == 0:
+                    self._records = 0
+                    return []
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    if mapped[:1] == b'[':
+                        # Legacy JSON array; the first append compacts it into a log
+                        items, _ = self._read_newest(max_items)
+                        self._records = None
+                        self._consumed = status.st_size
+                        return items
+                    self._index(mapped, 0, status.st_size)
+                    self._records = len(self._offsets)
+                    return self._newest(mapped, max_items)
+    
+    def changes(self) -> Optional[List[Dict[str, str]]]:
+        """
+        Get the items other processes appended since the last load, append or
+        changes call, oldest first, or None if the log was rewritten (or
+        never loaded) and must be reloaded.
+        """
+        try:
+            status = os.stat(self.path)
+        except FileNotFoundError:
+            return [] if self._missing else None
+        if _stat_key(status) == self._stat:
+            return []
+        if self._identity is None and not self._missing:
+            return None
+        
+        with locked(self.lock_path, exclusive=False) as lock_fd:
+            generation = _read_generation(lock_fd)
+            with open(self.path, 'rb') as f:
+                status = os.fstat(f.fileno())
+                if self._missing:
+                    # Created since the load: index it from the start
+                    self._missing = False
+                    self._identity = (status.st_dev, status.st_ino)
+                    self._generation = generation
+                if generation != self._generation or status.st_size < self._consumed or (
+                        status.st_dev, status.st_ino) != self._identity:
+                    return None
+                items = []
+                if status.st_size > self._consumed:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        items = self._index(mapped, self._consumed, status.st_size)
+                self._records = len(self._offsets)
+                self._stat = _stat_key(status)
+                return items
+    
+    def append(self, item: Dict[str, str], max_items: int) -> None:
+        """Append item to the log under the lock, compacting it when it has grown too long."""
+        line = (json.dumps(item, ensure_ascii=False) + '\n').encode('utf-8')
+        with locked(self.lock_path, exclusive=True) as lock_fd:
+            generation = _read_generation(lock_fd)
+            if self._records is None or self._records >= max(COMPACT_MIN_RECORDS,
+                                                            max_items * COMPACT_FACTOR):
+                self._compact_locked(lock_fd, generation, max_items)
+                generation = _read_generation(lock_fd)
+            
+            fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o666)
+            try:
+                status = os.fstat(fd)
+                start = status.st_size
+                if start > 0:
+                    os.lseek(fd, start - 1, os.SEEK_SET)
+                    if os.read(fd, 1) != b'\n':
+                        # Terminate a line torn by a crashed writer so it can't swallow this record
+                        line = b'\n' + line
+                        start += 1
+                os.write(fd, line)
+                end = os.fstat(fd).st_size
+                
+                if status.st_size == 0:
+                    # A new or emptied log holds just this record
+                    self._forget()
+                    self._identity = (status.st_dev, status.st_ino)
+                    self._generation = generation
+                    self._offsets.append(start)
+                    self._consumed = end
+                    self._records = 1
+                    self._stat = _stat_key(os.fstat(fd))
+                elif generation != self._generation or (status.st_dev, status.st_ino) != self._identity:
+                    # The log was rewritten since it was indexed
+                    records = self._records
+                    self._forget()
+                    self._records = None if records is None else records + 1
+                elif status.st_size == self._consumed and not self._own:
+                    # Nobody else appended: stay in sync without rereading
+                    self._offsets.append(start)
+                    self._consumed = end
+                    self._records = len(self._offsets)
+                    self._stat = _stat_key(os.fstat(fd))
+                else:
+                    self._own.append((start, end))
+                    self._records += 1
+            finally:
+                os.close(fd)
+    
+    def clear(self) -> None:
+        """Remove all stored items."""
+        with locked(self.lock_path, exclusive=True) as lock_fd:
+            generation = _read_generation(lock_fd) + 1
+            write_atomic(self.path, b'')
+            _write_generation(lock_fd, generation)
+            self._forget()
+            status = os.stat(self.path)
+            self._identity = (status.st_dev, status.st_ino)
+            self._generation = generation
+            self._stat = _stat_key(status)
+            self._records = 0
+    
+    def compact(self, max_items: int) -> None:
+        """Rewrite the log with only its newest max_items records."""
+        with locked(self.lock_path, exclusive=True) as lock_fd:
+            self._compact_locked(lock_fd, _read_generation(lock_fd), max_items)
+    
+    def _compact_locked(self, lock_fd: int, generation: int, max_items: int) -> None:
+        """Compact the log while holding the exclusive lock, bumping the generation."""
+        LogHistoryStore.compact(self, max_items)
+        _write_generation(lock_fd, generation + 1)
+        # Records other processes appended may be in the new log but not in
+        # memory, so the next changes() call asks for a reload
+        records = self._records
+        self._forget()
+        self._records = records
+    
+    def _index(self, mapped: mmap.mmap, start: int, end: int) -> List[Dict[str, str]]:
+        """
+        Index the complete lines of mapped between start and end and return
+        the valid records among them, oldest first, skipping this store's
+        own appends. A trailing line without a newline is left for later.
+        """
+        items = []
+        offsets = self._offsets
+        own = self._own
+        position = start
+        while position < end:
+            newline = mapped.find(b'\n', position, end)
+            if newline < 0:
+                break
+            offsets.append(position)
+            if own and own[0][0] == position:
+                own.pop(0)
+            else:
+                item = _parse_record(mapped[position:newline])
+                if item is not None:
+                    items.append(item)
+            position = newline + 1
+        self._consumed = position
+        return items
+    
+    def _newest(self, mapped: mmap.mmap, max_items: int) -> List[Dict[str, str]]:
+        """Parse up to max_items valid indexed records, most recent first."""
+        items: List[Dict[str, str]] = []
+        offsets = self._offsets
+        end = self._consumed
+        for i in range(len(offsets) - 1, -1, -1):
+            if len(items) >= max_items:
+                break
+            item = _parse_record(mapped[offsets[i]:end - 1])
+            if item is not None:
+                items.append(item)
+            end = offsets[i]
+        return items
+
+
+def _stat_key(status: os.stat_result) -> tuple:
+    """The parts of a log's stat that change whenever it is appended to or replaced."""
+    return (status.st_dev, status.st_ino, status.st_size, status.st_mtime_ns)
@@ -0,0 +1,264 @@
+"""
+Incremental Evaluator
+Re-evaluates an expression while it is being edited, reusing parser state for the unchanged prefix.
+
+The expression is scanned left to right by an operator-precedence (shunting-yard)
+parser that reduces subexpressions as soon as their operands are known. After
+every operator or parenthesis a checkpoint of the parser state is recorded; the
+stacks are immutable linked lists, so a checkpoint costs O(1). After an edit,
+scanning restarts from the last checkpoint before the edited position, so typing
+at the end of an expression costs the same however long the expression is.
+"""
+
+import operator
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+from calculator_engine import CalculatorEngine
+from expression_parser import (BINARY_PRECEDENCE, DIGITS, NON_REPEATING, NUMBER_START,
+                               collapse_dots, parse_number)
+
+
+BINARY_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+}
+
+# Unary operators are kept on the operator stack under their own markers
+UNARY_MARKERS = {'+': 'u+', '-': 'u-'}
+UNARY_OPERATORS = {'u+': operator.pos, 'u-': operator.neg}
+
+# Parser state: (values, operators, expect_operand, prev token, token before prev).
+# values and operators are linked-list stacks of (head, tail) pairs, None when empty.
+ParserState = Tuple[Optional[tuple], Optional[tuple], bool, str, str]
+
+INITIAL_STATE: ParserState = (None, None, True, '', '')
+
+
+def common_prefix_length(old: str, new: str, hint: Optional[int] = None) -> int:
+    """
+    Return a length n such that old[:n] == new[:n].
+    A hint that checks out is returned as is, since a shorter prefix only costs
+    rescanning; otherwise the exact common prefix is found by binary search.
+    """
+    high = min(len(old), len(new))
+    if hint is not None and 0 <= hint <= high and old[:hint] == new[:hint]:
+        return hint
+    
+    low = 0
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[:middle] == new[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class IncrementalEvaluator:
+    """Evaluates successive edits of one expression, reprocessing only the edited suffix."""
+    
+    def __init__(self, engine: Optional[CalculatorEngine] = None):
+        """Initialize evaluator; engine supplies result formatting settings."""
+        self.engine = engine if engine is not None else CalculatorEngine()
+        self.reset()
+    
+    def reset(self) -> None:
+        """Forget the previous expression and all checkpoints."""
+        self.text = ""
+        self.cursor = 0
+        self._offsets: List[int] = []  # Checkpoint positions in text (after the token)
+        self._states: List[ParserState] = []
+        self._error_offset: Optional[int] = None  # Position after which text is invalid
+        self._arithmetic_error = False  # The error was float arithmetic failing, not syntax
+        self._end_state: ParserState = INITIAL_STATE
+        self._number = ''  # Number token still being read at the end of text
+        self.chars_scanned = 0  # Characters scanned by the last evaluate() call
+    
+    def evaluate(self, text: str, cursor: Optional[int] = None) -> str:
+        """
+        Evaluate text, reusing parser state for the prefix unchanged since the last call.
+        cursor is the current edit position in text; together with the previous
+        cursor it bounds where the text was changed. Returns the same result as
+        CalculatorEngine.evaluate_expression.
+        """
+        lead = len(text) - len(text.lstrip())
+        clean = text.strip()
+        
+        hint = None
+        if cursor is not None:
+            # A single insertion or deletion leaves everything before both cursors intact
+            hint = max(0, min(self.cursor, cursor - lead))
+            self.cursor = cursor - lead
+        prefix = common_prefix_length(self.text, clean, hint)
+        self.text = clean
+        self.chars_scanned = 0
+        
+        if not clean:
+            self.reset()
+            return "?"
+        
+        if self._error_offset is not None and self._error_offset <= prefix:
+            return self._error_result()
+        self._error_offset = None
+        
+        # Restart from the last checkpoint inside the unchanged prefix
+        count = bisect_right(self._offsets, prefix)
+        del self._offsets[count:]
+        del self._states[count:]
+        start = self._offsets[-1] if count else 0
+        state = self._states[-1] if count else INITIAL_STATE
+        
+        self._scan(clean, start, state)
+        if self._error_offset is not None:
+            return self._error_result()
+        return self._finish()
+    
+    def _scan(self, text: str, start: int, state: ParserState) -> None:
+        """Scan text from start, recording a checkpoint after each non-number token."""
+        values, ops, expect_operand, prev, prev2 = state
+        number = ''
+        offsets = self._offsets
+        states = self._states
+        self.chars_scanned = len(text) - start
+        
+        try:
+            for index in range(start, len(text)):
+                char = text[index]
+                
+                if char in NUMBER_START:
+                    if not number and not expect_operand:
+                        # Only ')' may be followed directly by a number: (2)3 -> (2)*3
+                        if prev != ')' or char == '.':
+                            raise ValueError("Unexpected number")
+                        values, ops = _push_binary('*', values, ops)
+                        expect_operand = True
+                    number += char
+                    continue
+                if char == ' ':
+                    continue
+                
+                if number:
+                    values, ops = _push_operand(_number_value(number), values, ops)
+                    prev2, prev = prev, collapse_dots(number)
+                    number = ''
+                    expect_operand = False
+                
+                if expect_operand:
+                    if char == '(':
+                        ops = ('(', ops)
+                    elif char == '-' and not (prev == '-' and prev2 == '-'):
+                        ops = (UNARY_MARKERS[char], ops)
+                    elif char == '+' and prev not in NON_REPEATING:
+                        ops = (UNARY_MARKERS[char], ops)
+                    else:
+                        raise ValueError(f"Unexpected token: {char!r}")
+                elif char in BINARY_PRECEDENCE:
+                    values, ops = _push_binary(char, values, ops)
+                    expect_operand = True
+                elif char == ')':
+                    values, ops = _close_group(values, ops)
+                elif char == '(':
+                    # Implicit multiplication: 2(3) and (2)(3)
+                    if prev != ')' and prev[-1] not in DIGITS:
+                        raise ValueError("Unexpected token: '('")
+                    values, ops = _push_binary('*', values, ops)
+                    ops = ('(', ops)
+                    expect_operand = True
+                else:
+                    raise ValueError(f"Invalid character: {char!r}")
+                
+                prev2, prev = prev, char
+                offsets.append(index + 1)
+                states.append((values, ops, expect_operand, prev, prev2))
+        except (ValueError, TypeError, ZeroDivisionError, OverflowError) as e:
+            # Errors depend only on the text up to here, so later edits can't fix them
+            self._error_offset = index + 1
+            self._arithmetic_error = isinstance(e, ArithmeticError)
+            return
+        
+        self._end_state = (values, ops, expect_operand, prev, prev2)
+        self._number = number
+    
+    def _finish(self) -> str:
+        """Complete the final number, reduce the remaining operators and format."""
+        values, ops, expect_operand, _, _ = self._end_state
+        
+        try:
+            if self._number:
+                values, ops = _push_operand(_number_value(self._number), values, ops)
+            elif expect_operand:
+                return "?"
+            
+            while ops is not None:
+                if ops[0] == '(':
+                    return "?"
+                values, ops = _reduce(values, ops)
+            # Each instruction of the text's program takes at least one character
+            # besides spaces, so this bounds the engine's instruction count
+            instructions = len(self.text) - self.text.count(' ')
+            if self.engine._needs_exact(values[0], instructions):
+                # Close to a rounding boundary: let the engine recompute exactly
+                return self.engine.evaluate_expression(self.text)
+            return self.engine._format_result(values[0])
+        except (ZeroDivisionError, OverflowError):
+            return self._arithmetic_error_result()
+        except (ValueError, TypeError):
+            return "?"
+    
+    def _error_result(self) -> str:
+        """Result for text with an error at _error_offset."""
+        return self._arithmetic_error_result() if self._arithmetic_error else "?"
+    
+    def _arithmetic_error_result(self) -> str:
+        """
+        Result for valid text whose float evaluation failed. Exact arithmetic
+        may still succeed where floats overflow or underflow to a zero divisor,
+        so the engine evaluates the text in that mode.
+        """
+        if self.engine.arithmetic == 'exact':
+            return self.engine.evaluate_expression(self.text)
+        return "?"
+
+
+def _number_value(number: str):
+    """Convert a (possibly space-free, dot-collapsed) number token to its value."""
+    return parse_number(collapse_dots(number))
+
+
+def _reduce(values, ops):
+    """Apply the operator on top of the stack to the values on top of the stack."""
+    op, ops = ops
+    right, values = values
+    left, values = values
+    if op == '/' and right == 0:
+        raise ZeroDivisionError("Division by zero")
+    return (BINARY_OPERATORS[op](left, right), values), ops
+
+
+def _push_operand(value, values, ops):
+    """Push a completed operand, applying any unary operators waiting for it."""
+    while ops is not None and ops[0] in UNARY_OPERATORS:
+        value = UNARY_OPERATORS[ops[0]](value)
+        ops = ops[1]
+    return (value, values), ops
+
+
+def _push_binary(op: str, values, ops):
+    """Reduce operators binding at least as tightly as op, then push op."""
+    precedence = BINARY_PRECEDENCE[op]
+    while ops is not None and ops[0] in BINARY_PRECEDENCE and BINARY_PRECEDENCE[ops[0]] >= precedence:
+        values, ops = _reduce(values, ops)
+    return values, (op, ops)
+
+
+def _close_group(values, ops):
+    """Reduce back to the matching '(' and treat the group as a completed operand."""
+    while ops is not None and ops[0] != '(':
+        values, ops = _reduce(values, ops)
+    if ops is None:
+        raise ValueError("Unbalanced parentheses")
+    value, values = values
+    return _push_operand(value, values, ops[1])
@@ -6,16 +6,15 @@ A clean, professional calculator with real-time calculation and history manageme
 Entry point for the calculator application.
 """
 
+import argparse
 import sys
 import os
-from calculator_app import CalculatorApp
-from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QIcon, QPixmap
 
 
 def load_calculator_icon():
     """Load calculator icon from Desktop."""
+    from PyQt6.QtGui import QIcon
+    
     # Use Calculator.png from Desktop without any scaling
     icon_path = os.path.expanduser("~/Desktop/Calculator.png")
     
@@ -27,9 +26,36 @@ def load_calculator_icon():
         return QIcon()  # Use default icon
 
 
-def main():
-    """Main entry point for the calculator application."""
-    app = QApplication(sys.argv)
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Professional Calculator")
+    parser.add_argument('--eval', metavar='SOURCE', dest='eval_source',
+                        help="evaluate expressions line by line from SOURCE "
+                             "('-' for stdin) and print expression<TAB>result without a GUI")
+    parser.add_argument('--bulk', metavar=('INPUT', 'OUTPUT'), nargs=2,
+                        help="evaluate every line of the file INPUT across worker processes "
+                             "and write the results to OUTPUT without a GUI")
+    parser.add_argument('--format', choices=('text', 'binary'), default='text', dest='bulk_format',
+                        help="--bulk output: expression<TAB>result lines (text, the default) or "
+                             "one float64 value and status byte per input line (binary)")
+    parser.add_argument('--workers', type=int, metavar='N',
+                        help="--bulk worker processes (default: one per CPU)")
+    parser.add_argument('--plan-cache', metavar='PATH',
+                        help="--eval and --bulk: compile expressions from the plans stored in PATH "
+                             "instead of parsing them, and store plans for new ones")
+    parser.add_argument('--serve', metavar='ADDRESS', nargs='?', const='127.0.0.1:8765',
+                        help="serve line-delimited JSON evaluation requests on ADDRESS "
+                             "(host:port or a Unix socket path, default 127.0.0.1:8765) without a GUI")
+    return parser.parse_known_args(argv)
+
+
+def run_gui(qt_argv):
+    """Run the calculator GUI."""
+    # Qt is only imported on the GUI path so headless modes never load it
+    from PyQt6.QtWidgets import QApplication
+    from calculator_app import CalculatorApp
+    
+    app = QApplication(qt_argv)
     
     # Set application properties for macOS dock visibility
     app.setApplicationName("Professional Calculator")
@@ -42,7 +68,6 @@ def main():
     app.setWindowIcon(calculator_icon)
     
     # Force app to appear in dock on macOS (simplified approach)
-    import os
     if os.name == 'posix':  # macOS/Linux
         app.setQuitOnLastWindowClosed(True)
     
@@ -54,8 +79,52 @@ def main():
     calculator.activateWindow()  # Make active
     
     # Start event loop
-    sys.exit(app.exec())
+    return app.exec()
+
+
+def main(argv=None):
+    """Main entry point for the calculator application."""
+    args, qt_args = parse_args(argv)
+    
+    engine = None
+    if args.plan_cache is not None and (args.eval_source is not None or args.bulk is not None):
+        from calculator_engine import CalculatorEngine
+        engine = CalculatorEngine()
+        engine.load_plans(args.plan_cache)
+    
+    if args.eval_source is not None:
+        from stream_evaluator import run_headless
+        try:
+            run_headless(args.eval_source, engine=engine)
+        except BrokenPipeError:
+            # Downstream consumer (e.g. head) closed the pipe
+            sys.stderr.close()
+        except OSError as e:
+            # e.g. a missing or unreadable source file
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+        if engine is not None:
+            engine.save_plans()
+        return 0
+    
+    if args.bulk is not None:
+        from bulk_evaluator import evaluate_file
+        try:
+            counts = evaluate_file(args.bulk[0], args.bulk[1], args.bulk_format, args.workers, engine)
+        except OSError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+        print(f"{counts['expressions']} expressions, {counts['errors']} errors", file=sys.stderr)
+        if engine is not None:
+            engine.save_plans()
+        return 0
+    
+    if args.serve is not None:
+        from evaluation_server import run_server
+        return run_server(args.serve)
+    
+    return run_gui(sys.argv[:1] + qt_args)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""
+Optimizer
+Constant folding, common subexpression elimination and identity simplification for stack programs.
+
+optimize_program() rebuilds a Program's postfix code as a graph in which
+equal subexpressions (same operation on equal operands) are a single node,
+then emits it back as postfix. On the way, operations on constants are
+computed once (unless they raise, so the error still happens at run time),
+and a subexpression used more than once is kept in a temporary slot when
+that takes fewer instructions than repeating it.
+
+Every rewrite leaves float results bit-for-bit unchanged: folding performs
+the same operations in the same order as the interpreter would, and only
+identities that hold for every int and float (including -0.0, infinities
+and NaN) and keep the operand's type are applied:
+
+    +x -> x        -(-x) -> x        x * 1 -> x        1 * x -> x        x - 0 -> x
+
+x + 0 is not simplified (-0.0 + 0 is 0.0), nor x / 1 (an int x becomes a
+float), nor x * 0. Exact runs of an optimized program use the program it
+was built from (see Program.source).
+
+Variables are leaves like constants but are never folded, so literal parts
+of an expression over variables are computed once, at compile time.
+"""
+
+from typing import Dict, List, Tuple
+
+from stack_machine import (LOAD_CONST, LOAD_TEMP, MUL, NEG, OPERATIONS, POS, STORE_TEMP,
+                           SUB, Instruction, Program)
+
+
+def optimize_program(program: Program) -> Tuple[Program, int]:
+    """
+    Optimize program. Returns (optimized program, instructions removed);
+    program itself is returned when nothing could be removed.
+    """
+    graph = _ExpressionGraph()
+    variables = dict(program.variables)
+    stack: List[int] = []
+    for opcode, index in program.code:
+        if opcode == LOAD_CONST:
+            name = variables.get(index)
+            stack.append(graph.constant(program.constants[index]) if name is None
+                         else graph.variable(name))
+        elif opcode <= POS:
+            stack.append(graph.unary(opcode, stack.pop()))
+        else:
+            right = stack.pop()
+            stack.append(graph.binary(opcode, stack.pop(), right))
+    
+    code, constants, variables, temps = graph.emit(stack[-1])
+    removed = len(program.code) - len(code)
+    if removed <= 0:
+        return program, 0
+    return Program(code, constants, variables, temps, source=program.source or program), removed
+
+
+# Node tag of a variable; the other nodes are tagged with their opcode
+_VARIABLE = -1
+_LEAVES = (LOAD_CONST, _VARIABLE)
+
+
+class _ExpressionGraph:
+    """Value-numbered expression nodes, numbered in creation order (operands before users)."""
+    
+    def __init__(self):
+        """Initialize an empty graph."""
+        # Node number -> (LOAD_CONST, value), (_VARIABLE, name) or (opcode, operand node[, operand node])
+        self.nodes: List[tuple] = []
+        self.sizes: List[int] = []  # Instructions the node takes written out as a tree
+        self._numbers: Dict[tuple, int] = {}
+    
+    def _node(self, key: tuple, entry: tuple, size: int) -> int:
+        """Get the number of the node for key, adding it if new."""
+        number = self._numbers.get(key)
+        if number is None:
+            number = self._numbers[key] = len(self.nodes)
+            self.nodes.append(entry)
+            self.sizes.append(size)
+        return number
+    
+    def constant(self, value) -> int:
+        """Node loading value; keyed by type and repr so 0.0 and -0.0 (or 1 and 1.0) stay apart."""
+        return self._node((LOAD_CONST, type(value), repr(value)), (LOAD_CONST, value), 1)
+    
+    def variable(self, name: str) -> int:
+        """Node loading variable name."""
+        return self._node((_VARIABLE, name), (_VARIABLE, name), 1)
+    
+    def _constant_value(self, number: int):
+        """Get (True, value) if node number is a constant, else (False, None)."""
+        entry = self.nodes[number]
+        if entry[0] == LOAD_CONST:
+            return True, entry[1]
+        return False, None
+    
+    def _is_int(self, number: int, value: int) -> bool:
+        """Check if node number is the int constant value."""
+        entry = self.nodes[number]
+        return entry[0] == LOAD_CONST and type(entry[1]) is int and entry[1] == value
+    
+    def unary(self, opcode: int, operand: int) -> int:
+        """Node applying unary opcode to operand, folded or simplified where possible."""
+        is_constant, value = self._constant_value(operand)
+        if is_constant:
+            return self.constant(OPERATIONS[opcode](value))
+        if opcode == POS:
+            return operand
+        entry = self.nodes[operand]
+        if entry[0] == NEG:
+            return entry[1]
+        return self._node((opcode, operand), (opcode, operand), 1 + self.sizes[operand])
+    
+    def binary(self, opcode: int, left: int, right: int) -> int:
+        """Node applying binary opcode to left and right, folded or simplified where possible."""
+        left_constant, left_value = self._constant_value(left)
+        right_constant, right_value = self._constant_value(right)
+        if left_constant and right_constant:
+            try:
+                return self.constant(OPERATIONS[opcode](left_value, right_value))
+            except ArithmeticError:
+                pass  # Left in the code so it raises when run
+        
+        if opcode == MUL:
+            if self._is_int(right, 1):
+                return left
+            if self._is_int(left, 1):
+                return right
+        elif opcode == SUB and self._is_int(right, 0):
+            return left
+        
+        size = 1 + self.sizes[left] + self.sizes[right]
+        return self._node((opcode, left, right), (opcode, left, right), size)
+    
+    def emit(self, root: int) -> Tuple[List[Instruction], List[object], List[Tuple[int, str]], int]:
+        """
+        Write the graph below root out as postfix code.
+        Returns (code, constants, variable slots, number of temporary slots).
+        """
+        nodes = self.nodes
+        sizes = self.sizes
+        
+        # Count the uses of each node reachable from root; users come after their operands
+        uses = [0] * (root + 1)
+        uses[root] = 1
+        for number in range(root, -1, -1):
+            entry = nodes[number]
+            if uses[number] and entry[0] not in _LEAVES:
+                for operand in entry[1:]:
+                    uses[operand] += 1
+        
+        code: List[Instruction] = []
+        constants: List[object] = []
+        variables: List[Tuple[int, str]] = []
+        constant_index: Dict[int, int] = {}  # Leaf node -> constant slot
+        temp_slot: Dict[int, int] = {}
+        
+        # Explicit work stack of (node, operands emitted); expressions can nest arbitrarily deep
+        work = [(root, False)]
+        while work:
+            number, expanded = work.pop()
+            entry = nodes[number]
+            if entry[0] in _LEAVES:
+                index = constant_index.get(number)
+                if index is None:
+                    index = constant_index[number] = len(constants)
+                    if entry[0] == _VARIABLE:
+                        variables.append((index, entry[1]))
+                        constants.append(None)
+                    else:
+                        constants.append(entry[1])
+                code.append((LOAD_CONST, index))
+            elif number in temp_slot:
+                code.append((LOAD_TEMP, temp_slot[number]))
+            elif not expanded:
+                work.append((number, True))
+                # Pushed right first so the left operand is emitted first
+                for operand in reversed(entry[1:]):
+                    work.append((operand, False))
+            else:
+                code.append((entry[0], None))
+                # A slot costs a store plus one load per use instead of repeating the subexpression
+                if sizes[number] * uses[number] > sizes[number] + uses[number]:
+                    temp_slot[number] = len(temp_slot)
+                    code.append((STORE_TEMP, temp_slot[number]))
+        
+        return code, constants, variables, len(temp_slot)
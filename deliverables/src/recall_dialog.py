@@ -0,0 +1,147 @@
+"""
+Recall Dialog
+Searchable list of saved calculations, backed by a lazily populated model.
+
+The model only formats the rows the view asks for and exposes them in
+batches through canFetchMore/fetchMore, so opening Recall costs the same
+with 100k saved calculations as with ten. Filtering goes through the
+history's search index, and the selection is resolved by row index, so two
+calculations with the same display text are still told apart.
+"""
+
+from typing import Any, List, Optional
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt
+from PyQt6.QtWidgets import (QCheckBox, QDialog, QDialogButtonBox, QHBoxLayout,
+                             QLineEdit, QListView, QVBoxLayout)
+
+from history_manager import HistoryManager
+from history_records import HistoryRecord
+
+
+class HistoryListModel(QAbstractListModel):
+    """List model over a HistoryManager's items, most recent first, fetched in batches."""
+    
+    # Rows made available per fetchMore call
+    BATCH_SIZE = 256
+    
+    def __init__(self, history: HistoryManager, parent=None):
+        """Initialize model showing all history items."""
+        super().__init__(parent)
+        self.history = history
+        self._matches: Optional[List[int]] = None  # History indices matching the filter; None for all
+        self._loaded = min(self.BATCH_SIZE, self.total_rows())
+    
+    def total_rows(self) -> int:
+        """Rows matching the filter, loaded or not."""
+        if self._matches is None:
+            return len(self.history.history_items)
+        return len(self._matches)
+    
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Rows fetched so far."""
+        return 0 if parent.isValid() else self._loaded
+    
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        """Check if rows remain to be fetched."""
+        return not parent.isValid() and self._loaded < self.total_rows()
+    
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:
+        """Make the next batch of rows available to the view."""
+        if parent.isValid():
+            return
+        count = min(self.BATCH_SIZE, self.total_rows() - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+    
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        """Format a row's history item on demand."""
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.history.format_history_display(self.item_at(index.row()))
+        if role == Qt.ItemDataRole.ToolTipRole:
+            item = self.item_at(index.row())
+            return f"{item['expression']} = {item['result']}"
+        if role == Qt.ItemDataRole.UserRole:
+            return self.history_index(index.row())
+        return None
+    
+    def history_index(self, row: int) -> int:
+        """Get the history index (0 is the most recent) shown at row."""
+        return row if self._matches is None else self._matches[row]
+    
+    def item_at(self, row: int) -> HistoryRecord:
+        """Get the history record shown at row."""
+        return self.history.get_record(self.history_index(row))
+    
+    def set_filter(self, query: str, prefix: bool = False) -> None:
+        """Show only items whose expression or result contains query (or starts with it, if prefix)."""
+        self.beginResetModel()
+        self._matches = self.history.search_history(query, prefix) if query else None
+        self._loaded = min(self.BATCH_SIZE, self.total_rows())
+        self.endResetModel()
+
+
+class RecallDialog(QDialog):
+    """Dialog for picking a saved calculation, with incremental search."""
+    
+    def __init__(self, history: HistoryManager, parent=None):
+        """Initialize dialog over history."""
+        super().__init__(parent)
+        self.setWindowTitle('Recall Calculation')
+        self.resize(360, 420)
+        
+        self.model = HistoryListModel(history, self)
+        
+        self.search_field = QLineEdit()
+        self.search_field.setPlaceholderText("Search expressions and results")
+        self.search_field.setClearButtonEnabled(True)
+        self.prefix_box = QCheckBox("Starts with")
+        
+        self.list_view = QListView()
+        self.list_view.setModel(self.model)
+        # Every row is one line of text; lets the view skip measuring each row
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok |
+                                   QDialogButtonBox.StandardButton.Cancel)
+        
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(self.search_field)
+        search_layout.addWidget(self.prefix_box)
+        layout = QVBoxLayout(self)
+        layout.addLayout(search_layout)
+        layout.addWidget(self.list_view)
+        layout.addWidget(buttons)
+        
+        self.search_field.textChanged.connect(self.apply_filter)
+        self.prefix_box.toggled.connect(self.apply_filter)
+        self.search_field.returnPressed.connect(self.accept)
+        self.list_view.doubleClicked.connect(self.accept)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        
+        self.select_first()
+        self.search_field.setFocus()
+    
+    def apply_filter(self) -> None:
+        """Filter the list by the search field and select the best match."""
+        self.model.set_filter(self.search_field.text().strip(), self.prefix_box.isChecked())
+        self.select_first()
+    
+    def select_first(self) -> None:
+        """Select the first row, if any."""
+        if self.model.rowCount() > 0:
+            self.list_view.setCurrentIndex(self.model.index(0))
+    
+    def selected_item(self) -> Optional[HistoryRecord]:
+        """Get the selected history record, or None."""
+        index = self.list_view.currentIndex()
+        if not index.isValid():
+            return None
+        return self.model.item_at(index.row())
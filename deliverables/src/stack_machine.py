@@ -0,0 +1,341 @@
+"""
+Stack Machine
+Compiles calculator expressions to flat postfix programs and runs them on an explicit value stack.
+
+Tokens from the single-pass tokenizer are converted to postfix (RPN) order by an
+operator-precedence (shunting-yard) pass, and the program is executed by one
+loop that dispatches opcodes through a table of operations. Neither step
+recurses, so nesting depth is limited only by input size. A compiled Program
+holds no per-run state and can be evaluated any number of times.
+
+A program that is used often can be promoted to a second tier: its postfix code
+is translated into the source of a straight-line Python function, one statement
+per operation, which compile() turns into bytecode. Only the engine's operators
+appear in the generated source; constants are passed in as arguments.
+"""
+
+import operator
+from typing import Any, Callable, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from expression_parser import BINARY_PRECEDENCE, NAME_START, NUMBER_START, parse_number, tokenize
+
+
+# Opcodes; unary operations come first so arity can be told by comparison
+NEG = 0
+POS = 1
+ADD = 2
+SUB = 3
+MUL = 4
+DIV = 5
+LOAD_CONST = 6
+# Temporary slots, only in optimized programs (see optimizer): STORE_TEMP
+# copies the top of the stack into slot index, LOAD_TEMP pushes it back
+STORE_TEMP = 7
+LOAD_TEMP = 8
+
+# Dispatch table: opcode -> operation (indexes up to LOAD_CONST)
+OPERATIONS = (
+    operator.neg,
+    operator.pos,
+    operator.add,
+    operator.sub,
+    operator.mul,
+    operator.truediv,  # Raises ZeroDivisionError for int, float and Fraction alike
+)
+
+UNARY_OPCODES = {'-': NEG, '+': POS}
+BINARY_OPCODES = {'+': ADD, '-': SUB, '*': MUL, '/': DIV}
+OPCODE_PRECEDENCE = {BINARY_OPCODES[op]: precedence for op, precedence in BINARY_PRECEDENCE.items()}
+
+# Python source of each operation, for generated functions
+UNARY_SOURCE = {NEG: '-', POS: '+'}
+BINARY_SOURCE = {ADD: '+', SUB: '-', MUL: '*', DIV: '/'}
+
+# Operator-stack marker for an open parenthesis
+GROUP = -1
+
+# Longer programs stay interpreted; compiling very large functions costs more than it saves
+CODEGEN_MAX_INSTRUCTIONS = 10000
+
+# One instruction: (opcode, index), a constant or temporary slot index; None for operations
+Instruction = Tuple[int, object]
+
+
+class Program:
+    """
+    A compiled expression: postfix instructions plus the constants they load.
+    A variable is a constant slot (None in constants) filled in from the
+    values passed to evaluate, so interpreted and generated code run
+    programs with variables unchanged.
+    Counts how it is used so callers can decide when to promote it (see promote).
+    """
+    
+    __slots__ = ('code', 'constants', 'variables', 'temps', 'source', '_exact_constants',
+                 'function', 'hits', 'interpreted_runs', 'compiled_runs')
+    
+    def __init__(self, code: List[Instruction], constants: List[object],
+                 variables: Iterable[Tuple[int, str]] = (), temps: int = 0,
+                 source: Optional['Program'] = None):
+        """
+        Initialize program from instructions and constant values.
+        variables pairs the constant index of each variable slot with its
+        name. temps is the number of temporary slots the code uses. source is
+        the unoptimized program an optimized one was built from; exact runs
+        use it, since folded constants hold float results.
+        """
+        self.code = tuple(code)
+        self.constants = tuple(constants)
+        self.variables = tuple(variables)
+        self.temps = temps
+        self.source = source
+        self._exact_constants = None  # Rational constants, built on first exact run
+        self.function: Optional[Callable[[tuple], Any]] = None  # Generated code once promoted
+        self.hits = 0  # Requests for this program's expression, counted by the caller
+        self.interpreted_runs = 0
+        self.compiled_runs = 0
+    
+    def __len__(self) -> int:
+        """Number of instructions."""
+        return len(self.code)
+    
+    @property
+    def names(self) -> FrozenSet[str]:
+        """Names of the variables the program uses."""
+        return frozenset(name for _, name in self.variables)
+    
+    @property
+    def tier(self) -> str:
+        """'compiled' once a generated function has replaced the interpreter, else 'interpreted'."""
+        return 'interpreted' if self.function is None else 'compiled'
+    
+    def promote(self) -> bool:
+        """
+        Generate a specialized function for this program, used by every later run.
+        Programs over CODEGEN_MAX_INSTRUCTIONS, and malformed code the
+        generator can't translate, stay interpreted.
+        Returns whether the program is now compiled.
+        """
+        if self.function is None and len(self.code) <= CODEGEN_MAX_INSTRUCTIONS:
+            try:
+                self.function = generate_function(self.code)
+            except (KeyError, IndexError, TypeError, ValueError, SyntaxError):
+                return False
+        return self.function is not None
+    
+    def evaluate(self, exact: bool = False, values: Optional[Mapping[str, Any]] = None):
+        """
+        Run the program and return its value.
+        values maps variable names to numbers (None counts as undefined).
+        With exact, constants and variables are loaded as Fractions (floats
+        at their shortest decimal representation) and the result is a Fraction.
+        Raises ZeroDivisionError or OverflowError as Python arithmetic does,
+        and NameError for an undefined variable.
+        """
+        if not exact:
+            constants = self.constants
+        elif self.source is not None:
+            return self.source.evaluate(exact, values)
+        else:
+            if self._exact_constants is None:
+                self._exact_constants = tuple(map(exact_value, self.constants))
+            constants = self._exact_constants
+        if self.variables:
+            constants = self._bind(constants, values or {}, exact)
+        
+        if self.function is not None:
+            self.compiled_runs += 1
+            return self.function(constants)
+        self.interpreted_runs += 1
+        if self.temps:
+            return _execute_with_temps(self.code, constants, self.temps)
+        return _execute(self.code, constants)
+    
+    
+    def _bind(self, constants: tuple, values: Mapping[str, Any], exact: bool) -> tuple:
+        """Get constants with each variable slot set from values."""
+        bound = list(constants)
+        for index, name in self.variables:
+            value = values.get(name)
+            if value is None:
+                raise NameError(f"Undefined variable: {name}")
+            if exact:
+                value = exact_value(value)
+            elif not isinstance(value, (int, float)):
+                value = float(value)  # A Fraction from an exact evaluation
+            bound[index] = value
+        return tuple(bound)
+
+
+def exact_value(value):
+    """Convert a number to a Fraction, a float at its shortest decimal representation; None is kept."""
+    # Imported on first use: fractions pulls in decimal and is rarely needed
+    from fractions import Fraction
+    
+    if value is None or isinstance(value, Fraction):
+        return value
+    return Fraction(repr(value)) if isinstance(value, float) else Fraction(value)
+
+
+def _execute(code: Tuple[Instruction, ...], constants: tuple):
+    """Run instructions on a fresh value stack and return the value left on top."""
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    operations = OPERATIONS
+    
+    for opcode, index in code:
+        if opcode == LOAD_CONST:
+            push(constants[index])
+        elif opcode <= POS:
+            stack[-1] = operations[opcode](stack[-1])
+        else:
+            right = pop()
+            stack[-1] = operations[opcode](stack[-1], right)
+    
+    return stack[-1]
+
+
+def _execute_with_temps(code: Tuple[Instruction, ...], constants: tuple, temps: int):
+    """_execute for code that also uses temporary slots; kept apart so the common loop stays short."""
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    operations = OPERATIONS
+    slots = [None] * temps
+    
+    for opcode, index in code:
+        if opcode == LOAD_CONST:
+            push(constants[index])
+        elif opcode == LOAD_TEMP:
+            push(slots[index])
+        elif opcode == STORE_TEMP:
+            slots[index] = stack[-1]
+        elif opcode <= POS:
+            stack[-1] = operations[opcode](stack[-1])
+        else:
+            right = pop()
+            stack[-1] = operations[opcode](stack[-1], right)
+    
+    return stack[-1]
+
+
+def generate_source(code: Tuple[Instruction, ...]) -> str:
+    """
+    Translate postfix instructions into the source of a function _program(k)
+    that takes the constants tuple and returns the program's value.
+    Each operation becomes one assignment to a local named after its stack
+    slot, so the source never nests however deep the expression is.
+    """
+    # Optimized programs may load a constant more than once
+    constant_count = max((index + 1 for opcode, index in code if opcode == LOAD_CONST), default=0)
+    lines = ['def _program(k):']
+    if constant_count:
+        lines.append('    ' + ', '.join(f'k{i}' for i in range(constant_count)) + ', = k')
+    
+    operands: List[str] = []  # Local holding each value on the stack
+    for opcode, index in code:
+        if opcode == LOAD_CONST:
+            operands.append(f'k{index}')
+        elif opcode == LOAD_TEMP:
+            operands.append(f't{index}')
+        elif opcode == STORE_TEMP:
+            lines.append(f'    t{index} = {operands[-1]}')
+        elif opcode <= POS:
+            operand = operands.pop()
+            target = f's{len(operands)}'
+            lines.append(f'    {target} = {UNARY_SOURCE[opcode]}{operand}')
+            operands.append(target)
+        else:
+            right = operands.pop()
+            left = operands.pop()
+            target = f's{len(operands)}'
+            lines.append(f'    {target} = {left} {BINARY_SOURCE[opcode]} {right}')
+            operands.append(target)
+    
+    lines.append(f'    return {operands[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def generate_function(code: Tuple[Instruction, ...]) -> Callable[[tuple], Any]:
+    """
+    Compile generated source for code into a function of the constants tuple.
+    The function runs without builtins; division by zero raises ZeroDivisionError
+    exactly as the interpreter's operator.truediv does.
+    """
+    namespace: dict = {}
+    exec(compile(generate_source(code), '<program>', 'exec'), {'__builtins__': {}}, namespace)
+    return namespace['_program']
+
+
+def compile_tokens(tokens: List[str]) -> Program:
+    """
+    Compile a token list from tokenize() into a Program.
+    Accepts exactly the expressions the Pratt parser accepts, with the same
+    precedence and associativity, plus variable names (from tokenize() with
+    names). Raises ValueError for invalid expressions.
+    """
+    code: List[Instruction] = []
+    constants: List[object] = []
+    variables: List[Tuple[int, str]] = []
+    emit = code.append
+    ops: List[int] = []  # Pending operator opcodes and GROUP markers
+    expect_operand = True
+    
+    for token in tokens:
+        if expect_operand:
+            if token[0] in NUMBER_START:
+                emit((LOAD_CONST, len(constants)))
+                constants.append(parse_number(token))
+                _complete_operand(ops, emit)
+                expect_operand = False
+            elif token[0] in NAME_START:
+                # Variables take a constant slot, filled in when the program runs
+                variables.append((len(constants), token))
+                emit((LOAD_CONST, len(constants)))
+                constants.append(None)
+                _complete_operand(ops, emit)
+                expect_operand = False
+            elif token in UNARY_OPCODES:
+                # Unary operators bind tighter than any binary operator
+                ops.append(UNARY_OPCODES[token])
+            elif token == '(':
+                ops.append(GROUP)
+            else:
+                raise ValueError(f"Unexpected token: {token!r}")
+        elif token in BINARY_OPCODES:
+            # Left associative: emit pending operators of equal or higher precedence
+            precedence = BINARY_PRECEDENCE[token]
+            while ops and ops[-1] != GROUP and OPCODE_PRECEDENCE[ops[-1]] >= precedence:
+                emit((ops.pop(), None))
+            ops.append(BINARY_OPCODES[token])
+            expect_operand = True
+        elif token == ')':
+            while ops and ops[-1] != GROUP:
+                emit((ops.pop(), None))
+            if not ops:
+                raise ValueError("Unbalanced parentheses")
+            ops.pop()
+            _complete_operand(ops, emit)
+        else:
+            raise ValueError(f"Unexpected token: {token!r}")
+    
+    if expect_operand:
+        raise ValueError("Unexpected end of expression")
+    while ops:
+        opcode = ops.pop()
+        if opcode == GROUP:
+            raise ValueError("Unbalanced parentheses")
+        emit((opcode, None))
+    
+    return Program(code, constants, variables)
+
+
+def _complete_operand(ops: List[int], emit) -> None:
+    """Emit the unary operators waiting for an operand that was just completed."""
+    while ops and ops[-1] <= POS and ops[-1] != GROUP:
+        emit((ops.pop(), None))
+
+
+def compile_program(expression: str, names: bool = False) -> Program:
+    """Tokenize and compile expression into a Program; with names, it may use variables."""
+    return compile_tokens(tokenize(expression, names))
@@ -0,0 +1,58 @@
+"""
+Stream Evaluator
+Headless line-by-line expression evaluation for pipelines (no Qt required).
+"""
+
+import sys
+from typing import Iterable, Iterator, Optional, TextIO, Tuple
+
+from calculator_engine import CalculatorEngine
+
+
+# Output buffer size for headless result writing
+OUTPUT_BUFFER_SIZE = 1 << 16
+
+
+def read_expressions(stream: Iterable[str]) -> Iterator[str]:
+    """Yield expressions from a line stream, skipping blank lines."""
+    for line in stream:
+        expression = line.rstrip('\r\n')
+        if expression.strip():
+            yield expression
+
+
+def evaluate_stream(expressions: Iterable[str],
+                    engine: Optional[CalculatorEngine] = None) -> Iterator[Tuple[str, str]]:
+    """Yield (expression, result) pairs, evaluating lazily as they are consumed."""
+    if engine is None:
+        engine = CalculatorEngine()
+    for expression in expressions:
+        yield expression, engine.evaluate_expression(expression)
+
+
+def write_results(results: Iterable[Tuple[str, str]], out: TextIO) -> int:
+    """Write expression<TAB>result lines and return the number written."""
+    count = 0
+    write = out.write
+    for expression, result in results:
+        write(f"{expression}\t{result}\n")
+        count += 1
+    out.flush()
+    return count
+
+
+def run_headless(source: str, out: Optional[TextIO] = None,
+                 engine: Optional[CalculatorEngine] = None) -> int:
+    """
+    Evaluate every expression from source ('-' for stdin, otherwise a file path).
+    Memory use is constant regardless of input size.
+    """
+    if out is None:
+        out = open(sys.stdout.fileno(), 'w', encoding='utf-8',
+                   buffering=OUTPUT_BUFFER_SIZE, closefd=False)
+    
+    if source == '-':
+        return write_results(evaluate_stream(read_expressions(sys.stdin), engine), out)
+    
+    with open(source, 'r', encoding='utf-8') as f:
+        return write_results(evaluate_stream(read_expressions(f), engine), out)
@@ -0,0 +1,265 @@
+"""
+Vectorized Evaluator
+Batch evaluation that groups expressions by structure and evaluates each group with NumPy.
+
+Expressions such as "2*(3+4)" and "5*(1.5+2)" share a shape once their constants
+are taken out. Each expression is reduced to a template by regular expressions
+alone; every distinct template is parsed once, each shape is compiled once into
+a function over constant columns, and all rows of a group are evaluated in one
+pass of array operations.
+Results match CalculatorEngine.evaluate_expression exactly: division by zero is
+tracked per row with a mask, and rows whose integer arithmetic can't be done
+exactly in float64, or that adaptive arithmetic would recompute exactly, fall
+back to the scalar evaluator.
+"""
+
+import ast
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; batches fall back to scalar evaluation
+    np = None
+
+from calculator_engine import CalculatorEngine
+from expression_parser import parse_expression
+
+
+# Groups smaller than this are evaluated with the scalar evaluator
+VECTORIZE_THRESHOLD = 16
+
+# Integers at or above this magnitude are not exact in float64
+EXACT_INT_LIMIT = 2 ** 53
+
+# Template construction: digit runs become '9'; number tokens are digit and dot runs
+DIGITS_RE = re.compile(r'[0-9]+')
+NUMBER_RE = re.compile(r'[0-9.]+')
+# Integers with leading zeros are invalid, which a template can't show
+LEADING_ZERO_RE = re.compile(r'(?<![0-9.])0[0-9]')
+
+# Shape node kinds
+CONSTANT = 'c'
+UNARY = 'u'
+BINARY = 'b'
+
+# Shape of templates nested too deeply for the recursive shape walk
+SCALAR_ONLY = ('s',)
+
+# NumPy equivalents of CalculatorEngine.OPERATORS
+NUMPY_OPERATORS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.USub: np.negative,
+    ast.UAdd: np.positive,
+} if np is not None else {}
+
+
+def expression_shape(node, constants: List[Any]) -> tuple:
+    """
+    Return a hashable shape of an AST node with its constants taken out.
+    Constant values are appended to constants in evaluation order; the shape
+    keeps only their type, since int and float arithmetic differ.
+    Raises ValueError for nodes the engine can't evaluate.
+    """
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        constants.append(node.value)
+        return (CONSTANT, type(node.value))
+    elif isinstance(node, ast.UnaryOp) and type(node.op).__name__ in CalculatorEngine.OPERATORS:
+        return (UNARY, type(node.op), expression_shape(node.operand, constants))
+    elif isinstance(node, ast.BinOp) and type(node.op).__name__ in CalculatorEngine.OPERATORS:
+        left = expression_shape(node.left, constants)
+        right = expression_shape(node.right, constants)
+        return (BINARY, type(node.op), left, right)
+    else:
+        raise ValueError(f"Unsupported node type: {type(node)}")
+
+
+class _RowMasks:
+    """Per-row flags collected while evaluating a shape."""
+    
+    __slots__ = ('error', 'fallback')
+    
+    def __init__(self, rows: int):
+        """Initialize all-false masks."""
+        self.error = np.zeros(rows, dtype=bool)    # Division by zero
+        self.fallback = np.zeros(rows, dtype=bool)  # Rows left to the scalar evaluator
+
+
+def _constant_types(shape: tuple) -> List[bool]:
+    """List whether each constant of a shape is an integer, in evaluation order."""
+    if shape[0] == CONSTANT:
+        return [shape[1] is int]
+    return [is_int for child in shape[2:] for is_int in _constant_types(child)]
+
+
+def _shape_size(shape: tuple) -> int:
+    """Number of nodes in a shape, the same as the instructions of its stack program."""
+    if shape[0] == CONSTANT:
+        return 1
+    return 1 + sum(_shape_size(child) for child in shape[2:])
+
+
+def compile_shape(shape: tuple) -> Tuple[Callable, bool]:
+    """
+    Compile a shape into a function (columns, masks) -> values array.
+    Also returns whether the result is an integer, as it would be in Python.
+    """
+    column_count = [0]
+    
+    def build(shape):
+        kind = shape[0]
+        
+        if kind == CONSTANT:
+            index = column_count[0]
+            column_count[0] += 1
+            return (lambda columns, masks: columns[index]), shape[1] is int
+        
+        if kind == UNARY:
+            operand, is_int = build(shape[2])
+            func = NUMPY_OPERATORS[shape[1]]
+            return (lambda columns, masks: func(operand(columns, masks))), is_int
+        
+        op = shape[1]
+        left, left_int = build(shape[2])
+        right, right_int = build(shape[3])
+        func = NUMPY_OPERATORS[op]
+        
+        if op is ast.Div:
+            def evaluate(columns, masks):
+                a = left(columns, masks)
+                b = right(columns, masks)
+                zero = b == 0
+                masks.error |= zero
+                return func(a, np.where(zero, 1.0, b))
+            return evaluate, False
+        
+        if left_int and right_int:
+            def evaluate(columns, masks):
+                result = func(left(columns, masks), right(columns, masks))
+                masks.fallback |= np.abs(result) >= EXACT_INT_LIMIT
+                return result
+            return evaluate, True
+        
+        return (lambda columns, masks: func(left(columns, masks), right(columns, masks))), False
+    
+    return build(shape)
+
+
+def expression_template(expression: str) -> Tuple[Optional[str], List[str]]:
+    """
+    Split a stripped expression into its template and number tokens.
+    The template is the space-free expression with every digit run replaced by
+    '9', so it keeps the operators, parentheses and decimal points that decide
+    how the expression parses. Returns a None template for the rare inputs
+    whose validity depends on the digits themselves (leading zeros, dot runs).
+    """
+    clean = expression.replace(' ', '')
+    if '..' in clean or LEADING_ZERO_RE.search(clean):
+        return None, []
+    return DIGITS_RE.sub('9', clean), NUMBER_RE.findall(clean)
+
+
+def template_shape(template: str) -> tuple:
+    """Parse a template once and return its expression shape."""
+    return expression_shape(parse_expression(template), [])
+
+
+def evaluate_vectorized(expressions: Iterable[str],
+                        engine: Optional[CalculatorEngine] = None) -> List[str]:
+    """
+    Evaluate many expressions, returning results in input order.
+    Expressions are grouped by shape and each large enough group is evaluated
+    with NumPy; without NumPy, or in exact arithmetic mode, every expression
+    is evaluated individually.
+    """
+    if engine is None:
+        engine = CalculatorEngine()
+    expressions = list(expressions)
+    if np is None or engine.arithmetic == 'exact':
+        return [engine.evaluate_expression(expression) for expression in expressions]
+    
+    results: List[str] = ["?"] * len(expressions)
+    shapes: Dict[str, Optional[tuple]] = {}  # template -> shape, None if it doesn't parse
+    # shape -> (row indices, number tokens of each row)
+    groups: Dict[tuple, Tuple[List[int], List[List[str]]]] = {}
+    scalar_rows: List[int] = []
+    
+    for row, expression in enumerate(expressions):
+        if not expression or not expression.strip():
+            continue
+        template, numbers = expression_template(expression.strip())
+        if template is None:
+            scalar_rows.append(row)
+            continue
+        
+        if template in shapes:
+            shape = shapes[template]
+        else:
+            try:
+                shape = template_shape(template)
+            except ValueError:
+                shape = None
+            except RecursionError:
+                # The engine's stack machine has no depth limit
+                shape = SCALAR_ONLY
+            shapes[template] = shape
+        if shape is None:
+            continue
+        if shape is SCALAR_ONLY:
+            scalar_rows.append(row)
+            continue
+        
+        group = groups.get(shape)
+        if group is None:
+            group = groups[shape] = ([], [])
+        group[0].append(row)
+        group[1].append(numbers)
+    
+    for shape, (rows, number_rows) in groups.items():
+        if len(rows) < VECTORIZE_THRESHOLD:
+            scalar_rows.extend(rows)
+        else:
+            _evaluate_group(engine, shape, rows, number_rows, expressions, results)
+    
+    for row in scalar_rows:
+        results[row] = engine.evaluate_expression(expressions[row])
+    
+    return results
+
+
+def _evaluate_group(engine: CalculatorEngine, shape: tuple, rows: List[int],
+                    number_rows: List[List[str]], expressions: List[str],
+                    results: List[str]) -> None:
+    """Evaluate all rows of one shape with NumPy and store formatted results."""
+    func, is_int = compile_shape(shape)
+    masks = _RowMasks(len(rows))
+    
+    # Integer literals parse to exact floats only below EXACT_INT_LIMIT
+    columns = [np.array(numbers, dtype=np.float64) for numbers in zip(*number_rows)]
+    for column, column_int in zip(columns, _constant_types(shape)):
+        if column_int:
+            masks.fallback |= np.abs(column) >= EXACT_INT_LIMIT
+    
+    with np.errstate(all='ignore'):
+        values = func(columns, masks)
+        too_small = (np.abs(values) < engine.min_representable) & (values != 0)
+        if engine.arithmetic == 'adaptive' and not is_int:
+            # Same test as CalculatorEngine._needs_exact, element-wise
+            scaled = np.abs(values) * float(10 ** engine.max_decimal_places)
+            error = scaled * (_shape_size(shape) * engine.ADAPTIVE_ERROR_PER_INSTRUCTION)
+            masks.fallback |= (scaled < 1) | (np.abs(scaled % 1 - 0.5) <= error)
+    
+    convert = int if is_int else float
+    for index, row in enumerate(rows):
+        if masks.fallback[index]:
+            results[row] = engine.evaluate_expression(expressions[row])
+        elif masks.error[index]:
+            results[row] = "?"
+        elif too_small[index]:
+            results[row] = "Too Small"
+        else:
+            results[row] = engine._format_result(convert(values[index]))
+
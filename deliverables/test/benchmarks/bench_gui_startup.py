@@ -0,0 +1,92 @@
+"""
+GUI Startup Benchmark
+Measures time to first frame of the calculator window under the Qt offscreen platform.
+
+Usage (from deliverables/):
+    python test/benchmarks/bench_gui_startup.py [--runs N] [--history N]
+
+Each run starts a fresh interpreter that imports Qt and the app, builds the
+window and shows it, and reports milliseconds from interpreter start to the
+end of imports, of construction and of the window's first paint. The home
+directory is a temporary one holding a --history item history file, so the
+user's own history is never read.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+from bench_startup import SRC_DIR, import_env
+
+
+# Run in the child interpreter; prints one JSON object
+CHILD = """
+import time
+start = time.perf_counter()
+import json
+from PyQt6.QtWidgets import QApplication
+from calculator_app import CalculatorApp
+app = QApplication([])
+imported = time.perf_counter()
+window = CalculatorApp()
+constructed = time.perf_counter()
+timings = {}
+def on_first_frame():
+    timings['first_frame'] = time.perf_counter()
+    timings['history_loaded'] = window.history.loaded
+    app.quit()
+window.first_frame.connect(on_first_frame)
+window.show()
+app.exec()
+print(json.dumps({'imports': (imported - start) * 1000,
+                  'construct': (constructed - start) * 1000,
+                  'first_frame': (timings['first_frame'] - start) * 1000,
+                  'history_loaded_at_first_frame': timings['history_loaded']}))
+"""
+
+
+def measure_first_frame(runs: int = 5, history: int = 10) -> Dict[str, object]:
+    """
+    Start the app runs times (after one bytecode-warming run) and return the
+    timings of the run with the fastest first frame, in milliseconds.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        env = import_env(temp_dir)
+        env['QT_QPA_PLATFORM'] = 'offscreen'
+        env['HOME'] = temp_dir
+        with open(Path(temp_dir) / '.calculator_history.json', 'w', encoding='utf-8') as f:
+            for i in range(history):
+                f.write(json.dumps({'expression': f"{i}+1", 'result': str(i + 1)}) + "\n")
+        
+        best = None
+        for run in range(runs + 1):
+            completed = subprocess.run([sys.executable, '-c', CHILD], env=env, cwd=str(SRC_DIR),
+                                       capture_output=True, text=True, check=True, timeout=60)
+            if run == 0:
+                continue
+            timings = json.loads(completed.stdout.splitlines()[-1])
+            if best is None or timings['first_frame'] < best['first_frame']:
+                best = timings
+    return best
+
+
+def main(argv=None) -> int:
+    """Run the benchmark and print the best run's timings."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5, help="timed interpreter runs")
+    parser.add_argument('--history', type=int, default=10, help="items in the history file")
+    args = parser.parse_args(argv)
+    
+    timings = measure_first_frame(args.runs, args.history)
+    print(f"{'stage':<14}  {'ms since start':>14}")
+    for stage in ('imports', 'construct', 'first_frame'):
+        print(f"{stage:<14}  {timings[stage]:>14.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Parser Backend Benchmark
+Compares per-expression cost of the engine's parser backends against 'ast'.
+
+Usage (from deliverables/):
+    python test/benchmarks/bench_parser.py [--number N]
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / 'src'))
+
+from calculator_engine import CalculatorEngine
+
+
+# Representative expressions of increasing length
+EXPRESSIONS = [
+    "2+3",
+    "(2.5 + 1.5) * (3 - 1)",
+    "12.5*(3+4)/7-2(8+1)+((1.25-0.5)*4)/3",
+    "1+2*3-4/5+1+2*3-4/5+1+2*3-4/5+1+2*3-4/5+1+2*3-4/5+1+2*3-4/5+1",
+    "(" * 60 + "1" + "+1)" * 60,
+]
+
+
+def time_per_call(engine: CalculatorEngine, expression: str, number: int) -> float:
+    """Return best-of-five seconds per uncached evaluate_expression call."""
+    timer = timeit.Timer(lambda: engine.evaluate_expression(expression))
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def main(argv=None) -> int:
+    """Run the benchmark and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=2000, help="calls per timing run")
+    args = parser.parse_args(argv)
+    
+    # Disable the result cache so every call parses and evaluates
+    engines = {backend: CalculatorEngine(cache_size=0, backend=backend)
+               for backend in CalculatorEngine.BACKENDS}
+    
+    print(f"{'length':>6}" + ''.join(f"  {backend + ' (us)':>11}" for backend in engines) +
+          ''.join(f"  {backend + ' vs ast':>12}" for backend in engines if backend != 'ast'))
+    for expression in EXPRESSIONS:
+        results = {engine.evaluate_expression(expression) for engine in engines.values()}
+        assert len(results) == 1
+        times = {backend: time_per_call(engine, expression, args.number)
+                 for backend, engine in engines.items()}
+        print(f"{len(expression):>6}" + ''.join(f"  {t * 1e6:>11.2f}" for t in times.values()) +
+              ''.join(f"  {times['ast'] / t:>11.2f}x" for backend, t in times.items() if backend != 'ast'))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
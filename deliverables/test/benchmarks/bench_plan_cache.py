@@ -0,0 +1,103 @@
+"""
+Plan Cache Benchmark
+Compares compiling expressions from scratch against loading them from a plan cache file.
+
+Runs a seeded set of distinct expressions through an engine without plans
+and through one that loaded the plan file an earlier run saved, timing the
+compile step alone and whole evaluate_expression calls. Also reports the
+cost of loading and saving the file and its size.
+
+Usage (from deliverables/):
+    python test/benchmarks/bench_plan_cache.py [--expressions N] [--optimize]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / 'src'))
+
+from calculator_engine import CalculatorEngine
+
+
+def make_expressions(count: int, seed: int = 1):
+    """Distinct calculator expressions of 2 to 12 operations, some with parentheses and unary minus."""
+    rng = random.Random(seed)
+    expressions = set()
+    while len(expressions) < count:
+        parts = []
+        for _ in range(rng.randint(2, 12)):
+            number = str(rng.randint(0, 9999)) if rng.random() < 0.6 else f"{rng.randint(0, 999)}.{rng.randint(1, 99)}"
+            if rng.random() < 0.1:
+                number = '-' + number
+            if rng.random() < 0.2:
+                number = f"({number}{rng.choice('+-')}{rng.randint(1, 99)})"
+            parts.append(number + rng.choice('+-*/'))
+        expressions.add(''.join(parts) + str(rng.randint(1, 99)))
+    return sorted(expressions)
+
+
+def best_of(repeat: int, run) -> float:
+    """Return the fastest of repeat timed calls of run, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None) -> int:
+    """Run the benchmark and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--expressions', type=int, default=5000, help="distinct expressions per run")
+    parser.add_argument('--optimize', action='store_true', help="compile with the optimizer enabled")
+    parser.add_argument('--repeat', type=int, default=5, help="timing runs; the fastest is reported")
+    args = parser.parse_args(argv)
+    
+    expressions = make_expressions(args.expressions)
+    path = os.path.join(tempfile.mkdtemp(), 'plans.bin')
+    
+    def engine(plans: bool) -> CalculatorEngine:
+        # No result cache, so every call compiles; the plan cache must hold every expression
+        engine = CalculatorEngine(cache_size=0, optimize=args.optimize)
+        if plans:
+            engine.load_plans(path, max_plans=len(expressions))
+        return engine
+    
+    writer = engine(True)
+    expected = [writer.evaluate_expression(expression) for expression in expressions]
+    save = best_of(1, writer.save_plans)
+    reader = engine(True)
+    assert [reader.evaluate_expression(expression) for expression in expressions] == expected
+    
+    def compile_all(plans: bool):
+        compile_expression = engine(plans)._compile_expression
+        return lambda: [compile_expression(expression) for expression in expressions]
+    
+    def evaluate_all(plans: bool):
+        evaluate_expression = engine(plans).evaluate_expression
+        return lambda: [evaluate_expression(expression) for expression in expressions]
+    
+    count = len(expressions)
+    print(f"{count} expressions, plan file {os.path.getsize(path) / 1024:.0f} KiB "
+          f"({os.path.getsize(path) / count:.0f} bytes per plan)")
+    print(f"  load file   {best_of(args.repeat, lambda: engine(True)) * 1e3:8.2f} ms")
+    print(f"  save file   {save * 1e3:8.2f} ms")
+    print(f"{'':14}{'parse (us)':>11}  {'plans (us)':>11}  {'speedup':>8}")
+    for name, make_run in [('compile', compile_all), ('evaluate', evaluate_all)]:
+        parse = best_of(args.repeat, make_run(False)) / count
+        plans = best_of(args.repeat, make_run(True)) / count
+        print(f"  {name:<12}{parse * 1e6:>11.2f}  {plans * 1e6:>11.2f}  {parse / plans:>7.2f}x")
+    
+    os.unlink(path)
+    os.rmdir(os.path.dirname(path))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
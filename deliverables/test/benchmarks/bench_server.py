@@ -0,0 +1,133 @@
+"""
+Evaluation Server Benchmark
+Measures request throughput and latency of main.py --serve under pipelined load.
+
+Usage (from deliverables/):
+    python test/benchmarks/bench_server.py [--clients N] [--requests N] [--window N]
+
+The server runs in its own process. Each client keeps --window requests in
+flight, sending a new one for every response, so latency measures time spent
+in the server rather than in an unbounded client-side backlog.
+"""
+
+import argparse
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_suite import percentile
+
+
+MAIN = Path(__file__).resolve().parent.parent.parent / 'src' / 'main.py'
+
+
+def free_port() -> int:
+    """Pick an unused local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def request_lines(count: int, offset: int) -> List[bytes]:
+    """Build count encoded requests with varied expressions."""
+    return [b'{"id": %d, "expression": "%d*3+%d/7-(%d.5)"}\n' % (i, i % 97, i % 13, i % 11)
+            for i in range(offset, offset + count)]
+
+
+async def run_client(host: str, port: int, lines: List[bytes], window: int,
+                     latencies: List[float]) -> None:
+    """Send lines with at most window requests in flight, recording each latency."""
+    reader, writer = await asyncio.open_connection(host, port)
+    clock = time.perf_counter
+    sent_at: deque = deque()
+    next_line = 0
+    received = 0
+    
+    def send(count: int) -> None:
+        nonlocal next_line
+        end = min(len(lines), next_line + count)
+        now = clock()
+        writer.write(b''.join(lines[next_line:end]))
+        sent_at.extend([now] * (end - next_line))
+        next_line = end
+    
+    send(window)
+    while received < len(lines):
+        data = await reader.read(1 << 16)
+        if not data:
+            raise ConnectionError("Server closed the connection")
+        # Responses are single-line JSON, so newlines count responses
+        answered = data.count(b'\n')
+        now = clock()
+        for _ in range(answered):
+            latencies.append(now - sent_at.popleft())
+        received += answered
+        send(answered)
+    
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_load(host: str, port: int, clients: int, requests: int, window: int) -> Dict[str, float]:
+    """Run concurrent clients and return throughput and latency percentiles."""
+    latencies: List[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port, request_lines(requests, i * requests), window, latencies)
+                           for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    
+    latencies.sort()
+    return {
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': latencies[-1] * 1000,
+    }
+
+
+def start_server(port: int) -> subprocess.Popen:
+    """Start main.py --serve on port and wait until it accepts connections."""
+    process = subprocess.Popen([sys.executable, str(MAIN), '--serve', f'127.0.0.1:{port}'],
+                               stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("Server did not start")
+
+
+def main(argv=None) -> int:
+    """Run the benchmark and print throughput and latency."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=8, help="concurrent connections")
+    parser.add_argument('--requests', type=int, default=20000, help="requests per connection")
+    parser.add_argument('--window', type=int, default=256, help="requests in flight per connection")
+    args = parser.parse_args(argv)
+    
+    port = free_port()
+    server = start_server(port)
+    try:
+        result = asyncio.run(run_load('127.0.0.1', port, args.clients, args.requests, args.window))
+    finally:
+        server.terminate()
+        server.wait()
+    
+    print(f"{args.clients} clients x {args.requests} requests, window {args.window}")
+    print(f"throughput {result['throughput']:.0f} req/s  p50 {result['p50_ms']:.2f} ms  "
+          f"p99 {result['p99_ms']:.2f} ms  max {result['max_ms']:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Startup Time Benchmark
+Measures cold import time of the calculator modules with python -X importtime.
+
+Usage (from deliverables/):
+    python test/benchmarks/bench_startup.py [--runs N] [module ...]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SRC_DIR = Path(__file__).resolve().parent.parent.parent / 'src'
+
+# Modules measured when none are given on the command line
+DEFAULT_MODULES = ['calculator_engine', 'history_manager', 'stream_evaluator']
+
+
+def import_env(cache_dir: str) -> Dict[str, str]:
+    """Environment for a child interpreter that caches bytecode in cache_dir."""
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    env['PYTHONPYCACHEPREFIX'] = cache_dir
+    env['PYTHONPATH'] = str(SRC_DIR)
+    return env
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """Map each module in -X importtime output to its cumulative microseconds."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def measure_import(module: str, runs: int = 5, cache_dir: Optional[str] = None) -> Dict[str, object]:
+    """
+    Import module in fresh interpreters and return the best cumulative import
+    time in microseconds plus the modules the import loaded.
+    The first run only warms the bytecode cache, as an installed package would be.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        env = import_env(cache_dir or temp_dir)
+        code = f"import sys; before = set(sys.modules); import {module}; print(*sorted(set(sys.modules) - before))"
+        
+        best = None
+        loaded: List[str] = []
+        for run in range(runs + 1):
+            completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                                       env=env, capture_output=True, text=True, check=True)
+            if run == 0:
+                continue
+            cumulative = parse_importtime(completed.stderr)[module]
+            if best is None or cumulative < best:
+                best = cumulative
+            loaded = completed.stdout.split()
+    
+    return {'module': module, 'microseconds': best, 'loaded': loaded}
+
+
+def main(argv=None) -> int:
+    """Run the benchmark and print one line per module."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5, help="timed interpreter runs per module")
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    args = parser.parse_args(argv)
+    
+    print(f"{'module':<20}  {'import (ms)':>11}  {'modules loaded':>14}")
+    for module in args.modules:
+        result = measure_import(module, args.runs)
+        print(f"{module:<20}  {result['microseconds'] / 1000:>11.2f}  {len(result['loaded']):>14}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Performance Benchmark Suite
+Measures engine, history and input-formatting costs and compares them to a JSON baseline.
+
+Usage (from deliverables/):
+    python test/benchmarks/bench_suite.py --save baseline.json
+    python test/benchmarks/bench_suite.py --compare baseline.json [--threshold 0.2]
+
+--compare exits with status 1 when any metric is worse than the baseline by
+more than the threshold (a fraction, 0.2 = 20%).
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / 'src'))
+
+from calculator_engine import CalculatorEngine
+from history_manager import HistoryManager
+from history_store import SharedHistoryStore
+
+
+# Default workload sizes
+EXPRESSION_LENGTHS = [4, 16, 64, 256]
+NESTING_DEPTHS = [1, 8, 32, 64]
+HISTORY_SIZES = [10, 1000, 100000]
+INPUT_LENGTHS = [1, 16, 60]
+
+# Metrics where a larger value is an improvement; all others are costs
+HIGHER_IS_BETTER = {'throughput'}
+
+Results = Dict[str, Dict[str, float]]
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def time_calls(func: Callable[[], object], calls: int) -> Dict[str, float]:
+    """Time calls to func, returning throughput and p50/p99 latency in microseconds."""
+    latencies = []
+    clock = time.perf_counter_ns
+    start = clock()
+    for _ in range(calls):
+        before = clock()
+        func()
+        latencies.append(clock() - before)
+    elapsed = clock() - start
+    
+    latencies.sort()
+    return {
+        'throughput': calls / (elapsed / 1e9),
+        'p50_us': percentile(latencies, 0.50) / 1000,
+        'p99_us': percentile(latencies, 0.99) / 1000,
+    }
+
+
+def chain_expression(terms: int, rng: random.Random) -> str:
+    """Build a flat expression with the given number of terms."""
+    parts = [f"{rng.randint(1, 999)}.{rng.randint(0, 99)}"]
+    for _ in range(terms - 1):
+        parts.append(rng.choice('+-*/'))
+        parts.append(f"{rng.randint(1, 999)}.{rng.randint(0, 99)}")
+    return ''.join(parts)
+
+
+def nested_expression(depth: int) -> str:
+    """Build an expression with the given parenthesis nesting depth."""
+    return '(' * depth + '1.5' + ''.join(f"+{i % 9 + 1})" for i in range(depth))
+
+
+def bench_evaluate(calls: int, lengths: List[int], depths: List[int]) -> Results:
+    """Uncached evaluate_expression cost across expression lengths and nesting depths."""
+    engine = CalculatorEngine(cache_size=0)
+    rng = random.Random(0)
+    results = {}
+    
+    for terms in lengths:
+        expression = chain_expression(terms, rng)
+        results[f"evaluate/terms={terms}"] = time_calls(lambda: engine.evaluate_expression(expression), calls)
+    for depth in depths:
+        expression = nested_expression(depth)
+        results[f"evaluate/depth={depth}"] = time_calls(lambda: engine.evaluate_expression(expression), calls)
+    return results
+
+
+def bench_history(calls: int, sizes: List[int]) -> Results:
+    """save_calculation and load_history cost across history sizes, with the default (shared log) store."""
+    results = {}
+    
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / 'history.json'
+            history = HistoryManager(max_items=size, store=SharedHistoryStore(path))
+            for i in range(size):
+                history.save_calculation(f"{i} + 1", str(i + 1))
+            
+            counter = iter(range(size, size + calls))
+            results[f"history_save/size={size}"] = time_calls(
+                lambda: history.save_calculation(f"{next(counter)} + 1", "0"), calls)
+            results[f"history_load/size={size}"] = time_calls(
+                history.load_history, max(1, min(calls, 200000 // size)))
+    return results
+
+
+def bench_format_input(calls: int, lengths: List[int]) -> Results:
+    """format_number_input cost for a decimal point after inputs of various lengths."""
+    engine = CalculatorEngine()
+    results = {}
+    
+    for length in lengths:
+        current = ('12+' * length)[:length]
+        results[f"format_input/length={length}"] = time_calls(
+            lambda: engine.format_number_input(current, '.'), calls)
+    return results
+
+
+def run_suite(calls: int = 2000, quick: bool = False) -> Results:
+    """Run every benchmark; quick uses the smallest workloads only."""
+    lengths = EXPRESSION_LENGTHS[:2] if quick else EXPRESSION_LENGTHS
+    depths = NESTING_DEPTHS[:2] if quick else NESTING_DEPTHS
+    sizes = HISTORY_SIZES[:2] if quick else HISTORY_SIZES
+    inputs = INPUT_LENGTHS[:2] if quick else INPUT_LENGTHS
+    
+    results = {}
+    results.update(bench_evaluate(calls, lengths, depths))
+    results.update(bench_history(calls, sizes))
+    results.update(bench_format_input(calls, inputs))
+    return results
+
+
+def compare(baseline: Results, current: Results, threshold: float) -> List[str]:
+    """
+    Compare results to a baseline.
+    Returns a description of every metric worse than the baseline by more than threshold.
+    """
+    regressions = []
+    for name, metrics in current.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(name, {}).get(metric)
+            if not reference:
+                continue
+            if metric in HIGHER_IS_BETTER:
+                change = (reference - value) / reference
+            else:
+                change = (value - reference) / reference
+            if change > threshold:
+                regressions.append(f"{name} {metric}: {reference:.4g} -> {value:.4g} ({change:+.0%} worse)")
+    return regressions
+
+
+def print_results(results: Results) -> None:
+    """Print results as a table."""
+    print(f"{'benchmark':<28}  {'ops/s':>12}  {'p50 (us)':>10}  {'p99 (us)':>10}")
+    for name, metrics in results.items():
+        print(f"{name:<28}  {metrics['throughput']:>12.0f}  {metrics['p50_us']:>10.2f}  {metrics['p99_us']:>10.2f}")
+
+
+def main(argv=None) -> int:
+    """Run the suite, then save and/or compare results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, default=2000, help="timed calls per benchmark")
+    parser.add_argument('--quick', action='store_true', help="run only the smallest workloads")
+    parser.add_argument('--save', metavar='FILE', help="write results to a JSON baseline")
+    parser.add_argument('--compare', metavar='FILE', help="compare results to a JSON baseline")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="allowed fractional regression for --compare (default 0.2)")
+    args = parser.parse_args(argv)
+    
+    results = run_suite(args.calls, args.quick)
+    print_results(results)
+    
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""
+Differential Fuzz Harness
+Checks alternative evaluator paths against evaluate_expression on generated expressions.
+
+Usage (from deliverables/):
+    python test/benchmarks/fuzz_differential.py [--cases N] [--seed N] [--arithmetic MODE]
+
+Expressions come from a seeded grammar over the calculator's input alphabet:
+integers and decimals of every length (including leading zeros, a bare
+leading or trailing dot, values too small to show and integers too large
+for a float), unary sign chains, parentheses, implicit multiplication and
+stray spaces, with a share of them mutated into near-misses so the "?"
+paths are exercised as much as the valid ones. Every candidate evaluates the
+same batches as the reference (the 'ast' backend, uncached) and must return
+identical strings. A mismatch is shrunk to a minimal expression that still
+disagrees, and the run reports evaluations per second for each candidate.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / 'src'))
+
+from calculator_engine import CalculatorEngine
+from calculator_session import CalculatorSession
+from incremental_evaluator import IncrementalEvaluator
+from vectorized_evaluator import evaluate_vectorized
+
+
+# A candidate evaluates a batch of expressions, returning results in order
+Evaluator = Callable[[List[str]], List[str]]
+
+# Expressions evaluated per batch by every candidate
+BATCH_SIZE = 1000
+
+# While shrinking, a case that doesn't fail on its own is evaluated this many
+# times in one batch, enough to reach the compiled tier and vectorized grouping
+SHRINK_REPEAT = 40
+
+# Characters inserted by mutations
+ALPHABET = '0123456789+-*/.() '
+
+
+class ExpressionGenerator:
+    """Seeded grammar-based generator of calculator input, valid and nearly valid."""
+    
+    def __init__(self, seed: int = 0, max_depth: int = 4, mutation_rate: float = 0.15):
+        """Initialize generator; the same seed always gives the same expressions."""
+        self.rng = random.Random(seed)
+        self.max_depth = max_depth
+        self.mutation_rate = mutation_rate
+    
+    def expression(self) -> str:
+        """Generate one expression."""
+        text = self._sum(self.max_depth)
+        if self.rng.random() < self.mutation_rate:
+            text = self._mutate(text)
+        return text
+    
+    def batch(self, count: int) -> List[str]:
+        """Generate count expressions."""
+        return [self.expression() for _ in range(count)]
+    
+    def _space(self) -> str:
+        """Usually nothing, sometimes spaces between tokens."""
+        return ' ' * self.rng.choice((1, 2)) if self.rng.random() < 0.1 else ''
+    
+    def _sum(self, depth: int) -> str:
+        """Operands joined by binary operators."""
+        rng = self.rng
+        parts = [self._operand(depth)]
+        for _ in range(rng.choice((0, 0, 1, 1, 2, 3)) if depth > 0 else 0):
+            parts.append(self._space() + rng.choice('+-*/') + self._space())
+            parts.append(self._operand(depth))
+        return ''.join(parts)
+    
+    def _operand(self, depth: int) -> str:
+        """
+        Optional unary signs (mostly minus; plus is rejected after most
+        tokens), then atoms, more than one meaning implicit multiplication.
+        """
+        rng = self.rng
+        signs = ''.join(rng.choice('-----+') for _ in range(rng.choice((0, 0, 0, 0, 0, 0, 1, 1, 2))))
+        atoms = [self._atom(depth)]
+        if rng.random() < 0.1:
+            # Implicit multiplication needs a parenthesized group on one side
+            group = '(' + self._sum(depth - 1) + ')'
+            atoms.append(group)
+            if rng.random() < 0.3:
+                atoms.append(self._number())
+        return signs + ''.join(atoms)
+    
+    def _atom(self, depth: int) -> str:
+        """A number or a parenthesized expression."""
+        if depth > 0 and self.rng.random() < 0.3:
+            return '(' + self._space() + self._sum(depth - 1) + self._space() + ')'
+        return self._number()
+    
+    def _number(self) -> str:
+        """A number literal, favoring the edge cases of parsing and formatting."""
+        rng = self.rng
+        kind = rng.random()
+        if kind < 0.4:
+            return str(rng.randint(0, 20))
+        if kind < 0.62:
+            return f"{rng.randint(0, 999)}.{rng.randint(0, 10 ** rng.randint(1, 6))}"
+        if kind < 0.72:
+            return str(rng.randint(1, 10 ** rng.randint(8, 22)))  # Some not exact as floats
+        if kind < 0.79:
+            return '0.' + '0' * rng.randint(5, 12) + str(rng.randint(1, 9))  # Near "Too Small"
+        if kind < 0.87:
+            return rng.choice(('0.1', '0.2', '0.3', '1.005', '2.675', '0.5', '1.15', '.5', '5.', '10.0'))
+        if kind < 0.9:
+            return rng.choice(('007', '00', '.', '1..2', '2.5.1'))  # Rejected or collapsed
+        if kind < 0.99:
+            return str(rng.randint(1, 9)) + '0' * rng.randint(15, 40)
+        return '9' * rng.randint(300, 400)  # Beyond the float range
+    
+    def _mutate(self, text: str) -> str:
+        """Delete, insert, duplicate or swap one character."""
+        rng = self.rng
+        if not text:
+            return rng.choice(ALPHABET)
+        position = rng.randrange(len(text))
+        kind = rng.randrange(4)
+        if kind == 0:
+            return text[:position] + text[position + 1:]
+        if kind == 1:
+            return text[:position] + rng.choice(ALPHABET) + text[position:]
+        if kind == 2:
+            return text[:position] + text[position] + text[position:]
+        if position + 1 < len(text):
+            return text[:position] + text[position + 1] + text[position] + text[position + 2:]
+        return text
+
+
+def reference_evaluator(arithmetic: str = 'adaptive') -> Evaluator:
+    """The reference: the 'ast' backend without a result cache."""
+    engine = CalculatorEngine(cache_size=0, backend='ast', arithmetic=arithmetic)
+    return lambda expressions: [engine.evaluate_expression(expression) for expression in expressions]
+
+
+def engine_candidates(arithmetic: str = 'adaptive') -> Dict[str, Evaluator]:
+    """Every alternative evaluation path, configured for arithmetic, by name."""
+    def scalar(engine: CalculatorEngine) -> Evaluator:
+        return lambda expressions: [engine.evaluate_expression(expression) for expression in expressions]
+    
+    def compiled(**options) -> CalculatorEngine:
+        engine = CalculatorEngine(arithmetic=arithmetic, **options)
+        engine.tier_threshold = 1  # Generated code from the first evaluation of a shape
+        return engine
+    
+    incremental = IncrementalEvaluator(CalculatorEngine(arithmetic=arithmetic))
+    session = CalculatorSession(CalculatorEngine(arithmetic=arithmetic, optimize=True))
+    vectorized_engine = CalculatorEngine(arithmetic=arithmetic)
+    return {
+        'pratt': scalar(CalculatorEngine(backend='pratt', arithmetic=arithmetic)),
+        'stack': scalar(CalculatorEngine(arithmetic=arithmetic)),
+        'stack-optimized': scalar(CalculatorEngine(arithmetic=arithmetic, optimize=True)),
+        'stack-compiled': scalar(compiled()),
+        'stack-optimized-compiled': scalar(compiled(optimize=True)),
+        'incremental': lambda expressions: [incremental.evaluate(expression) for expression in expressions],
+        'vectorized': lambda expressions: evaluate_vectorized(expressions, vectorized_engine),
+        'session': lambda expressions: [session.execute(expression) for expression in expressions],
+    }
+
+
+def shrink(expression: str, fails: Callable[[str], bool]) -> str:
+    """
+    Reduce expression to a shorter one for which fails still holds: number
+    literals are replaced by simpler ones, then chunks of characters are
+    removed, largest first, until neither makes progress.
+    """
+    current = expression
+    changed = True
+    while changed:
+        changed = False
+        for replacement in ('1', '0', '2'):
+            start = 0
+            while start < len(current):
+                if not current[start].isdigit():
+                    start += 1
+                    continue
+                end = start
+                while end < len(current) and (current[end].isdigit() or current[end] == '.'):
+                    end += 1
+                candidate = current[:start] + replacement + current[end:]
+                if len(candidate) < len(current) or candidate < current:
+                    if fails(candidate):
+                        current = candidate
+                        changed = True
+                start += 1
+        
+        chunk = max(1, len(current) // 2)
+        while chunk >= 1:
+            start = 0
+            while start < len(current):
+                candidate = current[:start] + current[start + chunk:]
+                if candidate and fails(candidate):
+                    current = candidate
+                    changed = True
+                else:
+                    start += chunk
+            chunk //= 2
+    return current
+
+
+def run_differential(cases: int, seed: int = 0, arithmetic: str = 'adaptive',
+                     candidates: Optional[Dict[str, Evaluator]] = None,
+                     reference: Optional[Evaluator] = None,
+                     max_failures: int = 10) -> Dict[str, object]:
+    """
+    Evaluate cases generated expressions with reference and every candidate
+    (engine_candidates() by default) and compare the results.
+    Returns a report: 'cases' run, 'throughput' (evaluations per second by
+    name, the reference under 'reference') and 'failures', a list of dicts
+    with the candidate, the generated 'expression' and its 'shrunk' form and
+    both results for the shrunk form. Comparison of a candidate stops at its
+    first failure, and the run at max_failures.
+    """
+    if candidates is None:
+        candidates = engine_candidates(arithmetic)
+    if reference is None:
+        reference = reference_evaluator(arithmetic)
+    generator = ExpressionGenerator(seed)
+    
+    seconds = {name: 0.0 for name in ['reference', *candidates]}
+    active = dict(candidates)
+    failures: List[Dict[str, str]] = []
+    done = 0
+    while done < cases and active and len(failures) < max_failures:
+        batch = generator.batch(min(BATCH_SIZE, cases - done))
+        start = time.perf_counter()
+        expected = reference(batch)
+        seconds['reference'] += time.perf_counter() - start
+        
+        for name, evaluate in list(active.items()):
+            start = time.perf_counter()
+            actual = evaluate(batch)
+            seconds[name] += time.perf_counter() - start
+            if actual == expected:
+                continue
+            row = next(i for i, (want, got) in enumerate(zip(expected, actual)) if want != got)
+            failures.append(_failure(name, batch[row], evaluate, reference))
+            del active[name]
+        done += len(batch)
+    
+    throughput = {name: (done / total if total > 0 else float('inf')) for name, total in seconds.items()}
+    return {'cases': done, 'seed': seed, 'arithmetic': arithmetic,
+            'throughput': throughput, 'failures': failures}
+
+
+def _failure(name: str, expression: str, evaluate: Evaluator, reference: Evaluator) -> Dict[str, str]:
+    """Shrink a mismatching expression and describe it."""
+    repeat = 1
+    
+    def fails(text: str) -> bool:
+        try:
+            return evaluate([text] * repeat) != reference([text] * repeat)
+        except Exception:
+            return True  # A candidate raising where the reference returns is a failure too
+    
+    if not fails(expression):
+        # Only wrong once a shape is compiled or grouped, or in its batch
+        repeat = SHRINK_REPEAT
+    shrunk = shrink(expression, fails) if fails(expression) else expression
+    try:
+        actual = evaluate([shrunk])[0]
+    except Exception as e:
+        actual = f"raised {type(e).__name__}: {e}"
+    return {'candidate': name, 'expression': expression, 'shrunk': shrunk,
+            'expected': reference([shrunk])[0], 'actual': actual}
+
+
+def main(argv=None) -> int:
+    """Run the harness; print throughput and failures, exit 1 if any candidate disagreed."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--cases', type=int, default=100000, help="expressions to generate")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--arithmetic', choices=CalculatorEngine.ARITHMETIC_MODES, default='adaptive')
+    args = parser.parse_args(argv)
+    
+    report = run_differential(args.cases, args.seed, args.arithmetic)
+    print(f"{report['cases']} cases, seed {report['seed']}, {report['arithmetic']} arithmetic")
+    print(f"{'evaluator':<26}  {'evals/s':>10}")
+    for name, rate in report['throughput'].items():
+        print(f"{name:<26}  {rate:>10.0f}")
+    for failure in report['failures']:
+        print(f"\n{failure['candidate']}: {failure['shrunk']!r} gave {failure['actual']!r}, "
+              f"expected {failure['expected']!r} (from {failure['expression']!r})")
+    return 1 if report['failures'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
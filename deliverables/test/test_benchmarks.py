@@ -0,0 +1,61 @@
+"""
+Test Benchmarks
+Tests for the benchmark suite's measurement and baseline comparison.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / 'benchmarks'))
+import bench_suite
+
+
+class TestBenchmarkSuite:
+    """Test cases for the benchmark suite."""
+    
+    def test_percentile(self):
+        """Test nearest-rank percentiles."""
+        values = list(range(1, 101))
+        assert bench_suite.percentile(values, 0.50) == 50
+        assert bench_suite.percentile(values, 0.99) == 99
+        assert bench_suite.percentile([7], 0.99) == 7
+    
+    def test_compare_flags_regressions(self):
+        """Test costs that rise and throughput that falls beyond threshold are reported."""
+        baseline = {'evaluate/terms=4': {'throughput': 1000, 'p50_us': 10.0, 'p99_us': 20.0}}
+        current = {'evaluate/terms=4': {'throughput': 700, 'p50_us': 10.5, 'p99_us': 30.0}}
+        
+        regressions = bench_suite.compare(baseline, current, threshold=0.2)
+        assert len(regressions) == 2
+        assert any('throughput' in r for r in regressions)
+        assert any('p99_us' in r for r in regressions)
+    
+    def test_compare_ignores_improvements_and_new_benchmarks(self):
+        """Test faster results and benchmarks missing from the baseline pass."""
+        baseline = {'evaluate/terms=4': {'throughput': 1000, 'p50_us': 10.0, 'p99_us': 20.0}}
+        current = {'evaluate/terms=4': {'throughput': 5000, 'p50_us': 2.0, 'p99_us': 4.0},
+                   'evaluate/terms=16': {'throughput': 1, 'p50_us': 999.0, 'p99_us': 999.0}}
+        assert bench_suite.compare(baseline, current, threshold=0.2) == []
+    
+    def test_save_and_compare(self, tmp_path, monkeypatch):
+        """Test a saved baseline round-trips through --compare."""
+        results = {'format_input/length=1': {'throughput': 1000.0, 'p50_us': 1.0, 'p99_us': 2.0}}
+        monkeypatch.setattr(bench_suite, 'run_suite', lambda calls, quick: results)
+        baseline = tmp_path / 'baseline.json'
+        
+        assert bench_suite.main(['--save', str(baseline)]) == 0
+        assert json.loads(baseline.read_text()) == results
+        assert bench_suite.main(['--compare', str(baseline)]) == 0
+        
+        results['format_input/length=1']['p50_us'] = 5.0
+        assert bench_suite.main(['--compare', str(baseline)]) == 1
+    
+    def test_quick_suite_runs(self):
+        """Test the quick suite measures every benchmark family."""
+        results = bench_suite.run_suite(calls=3, quick=True)
+        families = {name.split('/')[0] for name in results}
+        assert families == {'evaluate', 'history_save', 'history_load', 'format_input'}
+        assert all(metrics['p50_us'] <= metrics['p99_us'] for metrics in results.values())
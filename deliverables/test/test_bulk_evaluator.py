@@ -0,0 +1,108 @@
+"""
+Test Bulk Evaluator
+Tests for memory-mapped, multi-process evaluation of expression files.
+"""
+
+import math
+import os
+import tempfile
+
+import pytest
+from src import bulk_evaluator
+from src.bulk_evaluator import (STATUS_BLANK, STATUS_ERROR, STATUS_OK, evaluate_file,
+                                iter_blocks, read_binary_results, split_ranges)
+from src.calculator_engine import CalculatorEngine
+from src.stream_evaluator import evaluate_stream, read_expressions
+
+
+LINES = ["2 + 3", "", "5 / 0", "1 / 3", "(2)(3)", "   ", "0.1+0.2", "abc", "-7*2.5"]
+
+
+class TestBulkEvaluator:
+    """Test cases for bulk file evaluation."""
+    
+    def setup_method(self):
+        """Setup test fixtures with temporary input and output paths."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_path = os.path.join(self.temp_dir, 'input.txt')
+        self.output_path = os.path.join(self.temp_dir, 'output')
+    
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        for name in os.listdir(self.temp_dir):
+            os.unlink(os.path.join(self.temp_dir, name))
+        os.rmdir(self.temp_dir)
+    
+    def write_input(self, lines, ending="\n"):
+        """Write lines to the input file."""
+        with open(self.input_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(ending.join(lines) + ending)
+    
+    def test_split_ranges(self):
+        """Test ranges cover the data exactly and end on line boundaries."""
+        data = b"".join(b"%d+%d\n" % (i, i) for i in range(1000)) + b"7"
+        for parts in [1, 2, 7, 50, 5000]:
+            ranges = split_ranges(data, parts)
+            assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+            assert len(ranges) <= parts
+            for (_, end), (start, _) in zip(ranges, ranges[1:]):
+                assert end == start and data[end - 1:end] == b"\n"
+        assert split_ranges(b"1+1", 4) == [(0, 3)]
+    
+    def test_iter_blocks(self):
+        """Test blocks hold whole lines, including lines longer than a block."""
+        data = b"1\n" + b"2" * 50 + b"\n3\n4"
+        blocks = list(iter_blocks(data, 0, len(data), block_size=8))
+        assert b"".join(blocks) == data
+        assert all(block.endswith(b"\n") for block in blocks[:-1])
+        assert b"2" * 50 + b"\n" in blocks
+    
+    def test_text_output_matches_stream(self):
+        """Test text output is what `--eval` prints for the same file."""
+        self.write_input(LINES, "\r\n")
+        counts = evaluate_file(self.input_path, self.output_path, workers=1)
+        with open(self.output_path, encoding='utf-8') as f:
+            output = f.read()
+        expected = ''.join(f"{e}\t{r}\n" for e, r in evaluate_stream(read_expressions(LINES)))
+        assert output == expected
+        assert counts == {'expressions': 7, 'errors': 2, 'ranges': 1}
+    
+    def test_binary_output(self):
+        """Test binary output has one record per input line."""
+        self.write_input(LINES)
+        counts = evaluate_file(self.input_path, self.output_path, 'binary', workers=1)
+        records = list(read_binary_results(self.output_path))
+        assert len(records) == len(LINES)
+        assert [status for _, status in records] == [
+            STATUS_OK, STATUS_BLANK, STATUS_ERROR, STATUS_OK, STATUS_OK,
+            STATUS_BLANK, STATUS_OK, STATUS_ERROR, STATUS_OK]
+        assert records[0][0] == 5.0 and records[3][0] == 1 / 3 and records[8][0] == -17.5
+        assert math.isnan(records[2][0])
+        assert counts['expressions'] == 7 and counts['errors'] == 2
+    
+    def test_parallel_matches_in_process(self, monkeypatch):
+        """Test results from worker processes are joined in input order."""
+        monkeypatch.setattr(bulk_evaluator, 'PARALLEL_MIN_BYTES', 0)
+        monkeypatch.setattr(bulk_evaluator, 'MIN_RANGE_BYTES', 64)
+        lines = [f"{i}*{i % 7}/({i % 5}-2)" for i in range(3000)] + ["", "1/"]
+        self.write_input(lines)
+        engine = CalculatorEngine(optimize=True)
+        
+        for output_format in bulk_evaluator.FORMATS:
+            expected_path = self.output_path + '.expected'
+            expected = evaluate_file(self.input_path, expected_path, output_format, 1, engine)
+            counts = evaluate_file(self.input_path, self.output_path, output_format, 3, engine)
+            assert counts['ranges'] > 3
+            assert counts['expressions'] == expected['expressions'] == 3001
+            assert counts['errors'] == expected['errors']
+            with open(self.output_path, 'rb') as f, open(expected_path, 'rb') as g:
+                assert f.read() == g.read()
+        assert not [name for name in os.listdir(self.temp_dir) if name.endswith('.part')]
+    
+    def test_empty_and_unknown_format(self):
+        """Test an empty input gives an empty output and bad formats are rejected."""
+        open(self.input_path, 'w').close()
+        assert evaluate_file(self.input_path, self.output_path)['expressions'] == 0
+        assert os.path.getsize(self.output_path) == 0
+        with pytest.raises(ValueError):
+            evaluate_file(self.input_path, self.output_path, 'csv')
@@ -126,4 +126,146 @@ class TestCalculatorEngine:
         """Test implicit multiplication handling."""
         assert self.engine.evaluate_expression("2(3)") == "6"
         assert self.engine.evaluate_expression("(2)(3)") == "6"
-        assert self.engine.evaluate_expression("2(3+4)") == "14"
\ No newline at end of file
+        assert self.engine.evaluate_expression("2(3+4)") == "14"
+    
+    def test_cache_hits_and_misses(self):
+        """Test repeated expressions are served from the cache."""
+        assert self.engine.evaluate_expression("2 + 3") == "5"
+        assert self.engine.evaluate_expression("2+3") == "5"  # Same normalized key
+        assert self.engine.evaluate_expression(" 2 +  3 ") == "5"
+        
+        info = self.engine.cache_info()
+        assert info['misses'] == 1
+        assert info['hits'] == 2
+        assert info['size'] == 1
+    
+    def test_cache_keeps_invalid_results(self):
+        """Test invalid expressions are cached as errors."""
+        assert self.engine.evaluate_expression("5 / 0") == "?"
+        assert self.engine.evaluate_expression("5 / 0") == "?"
+        assert self.engine.evaluate_expression("2 + + 3") == "?"
+        assert self.engine.evaluate_expression("2 + + 3") == "?"
+        assert self.engine.cache_info()['hits'] == 2
+    
+    def test_cache_eviction(self):
+        """Test least recently used entries are evicted."""
+        engine = CalculatorEngine(cache_size=2)
+        engine.evaluate_expression("1 + 1")
+        engine.evaluate_expression("2 + 2")
+        engine.evaluate_expression("1 + 1")  # Refresh "1+1"
+        engine.evaluate_expression("3 + 3")  # Evicts "2+2"
+        
+        info = engine.cache_info()
+        assert info['size'] == 2
+        assert info['evictions'] == 1
+        
+        engine.evaluate_expression("1 + 1")
+        assert engine.cache_info()['hits'] == 2
+        engine.evaluate_expression("2 + 2")
+        assert engine.cache_info()['misses'] == 4
+    
+    def test_cache_disabled(self):
+        """Test a zero-size cache stores nothing."""
+        engine = CalculatorEngine(cache_size=0)
+        assert engine.evaluate_expression("2 * 3") == "6"
+        assert engine.evaluate_expression("2 * 3") == "6"
+        assert engine.cache_info()['size'] == 0
+        assert engine.cache_info()['hits'] == 0
+    
+    def test_clear_cache(self):
+        """Test clearing the cache resets entries and counters."""
+        self.engine.evaluate_expression("2 + 3")
+        self.engine.evaluate_expression("2 + 3")
+        self.engine.clear_cache()
+        
+        info = self.engine.cache_info()
+        assert info['size'] == 0
+        assert info['hits'] == 0
+        assert info['misses'] == 0
+    
+    def test_cache_respects_setting_changes(self):
+        """Test cached results follow changed formatting settings."""
+        assert self.engine.evaluate_expression("1 / 3") == "0.33333333"
+        self.engine.max_decimal_places = 3
+        assert self.engine.evaluate_expression("1 / 3") == "0.333"
+        assert self.engine.cache_info()['misses'] == 1
+    
+    def test_cache_distinguishes_tabs(self):
+        """Test only spaces are normalized away in cache keys."""
+        assert self.engine.evaluate_expression("2+3") == "5"
+        assert self.engine.evaluate_expression("2\t+3") == "?"
+    
+    def test_evaluate_many_in_process(self):
+        """Test batch evaluation matches single evaluation in order."""
+        expressions = ["2 + 3", "5 / 0", "1 / 100000000000", "1 / 3", "2(3+4)", ""]
+        expected = [self.engine.evaluate_expression(e) for e in expressions]
+        
+        assert self.engine.evaluate_many(expressions, workers=1) == expected
+        assert self.engine.evaluate_many(iter(expressions)) == expected
+    
+    def test_evaluate_many_process_pool(self):
+        """Test process-pool batch evaluation matches single evaluation."""
+        expressions = [f"{i} / {i % 7} + 0.5" for i in range(200)]
+        expressions += ["1 / 100000000000", "2 + + 3", "(1"]
+        expected = [CalculatorEngine().evaluate_expression(e) for e in expressions]
+        
+        engine = CalculatorEngine()
+        engine.PARALLEL_THRESHOLD = 0  # Force the pool path for a small batch
+        assert engine.evaluate_many(expressions, workers=2, chunksize=16) == expected
+        assert "?" in expected and "Too Small" in expected
+    
+    def test_exact_arithmetic(self):
+        """Test exact mode computes with rationals and rounds half-even."""
+        engine = CalculatorEngine(arithmetic='exact')
+        assert engine.evaluate_expression("0.1 + 0.2 - 0.3") == "0"
+        assert engine.evaluate_expression("0.000000015 * 1") == "0.00000002"
+        assert engine.evaluate_expression("1.000000005") == "1"
+        assert engine.evaluate_expression("2 / 3") == "0.66666667"
+        assert engine.evaluate_expression("-2 / 3") == "-0.66666667"
+        assert engine.evaluate_expression("1 / 100000000000") == "Too Small"
+        assert engine.evaluate_expression("5 / 0") == "?"
+    
+    def test_adaptive_arithmetic(self):
+        """Test adaptive mode matches exact results near rounding boundaries."""
+        exact = CalculatorEngine(arithmetic='exact')
+        fast = CalculatorEngine(arithmetic='float')
+        assert fast.evaluate_expression("0.1 + 0.2 - 0.3") == "Too Small"
+        assert fast.evaluate_expression("0.000000015 * 1") == "0.00000001"
+        
+        # Results just below a whole number must round up, not truncate
+        assert fast.evaluate_expression("5.3 / 0.1") == "53"
+        
+        for expression in ["0.1 + 0.2 - 0.3", "0.000000015 * 1", "1 / 3", "2.5 * 4", "1 / (0.1 + 0.2 - 0.3)",
+                           "5.3 / 0.1", ".7 / .07", "48/5(3)2035", "-5.3 / 0.1"]:
+            assert self.engine.evaluate_expression(expression) == exact.evaluate_expression(expression)
+    
+    def test_adaptive_keeps_float_fast_path(self):
+        """Test only results near a rounding boundary are recomputed exactly."""
+        assert not self.engine._needs_exact(0.33333333333333331)
+        assert not self.engine._needs_exact(12.75)
+        assert self.engine._needs_exact(0.000000015)
+        assert self.engine._needs_exact(5.551115123125783e-17)
+        assert not self.engine._needs_exact(7)
+    
+    def test_adaptive_large_results_stay_float(self):
+        """Test large results of short expressions aren't recomputed exactly unless near a boundary."""
+        exact_runs = []
+        run = self.engine._run
+        self.engine._run = lambda compiled, exact=False, values=None: (
+            exact_runs.append(exact) or run(compiled, exact, values))
+        
+        expressions = ["1000000.5*3.3/7", "123456.789*3", "987654.321/1.3", "250000.1+250000.2",
+                       "(-654321.25)*0.75", "1000000/3", "4194304.7-0.2"]
+        assert [self.engine.evaluate_expression(expression) for expression in expressions] == \
+               [CalculatorEngine(arithmetic='float').evaluate_expression(expression) for expression in expressions]
+        assert not any(exact_runs)
+        
+        # The error allowed grows with the instructions that could have added it
+        value = 1000000.5 * 3.3 / 7
+        assert not self.engine._needs_exact(value, 5)
+        assert self.engine._needs_exact(value, 200000)
+    
+    def test_unknown_arithmetic_mode(self):
+        """Test an unknown arithmetic mode raises ValueError."""
+        with pytest.raises(ValueError):
+            CalculatorEngine(arithmetic='decimal')
@@ -0,0 +1,142 @@
+"""
+Test Calculator Session
+Tests for named variables and dependency-tracked recomputation.
+"""
+
+import pytest
+from src.calculator_engine import CalculatorEngine
+from src.calculator_session import CalculatorSession
+
+
+class TestCalculatorSession:
+    """Test cases for session definitions and recomputation."""
+    
+    def test_assignments_and_expressions(self):
+        """Test assignments define variables that later lines use."""
+        session = CalculatorSession()
+        assert session.execute("rate = 0.07") == "0.07"
+        assert session.execute("base = 100") == "100"
+        assert session.execute("total = base*(1+rate)") == "107"
+        assert session.execute("total - base") == "7"
+        assert session.execute("2total") == "214"
+        assert session.result('total') == "107"
+    
+    def test_only_downstream_recomputed(self):
+        """Test changing a variable re-evaluates only what depends on it, in dependency order."""
+        session = CalculatorSession()
+        for line in ["rate = 0.07", "base = 100", "other = base*2", "total = base*(1+rate)",
+                     "tax = total*rate"]:
+            session.execute(line)
+        
+        assert session.define('rate', "0.08") == ['rate', 'total', 'tax']
+        assert session.result('total') == "108"
+        assert session.result('tax') == "8.64"
+        assert session.result('other') == "200"
+    
+    def test_diamond_evaluated_once_in_order(self):
+        """Test a definition reached along two paths runs once, after both inputs."""
+        session = CalculatorSession()
+        for line in ["a = 1", "b = a+1", "c = a*2", "d = b*c"]:
+            session.execute(line)
+        order = session.define('a', "3")
+        assert sorted(order) == ['a', 'b', 'c', 'd']
+        assert order[0] == 'a' and order[-1] == 'd'
+        assert session.result('d') == "24"
+    
+    def test_unchanged_value_stops_recomputation(self):
+        """Test dependents of a value that came out the same aren't re-run."""
+        session = CalculatorSession()
+        for line in ["a = 2", "b = a*0", "c = b+1"]:
+            session.execute(line)
+        assert session.define('a', "5") == ['a', 'b']
+        assert session.define('a', "4+1") == ['a']
+    
+    def test_undefined_variables(self):
+        """Test definitions over undefined variables are "?" until those are defined."""
+        session = CalculatorSession()
+        assert session.execute("total = x*2") == "?"
+        assert session.define('x', "4") == ['x', 'total']
+        assert session.result('total') == "8"
+        
+        assert session.remove('x') == ['total']
+        assert session.result('total') == "?"
+        with pytest.raises(KeyError):
+            session.remove('x')
+    
+    def test_errors_propagate(self):
+        """Test a failing definition makes its dependents fail until it is fixed."""
+        session = CalculatorSession()
+        session.execute("q = 1/0")
+        assert session.execute("r = q+1") == "?"
+        session.define('q', "2")
+        assert session.result('r') == "3"
+    
+    def test_circular_definitions(self):
+        """Test definitions that would depend on themselves are rejected and change nothing."""
+        session = CalculatorSession()
+        session.execute("x = y+1")
+        with pytest.raises(ValueError):
+            session.define('y', "x*2")
+        with pytest.raises(ValueError):
+            session.define('z', "z+1")
+        assert session.execute("y = x") == "?"
+        assert 'y' not in session.definitions and 'z' not in session.definitions
+        session.define('y', "1")
+        assert session.result('x') == "2"
+    
+    def test_invalid_input(self):
+        """Test invalid names and expressions give "?" from execute and ValueError from define."""
+        session = CalculatorSession()
+        assert session.execute("a = 1+") == "?"
+        assert session.execute("1 = 2") == "?"
+        assert session.execute("a == 1") == "?"
+        with pytest.raises(ValueError):
+            session.define('2x', "1")
+        assert session.definitions == {}
+    
+    def test_adaptive_uses_exact_values(self):
+        """Test exact re-runs use variables' exact values, matching the direct expression."""
+        engine = CalculatorEngine()
+        session = CalculatorSession()
+        session.execute("a = 0.1+0.2")
+        assert session.execute("a - 0.3") == engine.evaluate_expression("0.1+0.2-0.3") == "0"
+        
+        float_session = CalculatorSession(CalculatorEngine(arithmetic='float'))
+        float_session.execute("a = 0.1+0.2")
+        assert float_session.execute("a - 0.3") == "Too Small"
+    
+    def test_exact_arithmetic(self):
+        """Test exact sessions carry rational values between definitions."""
+        session = CalculatorSession(CalculatorEngine(arithmetic='exact'))
+        session.execute("third = 1/3")
+        assert session.execute("whole = third*3") == "1"
+    
+    def test_recalculate(self):
+        """Test every definition is re-formatted after a settings change."""
+        session = CalculatorSession()
+        session.execute("a = 1/3")
+        session.execute("b = a*2")
+        session.engine.max_decimal_places = 2
+        assert session.recalculate() == ['a', 'b']
+        assert session.result('a') == "0.33" and session.result('b') == "0.67"
+    
+    def test_long_chain(self):
+        """Test long dependency chains recompute in order without recursion."""
+        session = CalculatorSession()
+        count = 5000
+        session.define('v0', "1")
+        for i in range(1, count):
+            session.define(f'v{i}', f"v{i - 1}+1")
+        assert session.result(f'v{count - 1}') == str(count)
+        
+        order = session.define('v0', "2")
+        assert order == [f'v{i}' for i in range(count)]
+        assert session.result(f'v{count - 1}') == str(count + 1)
+    
+    def test_definitions_are_optimized(self):
+        """Test literal parts of definitions are folded once at compile time."""
+        session = CalculatorSession()
+        session.execute("x = 2")
+        session.execute("y = x*(1.5+2.25)*1")
+        assert len(session.definitions['y'].program) == 3
+        assert session.result('y') == "7.5"
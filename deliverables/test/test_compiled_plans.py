@@ -0,0 +1,226 @@
+"""
+Test Compiled Plans
+Tests for serialized compiled expressions and the plan cache file.
+"""
+
+import marshal
+import os
+import tempfile
+from fractions import Fraction
+
+import pytest
+from src import calculator_engine
+from src.calculator_engine import CalculatorEngine
+from src.compiled_plans import (CACHE_MAGIC, PLAN_MAGIC, PLAN_VERSION, PlanCache, dump_plan,
+                                load_plan, plan_key)
+from src.engine_metrics import STAGES
+from src.optimizer import optimize_program
+from src.stack_machine import ADD, LOAD_CONST, LOAD_TEMP, NEG, STORE_TEMP, Program, compile_program
+
+
+def raw_plan(code, constants, variables=(), temps=0, source=None) -> bytes:
+    """A plan holding exactly the given program parts, valid or not."""
+    return PLAN_MAGIC + bytes((PLAN_VERSION, marshal.version)) + \
+        marshal.dumps((tuple(code), tuple(constants), tuple(variables), temps, source))
+
+
+EXPRESSIONS = ["2 + 3", "5 / 0", "1 / 100000000000", "1 / 3", "2(3+4)", "(2)(3)", "-(-2)",
+               "0.1 + 0.2 - 0.3", "1.005 * 1000 / 1000", "-" + "9" * 400 + " * 2",
+               "(1.5+2.25)*(1.5+2.25)/(1.5+2.25)", "2..5 * 2", "(1", "007", "", "1/"]
+
+
+class TestCompiledPlans:
+    """Test cases for plan serialization and PlanCache."""
+    
+    def setup_method(self):
+        """Setup test fixtures with a temporary plan cache path."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'plans.bin')
+    
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        for name in os.listdir(self.temp_dir):
+            os.unlink(os.path.join(self.temp_dir, name))
+        os.rmdir(self.temp_dir)
+    
+    def test_round_trip(self):
+        """Test loaded programs equal the originals, including optimized ones and variables."""
+        programs = [compile_program("12.5*(3+4)/7-2(8+1)"), compile_program("-" + "7" * 50 + "+0.25"),
+                    optimize_program(compile_program("((1/0)+(1/0))*((1/0)+(1/0))"))[0],
+                    optimize_program(compile_program("0.1 + 0.2"))[0],
+                    compile_program("rate*(1+rate)-base", names=True)]
+        for program in programs:
+            loaded = load_plan(dump_plan(program))
+            assert (loaded.code, loaded.constants, loaded.variables, loaded.temps) == \
+                   (program.code, program.constants, program.variables, program.temps)
+            assert (loaded.source is None) == (program.source is None)
+        
+        loaded = load_plan(dump_plan(programs[3]))
+        assert loaded.evaluate() == 0.1 + 0.2
+        assert loaded.evaluate(exact=True) == Fraction(3, 10)
+        assert load_plan(dump_plan(programs[4])).evaluate(values={'rate': 2, 'base': 1}) == 5
+        assert load_plan(dump_plan(None)) is None
+    
+    def test_bad_plans(self):
+        """Test data that isn't a plan of this version is rejected."""
+        plan = dump_plan(compile_program("1+2"))
+        assert plan.startswith(PLAN_MAGIC)
+        for data in [b"", plan[:-1], plan[:6], b"XXXX" + plan[4:],
+                     plan[:4] + bytes([plan[4] + 1]) + plan[5:]]:
+            with pytest.raises(ValueError):
+                load_plan(data)
+    
+    def test_damaged_plans(self):
+        """Test plans that decode but describe programs that can't run are rejected."""
+        assert load_plan(raw_plan([(LOAD_CONST, 0), (LOAD_CONST, 1), (ADD, None)], [1, 2])).evaluate() == 3
+        damaged = [
+            raw_plan([(LOAD_CONST, 0), (LOAD_CONST, 1), (9, None)], [1, 2]),  # Unknown opcode
+            raw_plan([(LOAD_CONST, 0), (LOAD_CONST, 2), (ADD, None)], [1, 2]),  # Constant out of range
+            raw_plan([(LOAD_CONST, -1)], [1]),
+            raw_plan([(LOAD_CONST, 0), (ADD, None)], [1]),  # Stack underflow
+            raw_plan([(NEG, None)], []),
+            raw_plan([(LOAD_CONST, 0), (LOAD_CONST, 0)], [1]),  # Unbalanced
+            raw_plan([], []),
+            raw_plan([(LOAD_CONST, 0), (ADD, 0)], [1]),  # Operand on an operation
+            raw_plan([(LOAD_TEMP, 0)], [], temps=1),  # Temporary loaded before stored
+            raw_plan([(LOAD_CONST, 0), (STORE_TEMP, 1)], [1], temps=1),
+            raw_plan([(LOAD_CONST, 0)], ["1"]),  # Constant of the wrong type
+            raw_plan([(LOAD_CONST, 0)], [None]),  # Empty slot that isn't a variable
+            raw_plan([(LOAD_CONST, 0)], [None], variables=[(0, 5)]),
+            raw_plan([(LOAD_CONST, 0)], [1], source=((NEG, None),)),
+            PLAN_MAGIC + bytes((PLAN_VERSION, marshal.version)) + marshal.dumps([1, 2]),
+        ]
+        for data in damaged:
+            with pytest.raises(ValueError):
+                load_plan(data)
+    
+    def test_damaged_plan_recompiled(self):
+        """Test an engine drops a damaged stored plan and evaluates the expression, promoted or not."""
+        engine = CalculatorEngine(cache_size=0)  # Every call compiles through the plan cache
+        engine.tier_threshold = 10
+        engine.load_plans(self.path)
+        key = plan_key("2+3", False)
+        engine.plans.put(key, raw_plan([(LOAD_CONST, 0), (LOAD_CONST, 1), (9, None)], [2, 3]))
+        for _ in range(40):
+            assert engine.evaluate_expression("2+3") == "5"
+        assert load_plan(engine.plans.get(key)).evaluate() == 5
+        assert engine.cache_info()['compiled_shapes'] == 1
+    
+    def test_failed_promotion_stays_interpreted(self):
+        """Test a program the code generator can't translate keeps running interpreted."""
+        program = Program([(LOAD_CONST, 0), (LOAD_CONST, 1), (9, None)], [2, 3])
+        assert not program.promote()
+        assert program.tier == 'interpreted'
+        
+        engine = CalculatorEngine()
+        engine.tier_threshold = 2
+        for _ in range(5):
+            engine._count_hit(program)
+        assert program.function is None
+    
+    def test_engine_plans_match_evaluation(self):
+        """Test exported plans evaluate like the expressions, in another engine too."""
+        for options in [{}, {'optimize': True}, {'arithmetic': 'exact'}, {'arithmetic': 'float'}]:
+            engine = CalculatorEngine(**options)
+            other = CalculatorEngine(**options)
+            for expression in EXPRESSIONS:
+                assert other.evaluate_plan(engine.export_plan(expression)) == \
+                       engine.evaluate_expression(expression), (options, expression)
+        
+        with pytest.raises(ValueError):
+            CalculatorEngine(backend='ast').export_plan("1+2")
+    
+    def test_plan_cache_skips_parsing(self, monkeypatch):
+        """Test an engine with a loaded plan cache doesn't parse expressions it holds."""
+        engine = CalculatorEngine(optimize=True)
+        assert engine.load_plans(self.path) == 0
+        expected = [engine.evaluate_expression(expression) for expression in EXPRESSIONS]
+        assert engine.save_plans()
+        assert not engine.save_plans()  # Nothing new since
+        
+        def no_parsing(expression, names=False):
+            raise AssertionError(f"parsed {expression!r}")
+        
+        monkeypatch.setattr(calculator_engine, 'compile_program', no_parsing)
+        engine = CalculatorEngine(optimize=True)
+        assert engine.load_plans(self.path) == len(EXPRESSIONS) - 1  # "" is never compiled
+        assert [engine.evaluate_expression(expression) for expression in EXPRESSIONS] == expected
+        assert engine.evaluate_expression(" 2 +3 ") == "5"  # Same plan without spaces
+        assert not engine.save_plans()
+        
+        # Unoptimized programs are kept apart from optimized ones
+        engine = CalculatorEngine()
+        engine.load_plans(self.path)
+        with pytest.raises(AssertionError):
+            engine._compile_expression("2 + 3")
+    
+    def test_plan_cache_file(self):
+        """Test the cache file round trip, and that stale or damaged files load nothing."""
+        cache = PlanCache(self.path)
+        plans = {plan_key(str(i), False): dump_plan(compile_program(f"{i}+1")) for i in range(50)}
+        for key, plan in plans.items():
+            cache.put(key, plan)
+        assert cache.save()
+        
+        loaded = PlanCache(self.path)
+        assert loaded.load() == 50
+        assert all(loaded.get(key) == plan for key, plan in plans.items())
+        
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        assert data.startswith(CACHE_MAGIC)
+        with open(self.path, 'wb') as f:
+            f.write(data[:-3])
+        assert loaded.load() == 0
+        with open(self.path, 'wb') as f:
+            f.write(CACHE_MAGIC + bytes([data[4] + 1]) + data[5:])
+        assert loaded.load() == 0
+    
+    def test_stale_plan_recompiled(self):
+        """Test a plan from another version is replaced by compiling the expression."""
+        engine = CalculatorEngine()
+        engine.load_plans(self.path)
+        key = plan_key("2+3", False)
+        engine.plans.put(key, b"CPLN\xff\0")
+        assert engine.evaluate_expression("2+3") == "5"
+        assert load_plan(engine.plans.get(key)).evaluate() == 5
+    
+    def test_plan_cache_bounded(self):
+        """Test the cache stops taking plans at max_plans, in memory and on disk."""
+        cache = PlanCache(self.path, max_plans=3)
+        plan = dump_plan(compile_program("1+1"))
+        for key in "abcd":
+            cache.put(key, plan)
+        assert len(cache) == 3 and "d" not in cache
+        cache.put("a", dump_plan(None))  # Replacing a stored plan is still allowed
+        assert load_plan(cache.get("a")) is None
+        cache.save()
+        
+        smaller = PlanCache(self.path, max_plans=2)
+        assert smaller.load() == 2
+        assert "a" in smaller and "b" in smaller
+        
+        engine = CalculatorEngine()
+        engine.load_plans(self.path, max_plans=5)
+        for i in range(20):
+            assert engine.evaluate_expression(f"{i}+1") == str(i + 1)
+        assert len(engine.plans) == 5
+        assert CalculatorEngine._from_worker_config(engine._worker_config()).plans.max_plans == 5
+    
+    def test_metrics_with_plans(self):
+        """Test instrumented compilation uses the plan cache and times it as the plan stage."""
+        engine = CalculatorEngine(optimize=True)
+        engine.load_plans(self.path)
+        metrics = engine.enable_metrics()
+        assert 'plan' in STAGES
+        assert engine.evaluate_expression("2 * (3 + 4)") == "14"
+        assert engine.evaluate_expression("1/") == "?"
+        assert len(engine.plans) == 2
+        stages = metrics.snapshot()['stages']
+        assert stages['plan']['count'] == 2 and stages['parse']['count'] == 1
+        
+        engine.clear_cache()
+        assert engine.evaluate_expression("2 * (3 + 4)") == "14"
+        assert engine.evaluate_expression("1/") == "?"
+        stages = metrics.snapshot()['stages']
+        assert stages['plan']['count'] == 4 and stages['parse']['count'] == 1
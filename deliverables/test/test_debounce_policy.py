@@ -0,0 +1,56 @@
+"""
+Test Debounce Policy
+Tests for the adaptive real-time calculation delay.
+"""
+
+import pytest
+from src.debounce_policy import DebouncePolicy
+
+
+class TestDebouncePolicy:
+    """Test cases for DebouncePolicy."""
+    
+    def test_fast_expressions_get_min_delay(self):
+        """Test no measurements or cheap evaluations give the minimum delay."""
+        policy = DebouncePolicy(min_delay=0)
+        assert policy.next_delay() == 0
+        for _ in range(10):
+            policy.record(0.0005)
+        assert policy.next_delay() == 0
+        assert list(policy.delays) == [0, 0]
+    
+    def test_backoff_as_cost_rises(self):
+        """Test the delay grows with measured cost and is capped at max_delay."""
+        policy = DebouncePolicy(max_delay=500, cost_multiplier=2.0, smoothing=1.0)
+        delays = []
+        for cost in (0.001, 0.02, 0.1, 2.0):
+            policy.record(cost)
+            delays.append(policy.next_delay())
+        assert delays == [0, 40, 200, 500]
+    
+    def test_moving_estimate(self):
+        """Test one slow outlier only partially moves the estimate, and it recovers."""
+        policy = DebouncePolicy(smoothing=0.5)
+        policy.record(0.01)
+        policy.record(0.03)
+        assert policy.estimate == pytest.approx(0.02)
+        assert policy.next_delay() == 40
+        for _ in range(20):
+            policy.record(0.0001)
+        assert policy.next_delay() == policy.min_delay
+    
+    def test_configuration(self):
+        """Test custom bounds, reset and invalid settings."""
+        policy = DebouncePolicy(min_delay=10, max_delay=50, fast_cost=0.0, history=2)
+        policy.record(0.001)
+        assert policy.next_delay() == 10
+        policy.record(1.0)
+        assert [policy.next_delay(), policy.next_delay()] == [50, 50]
+        assert len(policy.delays) == 2
+        policy.reset()
+        assert policy.estimate is None and not policy.delays
+        
+        with pytest.raises(ValueError):
+            DebouncePolicy(smoothing=0)
+        with pytest.raises(ValueError):
+            DebouncePolicy(min_delay=100, max_delay=10)
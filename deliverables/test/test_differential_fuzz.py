@@ -0,0 +1,64 @@
+"""
+Test Differential Fuzz
+Runs the seeded differential fuzz harness offline against every evaluator path.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / 'benchmarks'))
+from fuzz_differential import ExpressionGenerator, engine_candidates, run_differential, shrink
+
+from src.calculator_engine import CalculatorEngine
+
+
+# Cases per arithmetic mode; the harness's command line runs millions
+CASES = 3000
+
+
+class TestDifferentialFuzz:
+    """Test cases for the differential fuzz harness and the paths it guards."""
+    
+    @pytest.mark.parametrize('arithmetic', CalculatorEngine.ARITHMETIC_MODES)
+    def test_candidates_agree(self, arithmetic):
+        """Test every evaluator path gives the reference's results on generated input."""
+        report = run_differential(CASES, arithmetic=arithmetic)
+        
+        assert report['failures'] == []
+        assert report['cases'] == CASES
+        assert set(report['throughput']) == {'reference', *engine_candidates(arithmetic)}
+        assert all(rate > 0 for rate in report['throughput'].values())
+    
+    def test_generator_is_seeded(self):
+        """Test a seed always gives the same expressions, covering errors and formatting edges."""
+        first = ExpressionGenerator(7).batch(2000)
+        assert ExpressionGenerator(7).batch(2000) == first
+        assert ExpressionGenerator(8).batch(2000) != first
+        
+        results = [CalculatorEngine().evaluate_expression(expression) for expression in first]
+        assert "?" in results and "Too Small" in results
+        assert results.count("?") < len(results) // 2
+        assert any(')(' in expression or ')1' in expression for expression in first)
+    
+    def test_failures_are_shrunk(self):
+        """Test a planted disagreement is reported with a minimal repro."""
+        engine = CalculatorEngine()
+        
+        def broken(expressions):
+            return ["0" if '7' in expression else engine.evaluate_expression(expression)
+                    for expression in expressions]
+        
+        report = run_differential(500, seed=1, candidates={'broken': broken})
+        assert len(report['failures']) == 1
+        failure = report['failures'][0]
+        assert failure['candidate'] == 'broken'
+        assert '7' in failure['expression']
+        assert failure['shrunk'] == '7'
+        assert (failure['expected'], failure['actual']) == ("7", "0")
+    
+    def test_shrink(self):
+        """Test shrinking removes what the failure doesn't need and simplifies numbers."""
+        assert shrink("(12.5+3)*(4/0)", lambda text: '/0' in text) == "/0"
+        assert shrink("123456*789", lambda text: '*' in text and len(text) >= 3) == "0*0"
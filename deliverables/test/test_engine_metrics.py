@@ -0,0 +1,121 @@
+"""
+Test Engine Metrics
+Tests for opt-in per-stage instrumentation of CalculatorEngine.
+"""
+
+import json
+import time
+
+import pytest
+from src.calculator_engine import CalculatorEngine
+from src.engine_metrics import STAGES, EngineMetrics
+
+
+EXPRESSIONS = ["2 + 3 * 4", "(1.5 + 2.5) / 3", "1 / 3", "2(3+4)", "5 / 0", "1 +", "1e5",
+               "0.1 + 0.2", "1 / 100000000000", "((((7))))"]
+
+
+class TestEngineMetrics:
+    """Test cases for engine metrics."""
+    
+    def test_disabled_by_default(self):
+        """Test metrics are off until enabled and the engine runs its plain methods."""
+        engine = CalculatorEngine()
+        assert engine.metrics is None
+        assert engine.metrics_snapshot() is None
+        assert 'evaluate_expression' not in vars(engine)
+    
+    @pytest.mark.parametrize('backend', CalculatorEngine.BACKENDS)
+    @pytest.mark.parametrize('arithmetic', CalculatorEngine.ARITHMETIC_MODES)
+    def test_results_unchanged(self, backend, arithmetic):
+        """Test instrumented evaluation gives the same results as uninstrumented."""
+        plain = CalculatorEngine(backend=backend, arithmetic=arithmetic)
+        instrumented = CalculatorEngine(backend=backend, arithmetic=arithmetic)
+        instrumented.enable_metrics()
+        for expression in EXPRESSIONS * 2:
+            assert instrumented.evaluate_expression(expression) == plain.evaluate_expression(expression)
+    
+    def test_stages_and_counters(self):
+        """Test each stage is timed and requests, cache hits and errors are counted."""
+        engine = CalculatorEngine(backend='ast')
+        engine.enable_metrics()
+        for expression in ["1+2", "1+2", "3*4", "5/0", "1++2", "(1", "1/100000000000"]:
+            engine.evaluate_expression(expression)
+        
+        snapshot = engine.metrics_snapshot()
+        assert snapshot['requests'] == 7
+        assert snapshot['cache_hits'] == 1
+        assert snapshot['errors'] == {'ZeroDivisionError': 1, 'ValueError': 2}
+        assert set(snapshot['stages']) == set(STAGES)
+        stages = snapshot['stages']
+        assert stages['validation']['count'] == 6
+        # "(1" fails validation and "1++2" preprocessing; failed stages aren't timed
+        assert stages['preprocessing']['count'] == 4
+        assert stages['parse']['count'] == 4
+        assert stages['evaluate']['count'] == 3        # "5/0" fails evaluation
+        assert stages['format']['count'] == 3
+        assert stages['parse']['total_us'] > 0
+        assert stages['parse']['max_us'] >= stages['parse']['mean_us'] > 0
+        json.dumps(snapshot)
+    
+    def test_tokenizer_backends(self):
+        """Test stack and pratt backends report tokenizing as preprocessing without a validation stage."""
+        for backend in ('stack', 'pratt'):
+            engine = CalculatorEngine(backend=backend)
+            engine.enable_metrics()
+            engine.evaluate_expression("2 * (3 + 4)")
+            engine.evaluate_expression("2 * (3 + 4")
+            stages = engine.metrics_snapshot()['stages']
+            assert stages['validation']['count'] == 0
+            assert stages['preprocessing']['count'] == 2
+            assert stages['parse']['count'] == 1
+            assert sum(engine.metrics_snapshot()['errors'].values()) == 1
+    
+    def test_disable(self):
+        """Test disabling restores the plain methods and returns the collected metrics."""
+        engine = CalculatorEngine()
+        metrics = engine.enable_metrics()
+        engine.evaluate_expression("1+1")
+        assert engine.disable_metrics() is metrics
+        engine.evaluate_expression("2+2")
+        assert metrics.requests == 1
+        assert not {'evaluate_expression', '_compile_expression', '_evaluate_compiled'} & set(vars(engine))
+        assert engine.metrics_snapshot() is None
+    
+    def test_periodic_dump(self, tmp_path):
+        """Test snapshots are written to the dump file once the interval has passed."""
+        path = tmp_path / 'metrics.json'
+        engine = CalculatorEngine()
+        engine.enable_metrics(dump_path=str(path), dump_interval=0.05)
+        engine.evaluate_expression("1+1")
+        assert not path.exists()
+        
+        time.sleep(0.06)
+        engine.evaluate_expression("2+2")
+        assert json.loads(path.read_text())['requests'] == 2
+        
+        engine.metrics.dump()
+        assert [p.name for p in tmp_path.iterdir()] == ['metrics.json']
+    
+    def test_unwritable_dump_path(self, tmp_path):
+        """Test a failing periodic dump is counted instead of breaking evaluation."""
+        engine = CalculatorEngine()
+        metrics = engine.enable_metrics(dump_path=str(tmp_path / 'missing' / 'metrics.json'), dump_interval=0)
+        assert engine.evaluate_expression("1+1") == "2"
+        assert engine.evaluate_expression("2+2") == "4"
+        assert metrics.dump_errors == 2
+        assert metrics.requests == 2
+        with pytest.raises(OSError):
+            metrics.dump()
+    
+    def test_reset(self):
+        """Test reset clears timers and counters."""
+        metrics = EngineMetrics()
+        metrics.record_stage('parse', 0.5)
+        metrics.record_error(KeyError('x'))
+        metrics.record_request(0.5, cache_hit=True)
+        metrics.reset()
+        snapshot = metrics.snapshot()
+        assert snapshot['requests'] == snapshot['cache_hits'] == 0
+        assert snapshot['errors'] == {}
+        assert snapshot['stages']['parse'] == {'count': 0, 'total_us': 0.0, 'mean_us': 0.0, 'max_us': 0.0}
@@ -0,0 +1,234 @@
+"""
+Test Evaluation Server
+Tests for the asyncio line-delimited JSON evaluation service.
+"""
+
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+from src import evaluation_server
+from src.evaluation_server import EvaluationServer, decode_request, encode_response, parse_address
+from src.calculator_engine import CalculatorEngine
+
+
+SRC_DIR = Path(__file__).parent.parent / 'src'
+
+
+async def exchange(address: str, payload: bytes, expected_lines: int, close_write: bool = False):
+    """Send payload on a new connection and return the decoded response lines."""
+    host, port, path = parse_address(address)
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    writer.write(payload)
+    if close_write:
+        writer.write_eof()
+    
+    responses = [json.loads(await reader.readline()) for _ in range(expected_lines)]
+    writer.close()
+    await writer.wait_closed()
+    return responses
+
+
+def run_with_server(test, **options):
+    """Start a server on a free local port, run test(server) and shut it down."""
+    async def scenario():
+        server = EvaluationServer(**options)
+        await server.start('127.0.0.1:0')
+        try:
+            return await asyncio.wait_for(test(server), 30)
+        finally:
+            await server.close()
+    return asyncio.run(scenario())
+
+
+class TestEvaluationServer:
+    """Test cases for the evaluation server."""
+    
+    def test_parse_address(self):
+        """Test TCP and Unix socket address forms."""
+        assert parse_address('127.0.0.1:8765') == ('127.0.0.1', 8765, None)
+        assert parse_address(':9000') == ('127.0.0.1', 9000, None)
+        assert parse_address('9000') == ('127.0.0.1', 9000, None)
+        assert parse_address('/tmp/calc.sock') == (None, None, '/tmp/calc.sock')
+        assert parse_address('unix:calc.sock') == (None, None, 'calc.sock')
+        with pytest.raises(ValueError):
+            parse_address('localhost')
+    
+    def test_encode_and_decode(self):
+        """Test request decoding and response encoding."""
+        assert decode_request(b'{"id": 3, "expression": "2+3"}') == (3, "2+3", None)
+        assert decode_request(b'{"expression": "1"}') == (None, "1", None)
+        assert decode_request(b'not json')[2] == "Invalid JSON"
+        assert decode_request(b'[' * 100000)[2] == "Invalid JSON"
+        assert decode_request(b'[1]')[2] is not None
+        assert decode_request(b'{"id": "a", "expression": 5}')[0::2] == ("a", "Request needs a string 'expression'")
+        
+        assert encode_response(7, 'result', '5') == b'{"id": 7, "result": "5"}\n'
+        assert encode_response(None, 'error', 'bad') == b'{"error": "bad"}\n'
+        assert json.loads(encode_response({'k': [1]}, 'result', '"')) == {'id': {'k': [1]}, 'result': '"'}
+    
+    def test_pipelined_requests_answered_in_order(self):
+        """Test many pipelined requests on one connection come back in order."""
+        engine = CalculatorEngine()
+        expressions = [f"{i} / 7 + ({i % 5})" for i in range(2000)] + ["5 / 0", "1 / 100000000000"]
+        payload = b''.join(json.dumps({'id': i, 'expression': e}).encode() + b'\n'
+                           for i, e in enumerate(expressions))
+        
+        async def test(server):
+            responses = await exchange(server.address, payload, len(expressions))
+            return responses, server.stats()
+        
+        responses, stats = run_with_server(test)
+        assert [r['id'] for r in responses] == list(range(len(expressions)))
+        assert [r['result'] for r in responses] == [engine.evaluate_expression(e) for e in expressions]
+        assert responses[-2]['result'] == "?"
+        assert responses[-1]['result'] == "Too Small"
+        # Requests arriving together are evaluated in shared batches
+        assert stats['requests'] == len(expressions)
+        assert stats['largest_batch'] > 1
+        assert stats['batches'] < len(expressions)
+    
+    def test_malformed_requests(self):
+        """Test malformed lines get error responses without closing the connection."""
+        payload = (b'nonsense\n\n{"id": 1}\n' + b'[' * 100000 + b'\n'
+                   b'{"id": 2, "expression": "2*3"}\n{"expression": "1+"}')
+        
+        async def test(server):
+            return await exchange(server.address, payload, 5, close_write=True)
+        
+        responses = run_with_server(test)
+        assert responses == [
+            {'error': "Invalid JSON"},
+            {'id': 1, 'error': "Request needs a string 'expression'"},
+            {'error': "Invalid JSON"},
+            {'id': 2, 'result': "6"},
+            {'result': "?"},
+        ]
+    
+    def test_unencodable_ids_echoed(self):
+        """Test ids with lone surrogates are escaped and later pipelined requests still answered."""
+        assert json.loads(encode_response('\ud800', 'result', '2')) == {'id': '\ud800', 'result': '2'}
+        payload = b'{"id": "\\ud800", "expression": "1+1"}\n{"id": "\xc3\xa9", "expression": "2*3"}\n'
+        
+        async def test(server):
+            return await exchange(server.address, payload, 2)
+        
+        assert run_with_server(test) == [{'id': '\ud800', 'result': "2"}, {'id': '\xe9', 'result': "6"}]
+    
+    def test_failed_batch_answered(self, monkeypatch):
+        """Test a batch that raises gets error responses and the batcher keeps serving."""
+        calls = []
+        
+        def evaluate_batch(server, expressions):
+            calls.append(expressions)
+            if len(calls) == 1:
+                raise RuntimeError("engine failure")
+            return ["ok"] * len(expressions)
+        
+        monkeypatch.setattr(EvaluationServer, 'evaluate_batch', evaluate_batch)
+        
+        async def test(server):
+            first = await exchange(server.address, b'{"id": 1, "expression": "1"}\n', 1)
+            second = await exchange(server.address, b'{"id": 2, "expression": "2"}\n', 1)
+            return first + second
+        
+        assert run_with_server(test) == [{'id': 1, 'error': "Evaluation failed"}, {'id': 2, 'result': "ok"}]
+    
+    def test_request_too_long(self, monkeypatch):
+        """Test a line over the length limit gets an error response."""
+        monkeypatch.setattr(evaluation_server, 'MAX_LINE_LENGTH', 100)
+        
+        async def test(server):
+            return await exchange(server.address, b'{"expression": "' + b'1+' * 100000, 1)
+        
+        assert run_with_server(test) == [{'error': "Request too long"}]
+    
+    def test_backpressure_limits(self):
+        """Test small pipeline, queue and batch limits still answer every request in order."""
+        payload = b''.join(b'{"id": %d, "expression": "%d*2"}\n' % (i, i) for i in range(3000))
+        
+        async def test(server):
+            clients = [exchange(server.address, payload, 3000) for _ in range(4)]
+            return await asyncio.gather(*clients)
+        
+        for responses in run_with_server(test, max_pipeline=8, max_pending=2, max_batch_size=16):
+            assert [r['result'] for r in responses] == [str(i * 2) for i in range(3000)]
+    
+    def test_concurrent_connections(self):
+        """Test requests from different connections batched together are answered on their own connection."""
+        async def test(server):
+            clients = [exchange(server.address, b'{"id": %d, "expression": "%d+1"}\n' % (i, i), 1)
+                       for i in range(20)]
+            return await asyncio.gather(*clients)
+        
+        results = run_with_server(test, max_batch_delay=0.01)
+        assert [responses[0] for responses in results] == [{'id': i, 'result': str(i + 1)} for i in range(20)]
+    
+    @pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="Unix sockets not available")
+    def test_unix_socket(self):
+        """Test serving on a Unix socket path."""
+        async def scenario(path):
+            server = EvaluationServer()
+            await server.start(path)
+            try:
+                return await exchange(server.address, b'{"expression": "2(3+4)"}\n', 1)
+            finally:
+                await server.close()
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            assert asyncio.run(scenario(str(Path(temp_dir) / 'calc.sock'))) == [{'result': "14"}]
+    
+    def test_main_serve(self):
+        """Test main.py --serve answers requests over TCP."""
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        script = f"import sys, main\nsys.exit(main.main(['--serve', '127.0.0.1:{port}']))\n"
+        process = subprocess.Popen([sys.executable, '-c', script], cwd=SRC_DIR,
+                                   stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    connection = socket.create_connection(('127.0.0.1', port), timeout=5)
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.05)
+            with connection, connection.makefile('rwb') as stream:
+                stream.write(b'{"id": "a", "expression": "7 / 2"}\n')
+                stream.flush()
+                assert json.loads(stream.readline()) == {'id': 'a', 'result': '3.5'}
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+    
+    def test_close_with_stalled_client(self):
+        """Test closing drops a connection whose client stopped reading responses."""
+        async def scenario():
+            server = EvaluationServer(max_pipeline=100)
+            await server.start('127.0.0.1:0')
+            host, port, _ = parse_address(server.address)
+            reader, writer = await asyncio.open_connection(host, port)
+            for _ in range(100):
+                writer.write(b'{"expression": "1+2"}\n' * 10000)
+                try:
+                    await asyncio.wait_for(writer.drain(), 0.2)
+                except asyncio.TimeoutError:
+                    break
+            await asyncio.wait_for(server.close(), 10)
+            writer.transport.abort()
+            return server.stats()
+        
+        stats = asyncio.run(scenario())
+        assert 0 < stats['requests'] < 1000000
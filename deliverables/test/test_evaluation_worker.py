@@ -0,0 +1,185 @@
+"""
+Test Evaluation Worker
+Tests for off-GUI-thread evaluation with stale-result dropping.
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+pytest.importorskip('PyQt6')
+pytest.importorskip('pytestqt')
+
+from src.debounce_policy import DebouncePolicy
+from src.evaluation_worker import AsyncEvaluator
+from src.calculator_engine import CalculatorEngine
+from src.incremental_evaluator import IncrementalEvaluator
+
+
+class BlockingEvaluator:
+    """Evaluator whose first call waits until released, to hold the worker busy."""
+    
+    def __init__(self):
+        """Initialize with the first call blocked."""
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = []
+    
+    def evaluate(self, text, cursor=None):
+        """Record the call, block the first one, and echo the text as the result."""
+        self.calls.append(text)
+        if len(self.calls) == 1:
+            self.started.set()
+            self.release.wait(10)
+        return text
+
+
+class TestEvaluationWorker:
+    """Test cases for AsyncEvaluator."""
+    
+    def test_result_delivered(self, qtbot):
+        """Test a submission's result arrives through result_ready."""
+        worker = AsyncEvaluator(IncrementalEvaluator(CalculatorEngine()))
+        with qtbot.waitSignal(worker.result_ready, timeout=5000) as blocker:
+            worker.submit("2 * (3 + 4)")
+        assert blocker.args == ["14"]
+    
+    def test_stale_results_dropped(self, qtbot):
+        """Test only the latest submission's result is shown and superseded queued work is skipped."""
+        evaluator = BlockingEvaluator()
+        worker = AsyncEvaluator(evaluator)
+        received = []
+        worker.result_ready.connect(received.append)
+        
+        worker.submit("first")
+        assert evaluator.started.wait(5)
+        worker.submit("second")  # Queued behind the running evaluation
+        worker.submit("third")   # Supersedes "second" before it starts
+        evaluator.release.set()
+        
+        qtbot.waitUntil(lambda: received == ["third"], timeout=5000)
+        assert worker.wait(5000)
+        qtbot.wait(50)
+        assert received == ["third"]
+        assert evaluator.calls == ["first", "third"]
+        assert worker.skipped == 1
+        assert worker.dropped == 1
+    
+    def test_invalidate_drops_running_result(self, qtbot):
+        """Test a result for text that changed while evaluating is discarded."""
+        evaluator = BlockingEvaluator()
+        worker = AsyncEvaluator(evaluator)
+        received = []
+        worker.result_ready.connect(received.append)
+        
+        worker.submit("old")
+        assert evaluator.started.wait(5)
+        worker.invalidate()
+        evaluator.release.set()
+        
+        qtbot.waitUntil(lambda: worker.dropped == 1, timeout=5000)
+        assert received == []
+    
+    def test_evaluation_error(self, qtbot):
+        """Test an exception in the evaluator is reported as '?'."""
+        class FailingEvaluator:
+            def evaluate(self, text, cursor=None):
+                raise RuntimeError("boom")
+        
+        worker = AsyncEvaluator(FailingEvaluator())
+        with qtbot.waitSignal(worker.result_ready, timeout=5000) as blocker:
+            worker.submit("1")
+        assert blocker.args == ["?"]
+    
+    def test_gui_stays_responsive(self, qtbot):
+        """Test a slow evaluation doesn't block the GUI thread and its result is dropped once superseded."""
+        from src.calculator_app import CalculatorApp
+        
+        window = CalculatorApp()
+        qtbot.addWidget(window)
+        evaluator = BlockingEvaluator()
+        window.async_evaluator.evaluator = evaluator
+        
+        window.input_field.setText("1+")
+        start = time.perf_counter()
+        window.update_result()
+        assert evaluator.started.wait(5)
+        window.input_field.setText("1+2")
+        window.update_result()
+        assert time.perf_counter() - start < 1.0  # Neither call waited for the evaluation
+        
+        evaluator.release.set()
+        qtbot.waitUntil(lambda: window.result_field.text() == "1+2", timeout=5000)
+        assert window.async_evaluator.dropped >= 1
+    
+    def test_costs_recorded_in_policy(self, qtbot):
+        """Test evaluation times feed the debounce policy, including stale results."""
+        evaluator = BlockingEvaluator()
+        policy = DebouncePolicy()
+        worker = AsyncEvaluator(evaluator, policy=policy)
+        
+        worker.submit("slow")
+        assert evaluator.started.wait(5)
+        time.sleep(0.05)
+        worker.invalidate()
+        evaluator.release.set()
+        qtbot.waitUntil(lambda: worker.dropped == 1, timeout=5000)
+        assert policy.estimate >= 0.05
+        assert policy.next_delay() > policy.min_delay
+    
+    def test_gui_uses_adaptive_delay(self, qtbot):
+        """Test typing restarts the calculation timer with the policy's delay."""
+        from src.calculator_app import CalculatorApp
+        
+        window = CalculatorApp()
+        qtbot.addWidget(window)
+        window.input_field.setText("1+2")
+        assert window.debounce.delays[-1] == 0
+        qtbot.waitUntil(lambda: window.result_field.text() == "3", timeout=5000)
+        
+        window.debounce.record(0.1)
+        window.input_field.setText("1+2+3")
+        assert window.debounce.delays[-1] == window.debounce.delay_for(window.debounce.estimate) > 0
+        assert window.calc_timer.interval() == window.debounce.delays[-1]
+    
+    def test_evaluate_now_waits_and_supersedes(self, qtbot):
+        """Test a synchronous evaluation waits for the running one and drops queued and stale results."""
+        evaluator = BlockingEvaluator()
+        worker = AsyncEvaluator(evaluator)
+        received = []
+        worker.result_ready.connect(received.append)
+        
+        worker.submit("running")
+        assert evaluator.started.wait(5)
+        worker.submit("queued")
+        threading.Timer(0.05, evaluator.release.set).start()
+        assert worker.evaluate_now("now") == "now"
+        assert evaluator.calls == ["running", "now"]
+        
+        qtbot.waitUntil(lambda: worker.dropped == 1, timeout=5000)
+        assert received == []
+        assert worker.skipped == 1
+    
+    def test_save_uses_current_text(self, qtbot, tmp_path):
+        """Test Save stores the result of the text being saved, not a stale display."""
+        from src.calculator_app import CalculatorApp
+        from src.history_manager import HistoryManager
+        from src.history_store import LogHistoryStore
+        
+        window = CalculatorApp()
+        qtbot.addWidget(window)
+        window.history = HistoryManager(store=LogHistoryStore(tmp_path / 'history.log'))
+        window.input_field.setText("2+3")
+        qtbot.waitUntil(lambda: window.result_field.text() == "5", timeout=5000)
+        
+        # Save before the debounced evaluation of the new text has run
+        window.debounce.record(10.0)
+        window.input_field.setText("2+3*4")
+        assert window.result_field.text() == "5"
+        window.save_current_calculation()
+        
+        assert window.history.get_history_items()[0] == {'expression': "2+3*4", 'result': "14"}
+        assert window.result_field.text() == "14"
@@ -0,0 +1,83 @@
+"""
+Test Expression Parser
+Tests for the single-pass tokenizer and Pratt parser backend.
+"""
+
+import ast
+
+import pytest
+from src.expression_parser import tokenize, parse_expression
+from src.calculator_engine import CalculatorEngine
+
+
+class TestExpressionParser:
+    """Test cases for tokenizer and parser."""
+    
+    def test_tokenize_numbers_and_operators(self):
+        """Test tokens are split on operators with spaces ignored."""
+        assert tokenize("12.5 + 3") == ['12.5', '+', '3']
+        assert tokenize("(1-2)/4") == ['(', '1', '-', '2', ')', '/', '4']
+    
+    def test_tokenize_implicit_multiplication(self):
+        """Test implicit multiplication tokens are inserted."""
+        assert tokenize("2(3)") == ['2', '*', '(', '3', ')']
+        assert tokenize("(2)3") == ['(', '2', ')', '*', '3']
+        assert tokenize("(2)(3)") == ['(', '2', ')', '*', '(', '3', ')']
+    
+    def test_tokenize_collapses_dots(self):
+        """Test repeated decimal points collapse to one."""
+        assert tokenize("2..5") == ['2.5']
+    
+    def test_tokenize_rejects_operator_sequences(self):
+        """Test repeated operators follow the engine's rules."""
+        with pytest.raises(ValueError):
+            tokenize("2 + + 3")
+        with pytest.raises(ValueError):
+            tokenize("2 * / 3")
+        with pytest.raises(ValueError):
+            tokenize("2---3")
+        assert tokenize("2--3") == ['2', '-', '-', '3']
+    
+    def test_tokenize_names(self):
+        """Test variable names are tokens, multiplied implicitly like numbers, only when enabled."""
+        assert tokenize("base*(1+rate_2)", names=True) == ['base', '*', '(', '1', '+', 'rate_2', ')']
+        assert tokenize("2x", names=True) == ['2', '*', 'x']
+        assert tokenize("(2)x", names=True) == ['(', '2', ')', '*', 'x']
+        assert tokenize("x(2)", names=True) == ['x', '*', '(', '2', ')']
+        with pytest.raises(ValueError):
+            tokenize("x + 1")
+        with pytest.raises(ValueError):
+            tokenize("x = 1", names=True)
+    
+    def test_tokenize_rejects_invalid_characters(self):
+        """Test characters outside the calculator alphabet are rejected."""
+        with pytest.raises(ValueError):
+            tokenize("2e5")
+        with pytest.raises(ValueError):
+            tokenize("2\t+3")
+    
+    def test_parse_matches_ast(self):
+        """Test parsed trees match ast.parse on the preprocessed expression."""
+        for expression in ["2+3*4", "-(2+3)", "10-4-3", "8/4/2", "-2*3", "1.5+.5", "--3"]:
+            expected = ast.dump(ast.parse(expression, mode='eval').body)
+            assert ast.dump(parse_expression(expression)) == expected
+    
+    def test_parse_errors(self):
+        """Test malformed expressions raise ValueError."""
+        for expression in ["2 +", "* 3", "(2 + 3", "2 + 3)", "1.2.3", "007", ".", "()"]:
+            with pytest.raises(ValueError):
+                parse_expression(expression)
+    
+    def test_engine_backends_agree(self):
+        """Test the pratt backend matches the ast backend's results."""
+        reference = CalculatorEngine(backend='ast')
+        candidate = CalculatorEngine(backend='pratt')
+        expressions = ["2 + 3", "5 / 0", "1 / 100000000000", "1 / 3", "2(3+4)", "(2)(3)",
+                       "2..5 * 2", "2 + + 3", "(1", "007", "2.(3)", "", "-(-2)", "0.1 + 0.2"]
+        for expression in expressions:
+            assert candidate.evaluate_expression(expression) == reference.evaluate_expression(expression)
+    
+    def test_engine_rejects_unknown_backend(self):
+        """Test an unknown backend name raises ValueError."""
+        with pytest.raises(ValueError):
+            CalculatorEngine(backend='yacc')
@@ -0,0 +1,90 @@
+"""
+Test History Index
+Tests for incremental substring and prefix search over history.
+"""
+
+import time
+
+import pytest
+from src.history_index import RESULT_SEPARATOR, HistorySearchIndex
+
+
+def build_index(pairs):
+    """Build an index from (expression, result) pairs, oldest first."""
+    index = HistorySearchIndex()
+    for expression, result in pairs:
+        index.add({'expression': expression, 'result': result})
+    return index
+
+
+class TestHistorySearchIndex:
+    """Test cases for HistorySearchIndex."""
+    
+    def test_substring_search(self):
+        """Test matches in expressions or results are found, newest first."""
+        index = build_index([("2 + 3", "5"), ("10 - 4", "6"), ("6 * 7", "42"), ("1 / 4", "0.25")])
+        assert index.search("4") == [3, 2, 1]
+        assert index.search("6") == [2, 1]
+        assert index.search("0.2") == [3]
+        assert index.search("9") == []
+        assert index.search("") == [3, 2, 1, 0]
+    
+    def test_prefix_search(self):
+        """Test prefix mode matches the start of the expression or of the result."""
+        index = build_index([("2 + 3", "5"), ("12 * 2", "24"), ("6 * 4", "24")])
+        assert index.search("2", prefix=True) == [2, 1, 0]
+        assert index.search("24", prefix=True) == [2, 1]
+        assert index.search("6", prefix=True) == [2]
+        assert index.search("* 2", prefix=True) == []
+    
+    def test_no_match_across_fields(self):
+        """Test a query can't match the end of an expression joined to its result."""
+        index = build_index([("1 + 2", "3"), ("7", "7")])
+        assert index.search("23") == []
+        # A separator in the query is dropped, so it can't join the fields either
+        assert index.search("2" + RESULT_SEPARATOR + "3") == []
+        # Nor can one in an expression fake a result
+        index.add({'expression': "8" + RESULT_SEPARATOR + "9", 'result': "89"})
+        assert index.search("9", prefix=True) == []
+        assert index.search("89", prefix=True) == [2]
+    
+    def test_incremental_refinement(self):
+        """Test extending or changing the query gives the same results as a fresh search."""
+        pairs = [(f"{i} * {i % 7}", str(i * (i % 7))) for i in range(500)]
+        index = build_index(pairs)
+        for queries, prefix in ((["1", "12", "123", "23", "3"], False), (["1", "12", "2"], True)):
+            for query in queries:
+                expected = build_index(pairs).search(query, prefix)
+                assert index.search(query, prefix) == expected
+        
+        # Entries added after a search are found by the next, longer query
+        index.search("99")
+        index.add({'expression': "999", 'result': "999"})
+        assert index.search("999")[0] == 500
+    
+    def test_keep_newest(self):
+        """Test dropping the oldest entries removes them from results and keeps numbering."""
+        index = build_index([(str(i), str(i)) for i in range(10)])
+        index.keep_newest(4)
+        assert len(index) == 4
+        assert index.search("") == [9, 8, 7, 6]
+        assert index.search("1") == []
+        assert index.add({'expression': "11", 'result': "11"}) == 10
+        index.keep_newest(4)
+        assert index.search("1") == [10]
+        assert index.item(10) == {'expression': "11", 'result': "11"}
+        with pytest.raises(IndexError):
+            index.item(5)
+        index.clear()
+        assert len(index) == 0 and index.search("1") == []
+    
+    def test_large_history_is_fast(self):
+        """Test searching 100k entries stays interactive."""
+        index = build_index((f"{i} * {i % 7} + 1", str(i * (i % 7) + 1)) for i in range(100000))
+        start = time.perf_counter()
+        for query in ("1", "12", "123", "1234"):
+            index.search(query)
+        index.search("99", prefix=True)
+        assert time.perf_counter() - start < 0.5
+        # Only the newest expression, "99999 * 4 + 1", contains this
+        assert index.search("99999 *") == [99999]
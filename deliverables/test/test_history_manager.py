@@ -25,8 +25,9 @@ class TestHistoryManager:
     
     def teardown_method(self):
         """Clean up test fixtures."""
-        if os.path.exists(self.temp_file.name):
-            os.unlink(self.temp_file.name)
+        for name in (self.temp_file.name, self.temp_file.name + '.lock'):
+            if os.path.exists(name):
+                os.unlink(name)
     
     def test_save_calculation(self):
         """Test saving calculations to history."""
@@ -127,4 +128,60 @@ class TestHistoryManager:
         items = self.history.get_history_items()
         assert len(items) == 2
         assert items[0]['expression'] == "2 + 3"
-        assert items[1]['expression'] == ""
\ No newline at end of file
+        assert items[1]['expression'] == ""
+    
+    def test_search_history(self):
+        """Test searching returns indices into the history, most recent first."""
+        self.history.save_calculation("2 + 3", "5")
+        self.history.save_calculation("10 - 5", "5")
+        self.history.save_calculation("6 * 7", "42")
+        self.history.save_calculation("1 + 4", "5")  # Drops "2 + 3" (max 3 items)
+        
+        # History is now ["1 + 4", "6 * 7", "10 - 5"]
+        assert self.history.search_history("5") == [0, 2]
+        assert self.history.get_history_item(2)['expression'] == "10 - 5"
+        assert self.history.search_history("4", prefix=True) == [1]
+        with pytest.raises(IndexError):
+            self.history.get_history_item(3)
+        
+        self.history.clear_history()
+        assert self.history.search_history("5") == []
+    
+    def test_history_pages(self):
+        """Test paginated access returns records most recent first."""
+        history = HistoryManager(max_items=100, store=self.history.store)
+        history.clear_history()
+        for i in range(25):
+            history.save_calculation(f"{i} + 1", str(i + 1))
+        
+        assert [record.expression for record in history.get_history_page(0, 3)] == ["24 + 1", "23 + 1", "22 + 1"]
+        assert [record.result for record in history.get_history_page(20, 10)] == ["5", "4", "3", "2", "1"]
+        assert history.get_history_page(25, 10) == []
+        assert history.get_history_page(0, 0) == []
+        assert history.get_record(24) == {'expression': "0 + 1", 'result': "1"}
+    
+    def test_history_items_view(self):
+        """Test history_items is a live read-only view and get_history_items returns new dicts."""
+        view = self.history.history_items
+        self.history.clear_history()
+        assert len(view) == 0
+        self.history.save_calculation("2 + 3", "5")
+        assert len(view) == 1 and view[0].expression == "2 + 3"
+        
+        items = self.history.get_history_items()
+        assert type(items[0]) is dict
+        items[0]['result'] = "changed"
+        assert view[0].result == "5"
+    
+    def test_deferred_load(self):
+        """Test a manager created with load=False reads the store only when asked to."""
+        self.history.save_calculation("2 + 3", "5")
+        
+        history = HistoryManager(max_items=3, store=self.history.store, load=False)
+        assert not history.loaded and len(history.history_items) == 0
+        assert history.refresh()
+        assert history.loaded and history.history_items[0].expression == "2 + 3"
+        
+        history = HistoryManager(max_items=3, store=self.history.store, load=False)
+        history.save_calculation("10 - 4", "6")
+        assert [item.expression for item in history.history_items] == ["10 - 4", "2 + 3"]
@@ -0,0 +1,54 @@
+"""
+Test History Records
+Tests for compact history records and read-only history views.
+"""
+
+import sys
+
+import pytest
+from src.history_index import HistorySearchIndex
+from src.history_records import HistoryRecord, HistoryView
+
+
+class TestHistoryRecords:
+    """Test cases for HistoryRecord and HistoryView."""
+    
+    def test_record_acts_like_item_dict(self):
+        """Test records read like history item dicts and convert to them."""
+        record = HistoryRecord("2 + 3", "5")
+        assert record['expression'] == record.expression == "2 + 3"
+        assert record['result'] == "5"
+        assert record == {'expression': "2 + 3", 'result': "5"}
+        assert record == HistoryRecord("2 + 3", "5")
+        assert record != HistoryRecord("2 + 3", "6")
+        assert record.as_dict() == dict(record) == {'expression': "2 + 3", 'result': "5"}
+        with pytest.raises(KeyError):
+            record['id']
+        with pytest.raises(AttributeError):
+            record.note = "x"  # No per-record __dict__
+    
+    def test_record_is_compact_and_interned(self):
+        """Test records are smaller than dicts and share equal strings."""
+        first = HistoryRecord("".join(["12", " * ", "3"]), "36")
+        second = HistoryRecord("".join(["12", " *", " 3"]), "36")
+        assert first.expression is second.expression
+        assert sys.getsizeof(first) < sys.getsizeof(first.as_dict()) / 2
+    
+    def test_view(self):
+        """Test the view reads records most recent first and follows later changes."""
+        index = HistorySearchIndex()
+        view = HistoryView(index)
+        assert len(view) == 0 and list(view) == []
+        
+        for i in range(5):
+            index.add(HistoryRecord(str(i), str(i)))
+        assert [record.expression for record in view] == ["4", "3", "2", "1", "0"]
+        assert view[0].expression == "4" and view[-1].expression == "0"
+        assert [record.expression for record in view[1:3]] == ["3", "2"]
+        with pytest.raises(IndexError):
+            view[5]
+        
+        index.keep_newest(2)
+        assert len(view) == 2
+        assert [record.expression for record in view] == ["4", "3"]
+        assert not hasattr(view, 'append')
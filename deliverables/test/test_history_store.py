@@ -0,0 +1,255 @@
+"""
+Test History Store
+Tests for history storage backends.
+"""
+
+import json
+import multiprocessing
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+import src.history_store
+from src.history_store import (JsonHistoryStore, LogHistoryStore, SharedHistoryStore,
+                               COMPACT_MIN_RECORDS)
+from src.history_manager import HistoryManager
+
+
+def make_item(i):
+    """Build a history item for calculation number i."""
+    return {'expression': f"{i} + 1", 'result': str(i + 1)}
+
+
+def append_items(path, writer, count, max_items):
+    """Append count items as one writer process; items are numbered writer * count + i."""
+    store = SharedHistoryStore(path)
+    store.load(max_items)
+    for i in range(count):
+        store.append(make_item(writer * count + i), max_items)
+
+
+class TestHistoryStore:
+    """Test cases for history storage backends."""
+    
+    def setup_method(self):
+        """Setup test fixtures with a temporary directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / 'history.json'
+    
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.temp_dir.cleanup()
+    
+    def read_lines(self):
+        """Return the non-empty lines of the history file."""
+        return [line for line in self.path.read_text(encoding='utf-8').split('\n') if line]
+    
+    def test_log_appends_one_record_per_save(self):
+        """Test saving appends a line instead of rewriting the file."""
+        store = LogHistoryStore(self.path)
+        for i in range(5):
+            store.append(make_item(i), max_items=10)
+        
+        assert [json.loads(line) for line in self.read_lines()] == [make_item(i) for i in range(5)]
+        assert store.load(3) == [make_item(4), make_item(3), make_item(2)]
+    
+    def test_log_compaction(self):
+        """Test the log is compacted to the newest records as it grows."""
+        store = LogHistoryStore(self.path)
+        for i in range(COMPACT_MIN_RECORDS * 3):
+            store.append(make_item(i), max_items=10)
+        
+        assert len(self.read_lines()) <= COMPACT_MIN_RECORDS + 1
+        assert store.load(10) == [make_item(i) for i in range(COMPACT_MIN_RECORDS * 3 - 1, COMPACT_MIN_RECORDS * 3 - 11, -1)]
+    
+    def test_log_loads_newest_across_blocks(self):
+        """Test loading reads backwards across block boundaries."""
+        lines = ''.join(json.dumps(make_item(i)) + '\n' for i in range(20000))
+        self.path.write_text(lines, encoding='utf-8')
+        
+        store = LogHistoryStore(self.path)
+        assert store.load(3) == [make_item(19999), make_item(19998), make_item(19997)]
+        assert len(store.load(20000)) == 20000
+    
+    def test_log_skips_torn_and_invalid_records(self):
+        """Test torn writes and invalid lines are ignored and cleaned up."""
+        self.path.write_text(json.dumps(make_item(1)) + '\n"not an item"\n{"expression": "2 +',
+                             encoding='utf-8')
+        
+        store = LogHistoryStore(self.path)
+        assert store.load(10) == [make_item(1)]
+        
+        store.append(make_item(2), max_items=10)
+        assert store.load(10) == [make_item(2), make_item(1)]
+        assert len(self.read_lines()) == 2
+    
+    def test_log_migrates_legacy_json(self):
+        """Test a JSON array history file is read and rewritten as a log."""
+        self.path.write_text(json.dumps([make_item(2), make_item(1)], indent=2), encoding='utf-8')
+        
+        store = LogHistoryStore(self.path)
+        assert store.load(10) == [make_item(2), make_item(1)]
+        
+        store.append(make_item(3), max_items=10)
+        assert [json.loads(line) for line in self.read_lines()] == [make_item(1), make_item(2), make_item(3)]
+    
+    def test_log_clear(self):
+        """Test clearing empties the log."""
+        store = LogHistoryStore(self.path)
+        store.append(make_item(1), max_items=10)
+        store.clear()
+        assert store.load(10) == []
+        assert not [name for name in os.listdir(self.temp_dir.name) if name.endswith('.tmp')]
+    
+    def test_json_store(self):
+        """Test the JSON array backend keeps the previous file format."""
+        store = JsonHistoryStore(self.path)
+        store.append(make_item(1), max_items=2)
+        store.append(make_item(2), max_items=2)
+        store.append(make_item(3), max_items=2)
+        
+        assert json.loads(self.path.read_text(encoding='utf-8')) == [make_item(3), make_item(2)]
+        assert store.load(10) == [make_item(3), make_item(2)]
+    
+    def test_manager_with_store(self):
+        """Test HistoryManager persists through a given store."""
+        history = HistoryManager(max_items=1000, store=LogHistoryStore(self.path))
+        for i in range(1500):
+            history.save_calculation(f"{i} + 1", str(i + 1))
+        
+        reloaded = HistoryManager(max_items=1000, store=LogHistoryStore(self.path))
+        items = reloaded.get_history_items()
+        assert len(items) == 1000
+        assert items[0] == make_item(1499)
+        assert items[-1] == make_item(500)
+
+
+class TestSharedHistoryStore:
+    """Test cases for the multi-process history log."""
+    
+    def setup_method(self):
+        """Setup test fixtures with a temporary directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / 'history.json'
+    
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.temp_dir.cleanup()
+    
+    def read_items(self):
+        """Return the records in the history file, oldest first; fails on any corrupt line."""
+        return [json.loads(line) for line in self.path.read_text(encoding='utf-8').split('\n') if line]
+    
+    def test_changes_from_other_writers(self):
+        """Test a store sees only the records other stores appended."""
+        first = SharedHistoryStore(self.path)
+        second = SharedHistoryStore(self.path)
+        assert first.load(10) == second.load(10) == []
+        
+        first.append(make_item(1), max_items=10)
+        assert first.changes() == []
+        assert second.changes() == [make_item(1)]
+        assert second.changes() == []
+        
+        second.append(make_item(2), max_items=10)
+        first.append(make_item(3), max_items=10)
+        second.append(make_item(4), max_items=10)
+        assert first.changes() == [make_item(2), make_item(4)]
+        assert second.changes() == [make_item(3)]
+        assert self.read_items() == [make_item(i) for i in range(1, 5)]
+    
+    def test_unchanged_log_is_not_read(self):
+        """Test changes() on an unchanged log is a stat, without locking or reading it."""
+        store = SharedHistoryStore(self.path)
+        store.append(make_item(1), max_items=10)
+        store.load(10)
+        
+        def fail(*args, **kwargs):
+            raise AssertionError("log was read")
+        original = src.history_store.locked
+        src.history_store.locked = fail
+        try:
+            assert store.changes() == []
+        finally:
+            src.history_store.locked = original
+    
+    def test_rewrite_asks_for_reload(self):
+        """Test compaction or clearing by another store makes changes() ask for a reload."""
+        first = SharedHistoryStore(self.path)
+        second = SharedHistoryStore(self.path)
+        for i in range(5):
+            first.append(make_item(i), max_items=10)
+        assert second.load(10)[0] == make_item(4)
+        
+        first.compact(2)
+        assert second.changes() is None
+        assert second.load(10) == [make_item(4), make_item(3)]
+        
+        first.clear()
+        assert second.changes() is None
+        assert second.load(10) == []
+        assert first.changes() == []
+    
+    def test_torn_line_and_legacy_json(self):
+        """Test a torn last line is skipped and a legacy JSON array is migrated on append."""
+        self.path.write_text(json.dumps(make_item(1)) + '\n{"expression": "2 +', encoding='utf-8')
+        store = SharedHistoryStore(self.path)
+        assert store.load(10) == [make_item(1)]
+        store.append(make_item(3), max_items=10)
+        assert SharedHistoryStore(self.path).load(10) == [make_item(3), make_item(1)]
+        
+        self.path.write_text(json.dumps([make_item(2), make_item(1)]), encoding='utf-8')
+        store = SharedHistoryStore(self.path)
+        assert store.load(10) == [make_item(2), make_item(1)]
+        store.append(make_item(3), max_items=10)
+        assert self.read_items() == [make_item(1), make_item(2), make_item(3)]
+    
+    def test_managers_share_history(self):
+        """Test managers on one file see each other's calculations after refresh."""
+        first = HistoryManager(max_items=5, store=SharedHistoryStore(self.path))
+        second = HistoryManager(max_items=5, store=SharedHistoryStore(self.path))
+        first.save_calculation("1 + 1", "2")
+        assert second.refresh()
+        assert second.get_history_items() == [{'expression': "1 + 1", 'result': "2"}]
+        assert not second.refresh()
+        
+        second.save_calculation("2 + 2", "4")
+        first.refresh()
+        assert first.get_history_items() == second.get_history_items()
+        assert [item['result'] for item in first.get_history_items()] == ["4", "2"]
+        
+        # Enough saves to compact the log; the other manager reloads it
+        for i in range(COMPACT_MIN_RECORDS * 2):
+            first.save_calculation(f"{i} + 1", str(i + 1))
+        second.refresh()
+        assert second.get_history_items() == first.get_history_items()
+        assert len(second.get_history_items()) == 5
+    
+    @pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(),
+                        reason="needs fork to run writers in parallel")
+    @pytest.mark.parametrize('max_items', [10000, 20])
+    def test_concurrent_writers(self, max_items):
+        """Test parallel writer processes never lose or corrupt each other's records."""
+        context = multiprocessing.get_context('fork')
+        writers, count = 4, 150
+        processes = [context.Process(target=append_items, args=(self.path, writer, count, max_items))
+                     for writer in range(writers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+            assert process.exitcode == 0
+        
+        items = self.read_items()
+        if max_items >= writers * count:
+            assert sorted(items, key=lambda item: int(item['result'])) == [
+                make_item(i) for i in range(writers * count)]
+        else:
+            # Compacted along the way: whole records only, each writer's in its own order
+            assert len(SharedHistoryStore(self.path).load(max_items)) == max_items
+            for writer in range(writers):
+                numbers = [int(item['result']) - 1 for item in items
+                           if int(item['result']) - 1 in range(writer * count, (writer + 1) * count)]
+                assert numbers == sorted(numbers)
+            assert items[-1] in [make_item((writer + 1) * count - 1) for writer in range(writers)]
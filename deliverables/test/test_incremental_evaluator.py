@@ -0,0 +1,82 @@
+"""
+Test Incremental Evaluator
+Tests for prefix-reusing evaluation of edited expressions.
+"""
+
+import pytest
+from src.calculator_engine import CalculatorEngine
+from src.incremental_evaluator import IncrementalEvaluator, common_prefix_length
+
+
+class TestIncrementalEvaluator:
+    """Test cases for IncrementalEvaluator class."""
+    
+    def setup_method(self):
+        """Setup test fixtures."""
+        self.engine = CalculatorEngine()
+        self.evaluator = IncrementalEvaluator(self.engine)
+    
+    def type_text(self, text):
+        """Type text one character at a time, returning the result after each key."""
+        return [self.evaluator.evaluate(text[:i], i) for i in range(1, len(text) + 1)]
+    
+    def test_results_match_engine(self):
+        """Test results match evaluate_expression for a range of expressions."""
+        expressions = ["2 + 3", "5 / 0", "1 / 100000000000", "1 / 3", "2(3+4)", "(2)(3)",
+                       "2..5 * 2", "2 + + 3", "(1", "007", "2.(3)", "-(-2)", "2---3",
+                       "2*+3", "(2)3", "(2).5", "10-4-3", "-2*3+1", "1 2 + 3", "", "   ",
+                       "0.1+0.2-0.3", "0.000000015*1"]
+        for expression in expressions:
+            expected = self.engine.evaluate_expression(expression)
+            assert IncrementalEvaluator(self.engine).evaluate(expression) == expected
+    
+    def test_exact_arithmetic_matches_engine(self):
+        """Test exact mode results, including ones whose float evaluation overflows or rounds."""
+        engine = CalculatorEngine(arithmetic='exact')
+        big = '9' * 320
+        for expression in [f"{big}/{big}", f"({big}0/1)", "2/-(" + big + ")", "1.005*1000",
+                           "0.1+0.2-0.3", "3*" + '1' + '0' * 40, "5/0", "1/"]:
+            expected = engine.evaluate_expression(expression)
+            assert IncrementalEvaluator(engine).evaluate(expression) == expected, expression
+        
+        # The overflowing prefix is reused, not treated as an error, while typing on
+        evaluator = IncrementalEvaluator(engine)
+        evaluator.evaluate(f"{big}/{big}")
+        assert evaluator.evaluate(f"{big}/{big}+1") == "2"
+    
+    def test_typing_matches_engine(self):
+        """Test each keystroke's result matches a full evaluation."""
+        text = "12.5*(3+4)/7-2(8+1)"
+        results = self.type_text(text)
+        assert results == [self.engine.evaluate_expression(text[:i]) for i in range(1, len(text) + 1)]
+    
+    def test_typing_cost_is_flat(self):
+        """Test appending at the end only rescans the last token."""
+        text = "1+2*" * 200 + "3"
+        self.type_text(text)
+        assert self.evaluator.chars_scanned <= 2
+    
+    def test_edit_in_middle(self):
+        """Test editing before the end rescans from the edit position."""
+        text = "1+2+3+4+5"
+        self.type_text(text)
+        assert self.evaluator.evaluate("1+2*3+4+5", 4) == "16"
+        assert self.evaluator.chars_scanned < len(text)
+    
+    def test_error_then_fix(self):
+        """Test an error is kept while typing past it and cleared by editing before it."""
+        self.type_text("8/0+1")
+        assert self.evaluator.evaluate("8/0+1") == "?"
+        assert self.evaluator.evaluate("8/4+1", 3) == "3"
+    
+    def test_stale_cursor_hint(self):
+        """Test a wrong cursor hint still gives the correct result."""
+        self.type_text("1+2+3")
+        assert self.evaluator.evaluate("9+2+3", 5) == "14"
+    
+    def test_common_prefix_length(self):
+        """Test common prefix detection with and without a hint."""
+        assert common_prefix_length("1+2+3", "1+2*3") == 3
+        assert common_prefix_length("1+2+3", "1+2*3", hint=2) == 2
+        assert common_prefix_length("1+2+3", "1+2*3", hint=4) == 3
+        assert common_prefix_length("", "1") == 0
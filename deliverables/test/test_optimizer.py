@@ -0,0 +1,167 @@
+"""
+Test Optimizer
+Tests for constant folding, common subexpression elimination and identity simplification.
+"""
+
+import random
+from fractions import Fraction
+
+import pytest
+from src.calculator_engine import CalculatorEngine
+from src.optimizer import optimize_program
+from src.stack_machine import (ADD, LOAD_CONST, LOAD_TEMP, MUL, STORE_TEMP, Program,
+                              compile_program)
+
+
+# 1e308 written out; products of two overflow to inf
+HUGE = '1' + '0' * 308 + '.0'
+
+
+def _outcome(program, exact=False):
+    """Result of running program, as repr so -0.0 and 0.0 differ, or the exception type."""
+    try:
+        return repr(program.evaluate(exact))
+    except ArithmeticError as e:
+        return type(e).__name__
+
+
+def _random_expression(rng, depth):
+    """Random expression over a few awkward literals, all operators and parentheses."""
+    if depth == 0 or rng.random() < 0.25:
+        return rng.choice(['0', '1', '2', '0.0', '0.1', '3.5', HUGE, '7', '(1/0)'])
+    choice = rng.random()
+    if choice < 0.15:
+        return rng.choice('+-') + _random_expression(rng, depth - 1)
+    if choice < 0.3:
+        return '(' + _random_expression(rng, depth - 1) + ')'
+    return _random_expression(rng, depth - 1) + rng.choice('+-*/') + _random_expression(rng, depth - 1)
+
+
+class TestOptimizer:
+    """Test cases for the optimizer pass."""
+    
+    def test_folds_repeated_subexpressions(self):
+        """Test a literal expression folds to one constant and reports the instructions removed."""
+        program = compile_program("(1.5+2.25)*(1.5+2.25)/(1.5+2.25)")
+        optimized, removed = optimize_program(program)
+        assert optimized.code == ((LOAD_CONST, 0),)
+        assert optimized.constants == (3.75,)
+        assert removed == len(program) - 1 == 10
+        assert optimized.evaluate() == program.evaluate()
+    
+    def test_nothing_to_remove(self):
+        """Test a program that can't shrink is returned unchanged."""
+        program = compile_program("42")
+        assert optimize_program(program) == (program, 0)
+    
+    def test_errors_are_not_folded(self):
+        """Test operations that raise stay in the code and raise when run."""
+        optimized, removed = optimize_program(compile_program("5/(1-1)"))
+        assert removed == 2
+        assert len(optimized) == 3
+        with pytest.raises(ZeroDivisionError):
+            optimized.evaluate()
+    
+    def test_safe_identities(self):
+        """Test identities that hold for every int and float are removed."""
+        plain = compile_program("1/0")
+        for expression in ["(1/0)*1", "1*(1/0)", "(1/0)-0", "+(1/0)", "-(-(1/0))"]:
+            program = compile_program(expression)
+            optimized, removed = optimize_program(program)
+            assert optimized.code == plain.code, expression
+            assert removed == len(program) - len(plain)
+    
+    def test_unsafe_identities_kept(self):
+        """Test identities that could change a sign, type or NaN are left alone."""
+        for expression in ["(1/0)+0", "0+(1/0)", "(1/0)/1", "(1/0)*0", "(1/0)*1.0", "(1/0)-0.0"]:
+            program = compile_program(expression)
+            assert optimize_program(program) == (program, 0), expression
+    
+    def test_signed_zero_constants_kept_apart(self):
+        """Test 0.0 and -0.0 (and 1 and 1.0) aren't merged as equal constants."""
+        for expression in ["0.0 - -0.0", "-0.0 - 0", "1.0*1", "(-0.0)*1"]:
+            program = compile_program(expression)
+            assert _outcome(optimize_program(program)[0]) == _outcome(program), expression
+    
+    def test_common_subexpressions_use_temps(self):
+        """Test a repeated subexpression is computed once and reloaded from a temporary slot."""
+        program = compile_program("((1/0)+(1/0))*((1/0)+(1/0))")
+        optimized, removed = optimize_program(program)
+        assert optimized.temps > 0
+        assert (LOAD_TEMP, 0) in optimized.code
+        assert removed == len(program) - len(optimized) > 0
+        with pytest.raises(ZeroDivisionError):
+            optimized.evaluate()
+        optimized.promote()
+        with pytest.raises(ZeroDivisionError):
+            optimized.evaluate()
+    
+    def test_temp_slots(self):
+        """Test interpreted and generated code agree on programs using temporary slots."""
+        program = Program([(LOAD_CONST, 0), (LOAD_CONST, 1), (ADD, None), (STORE_TEMP, 0),
+                           (LOAD_TEMP, 0), (MUL, None), (LOAD_CONST, 0), (ADD, None)], [2, 3], temps=1)
+        assert program.evaluate() == 27
+        assert program.promote()
+        assert program.evaluate() == 27
+        assert program.compiled_runs == 1
+    
+    def test_exact_runs_use_source(self):
+        """Test exact evaluation of an optimized program is not affected by folded floats."""
+        program = compile_program("0.1 + 0.2")
+        optimized, _ = optimize_program(program)
+        assert optimized.source is program
+        assert optimized.evaluate() == 0.1 + 0.2
+        assert optimized.evaluate(exact=True) == Fraction(3, 10)
+    
+    def test_results_bit_identical(self):
+        """Test optimized programs give the same float result or error as the originals."""
+        rng = random.Random(1234)
+        checked = 0
+        while checked < 2000:
+            try:
+                program = compile_program(_random_expression(rng, 5))
+            except ValueError:
+                continue  # Operator runs the tokenizer rejects, e.g. "1*--2"
+            checked += 1
+            optimized, removed = optimize_program(program)
+            assert removed == len(program) - len(optimized) >= 0
+            assert _outcome(optimized) == _outcome(program)
+    
+    def test_deep_nesting(self):
+        """Test the pass doesn't recurse on deeply nested or very long expressions."""
+        depth = 50000
+        optimized, removed = optimize_program(compile_program('(' * depth + '-1' + ')' * depth))
+        assert optimized.evaluate() == -1 and removed == 1
+        optimized, removed = optimize_program(compile_program('1+' * depth + '1'))
+        assert optimized.evaluate() == depth + 1 and removed == 2 * depth
+    
+    def test_engine_optimize(self):
+        """Test the engine's optimize option gives the same results and counts removed instructions."""
+        expressions = ["(1.5+2.25)*(1.5+2.25)/(1.5+2.25)", "5.3 / 0.1", "0.1+0.2-0.3",
+                       "5/(1-1)", "2(3+4)", "1/3", "-(-(7))", HUGE + "*10"]
+        plain = CalculatorEngine()
+        engine = CalculatorEngine(optimize=True)
+        for expression in expressions:
+            assert engine.evaluate_expression(expression) == plain.evaluate_expression(expression)
+        assert engine.cache_info()['nodes_removed'] > 0
+        assert plain.cache_info()['nodes_removed'] == 0
+        
+        # Cached optimized programs are reused when formatting settings change
+        engine.max_decimal_places = plain.max_decimal_places = 3
+        for expression in expressions:
+            assert engine.evaluate_expression(expression) == plain.evaluate_expression(expression)
+        
+        engine.clear_cache()
+        assert engine.cache_info()['nodes_removed'] == 0
+    
+    def test_engine_metrics_stage(self):
+        """Test the optimize stage is timed when the optimizer is enabled."""
+        engine = CalculatorEngine(optimize=True)
+        engine.enable_metrics()
+        engine.evaluate_expression("1+2*3")
+        assert engine.metrics_snapshot()['stages']['optimize']['count'] == 1
+        
+        engine = CalculatorEngine()
+        engine.enable_metrics()
+        engine.evaluate_expression("1+2*3")
+        assert engine.metrics_snapshot()['stages']['optimize']['count'] == 0
@@ -0,0 +1,116 @@
+"""
+Test Recall Dialog
+Tests for the lazily populated, searchable Recall list.
+"""
+
+import os
+import time
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+pytest.importorskip('PyQt6')
+pytest.importorskip('pytestqt')
+
+from PyQt6.QtCore import Qt
+from src.history_manager import HistoryManager
+from src.history_store import LogHistoryStore
+from src.recall_dialog import HistoryListModel, RecallDialog
+
+
+@pytest.fixture
+def make_history(tmp_path):
+    """Build a HistoryManager that saved (expression, result) pairs in order, the last one most recent."""
+    def make(pairs):
+        pairs = list(pairs)
+        history = HistoryManager(max_items=max(len(pairs), 1),
+                                 store=LogHistoryStore(tmp_path / 'history.log'))
+        for expression, result in pairs:
+            history.save_calculation(expression, result)
+        return history
+    return make
+
+
+class TestRecallDialog:
+    """Test cases for HistoryListModel and RecallDialog."""
+    
+    def test_model_fetches_in_batches(self, qtbot, make_history):
+        """Test the model exposes rows a batch at a time, most recent first."""
+        history = make_history((str(i), str(i)) for i in range(1000))
+        model = HistoryListModel(history)
+        assert model.rowCount() == HistoryListModel.BATCH_SIZE
+        assert model.canFetchMore()
+        model.fetchMore()
+        assert model.rowCount() == 2 * HistoryListModel.BATCH_SIZE
+        while model.canFetchMore():
+            model.fetchMore()
+        assert model.rowCount() == 1000
+        assert model.data(model.index(0)) == "999 = 999"
+        assert model.data(model.index(999), Qt.ItemDataRole.UserRole) == 999
+    
+    def test_filter(self, qtbot, make_history):
+        """Test filtering shows matching items and clearing it shows all again."""
+        history = make_history([("2 + 3", "5"), ("6 * 7", "42"), ("40 + 2", "42")])
+        model = HistoryListModel(history)
+        model.set_filter("42")
+        assert [model.data(model.index(row)) for row in range(model.rowCount())] == ["40 + 2 = 42", "6 * 7 = 42"]
+        model.set_filter("4", prefix=True)
+        assert model.rowCount() == 2
+        model.set_filter("")
+        assert model.rowCount() == 3
+    
+    def test_duplicate_displays_select_by_index(self, qtbot, make_history):
+        """Test items with the same display text are told apart by row."""
+        long_prefix = "1 + " * 10
+        history = make_history([(long_prefix + "1", "11"), (long_prefix + "2", "11")])
+        dialog = RecallDialog(history)
+        qtbot.addWidget(dialog)
+        model = dialog.model
+        assert model.data(model.index(0)) == model.data(model.index(1))
+        
+        dialog.list_view.setCurrentIndex(model.index(1))
+        assert dialog.selected_item()['expression'] == long_prefix + "1"
+        dialog.list_view.setCurrentIndex(model.index(0))
+        assert dialog.selected_item()['expression'] == long_prefix + "2"
+    
+    def test_search_selects_first_match(self, qtbot, make_history):
+        """Test typing in the search field filters and selects the newest match."""
+        history = make_history([("2 + 3", "5"), ("6 * 7", "42"), ("9 - 4", "5")])
+        dialog = RecallDialog(history)
+        qtbot.addWidget(dialog)
+        qtbot.keyClicks(dialog.search_field, "7")
+        assert dialog.model.rowCount() == 1
+        assert dialog.selected_item() == {'expression': "6 * 7", 'result': "42"}
+        
+        dialog.search_field.setText("nothing")
+        assert dialog.selected_item() is None
+    
+    def test_large_history_opens_fast(self, qtbot, make_history):
+        """Test opening and searching 100k saved calculations stays interactive."""
+        history = make_history((f"{i} * 3", str(i * 3)) for i in range(100000))
+        start = time.perf_counter()
+        dialog = RecallDialog(history)
+        qtbot.addWidget(dialog)
+        dialog.show()
+        qtbot.waitExposed(dialog)
+        dialog.search_field.setText("9999")
+        elapsed = time.perf_counter() - start
+        
+        assert dialog.model.rowCount() <= HistoryListModel.BATCH_SIZE
+        assert dialog.selected_item()['expression'].startswith("9999")
+        assert elapsed < 1.0
+    
+    def test_calculator_recall(self, qtbot, monkeypatch, make_history):
+        """Test choosing an item in the Recall dialog loads its expression."""
+        from src import calculator_app
+        
+        window = calculator_app.CalculatorApp()
+        qtbot.addWidget(window)
+        window.history = make_history([("1 + 1", "2"), ("8 / 2", "4")])
+        # Patch the class calculator_app actually uses (it imports the top-level
+        # module when Recall is opened), so the dialog accepts instead of blocking in a modal loop
+        from recall_dialog import RecallDialog as dialog_class
+        monkeypatch.setattr(dialog_class, 'exec', lambda dialog: dialog_class.DialogCode.Accepted)
+        
+        window.show_recall_menu()
+        assert window.input_field.text() == "8 / 2"
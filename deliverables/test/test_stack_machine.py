@@ -0,0 +1,169 @@
+"""
+Test Stack Machine
+Tests for the postfix compiler, non-recursive stack machine and generated-code tier.
+"""
+
+from fractions import Fraction
+
+import pytest
+from src.stack_machine import (ADD, CODEGEN_MAX_INSTRUCTIONS, LOAD_CONST, MUL, NEG,
+                              compile_program, generate_source)
+from src.calculator_engine import CalculatorEngine
+
+
+class TestStackMachine:
+    """Test cases for program compilation and execution."""
+    
+    def test_compiles_to_postfix(self):
+        """Test precedence and unary operators produce postfix order."""
+        program = compile_program("-2+3*4")
+        assert program.code == ((LOAD_CONST, 0), (NEG, None), (LOAD_CONST, 1),
+                                (LOAD_CONST, 2), (MUL, None), (ADD, None))
+        assert program.constants == (2, 3, 4)
+    
+    def test_evaluate_matches_python(self):
+        """Test results match Python arithmetic on the same expression."""
+        for expression in ["2+3*4", "-(2+3)", "10-4-3", "8/4/2", "-2*3", "1.5+.5", "--3", "(1+2)*(3-4)/5"]:
+            assert compile_program(expression).evaluate() == eval(expression)
+    
+    def test_implicit_multiplication(self):
+        """Test tokenizer-inserted multiplication compiles like an explicit one."""
+        assert compile_program("2(3+4)").evaluate() == 14
+        assert compile_program("(2)(3)4").evaluate() == 24
+    
+    def test_exact_evaluation(self):
+        """Test exact runs load float literals as decimal fractions."""
+        program = compile_program("0.1 + 0.2")
+        assert program.evaluate() == 0.1 + 0.2
+        assert program.evaluate(exact=True) == Fraction(3, 10)
+    
+    def test_program_is_reusable(self):
+        """Test a compiled program can be run repeatedly with the same result."""
+        program = compile_program("7/2 - 1")
+        assert [program.evaluate() for _ in range(3)] == [2.5, 2.5, 2.5]
+        assert program.evaluate(exact=True) == program.evaluate(exact=True) == Fraction(5, 2)
+    
+    def test_variables(self):
+        """Test variables are constant slots bound at run time, in both tiers and modes."""
+        program = compile_program("base*(1+rate)", names=True)
+        assert program.names == {'base', 'rate'}
+        assert program.evaluate(values={'base': 100, 'rate': 0.5}) == 150
+        assert program.evaluate(exact=True, values={'base': 100, 'rate': 0.07}) == 107
+        assert program.evaluate(values={'base': 100, 'rate': Fraction(1, 4)}) == 125.0
+        program.promote()
+        assert program.evaluate(values={'base': 2, 'rate': 1}) == 4
+        with pytest.raises(NameError):
+            program.evaluate(values={'base': 2})
+        with pytest.raises(ValueError):
+            compile_program("base*2")
+    
+    def test_compile_errors(self):
+        """Test malformed expressions raise ValueError."""
+        for expression in ["2 +", "* 3", "(2 + 3", "2 + 3)", "1.2.3", "007", ".", "()", ""]:
+            with pytest.raises(ValueError):
+                compile_program(expression)
+    
+    def test_division_by_zero(self):
+        """Test division by zero raises ZeroDivisionError in both modes."""
+        program = compile_program("1/(2-2)")
+        with pytest.raises(ZeroDivisionError):
+            program.evaluate()
+        with pytest.raises(ZeroDivisionError):
+            program.evaluate(exact=True)
+    
+    def test_deep_nesting(self):
+        """Test nesting far beyond the recursion limit compiles and evaluates."""
+        depth = 100000
+        program = compile_program("(" * depth + "1" + "+1)" * depth)
+        assert program.evaluate() == depth + 1
+        assert compile_program("(-" * depth + "2" + ")" * depth).evaluate() == 2
+    
+    def test_engine_deep_nesting(self):
+        """Test the default engine evaluates deeply nested expressions."""
+        engine = CalculatorEngine()
+        assert engine.evaluate_expression("(" * 5000 + "2" + ")" * 5000 + "/4") == "0.5"
+    
+    def test_engine_backends_agree(self):
+        """Test the stack backend matches the ast backend in every arithmetic mode."""
+        expressions = ["2 + 3", "5 / 0", "1 / 100000000000", "1 / 3", "2(3+4)", "(2)(3)",
+                       "2..5 * 2", "2 + + 3", "(1", "007", "2.(3)", "", "-(-2)", "0.1 + 0.2",
+                       "1.005 * 1000 / 1000", "2 ** 3"]
+        for arithmetic in CalculatorEngine.ARITHMETIC_MODES:
+            reference = CalculatorEngine(backend='ast', arithmetic=arithmetic)
+            candidate = CalculatorEngine(backend='stack', arithmetic=arithmetic)
+            for expression in expressions:
+                assert candidate.evaluate_expression(expression) == reference.evaluate_expression(expression)
+    
+    def test_generated_source_is_flat(self):
+        """Test generated code has one statement per operation and no nesting."""
+        source = generate_source(compile_program("(" * 500 + "2" + "*3)" * 500).code)
+        assert len(source.splitlines()) == 503
+        assert "(" not in source.split("\n", 1)[1]
+    
+    def test_promoted_program_matches_interpreter(self):
+        """Test generated functions give the same values and errors as the interpreter."""
+        for expression in ["2+3*4", "-(2+3)", "10-4-3", "8/4/2", "--3", "0.1+0.2", "7", "2(3)(4)"]:
+            interpreted = compile_program(expression)
+            compiled = compile_program(expression)
+            assert compiled.promote()
+            assert compiled.tier == 'compiled'
+            assert compiled.evaluate() == interpreted.evaluate()
+            assert compiled.evaluate(exact=True) == interpreted.evaluate(exact=True)
+        
+        program = compile_program("1/(2-2)")
+        program.promote()
+        with pytest.raises(ZeroDivisionError):
+            program.evaluate()
+    
+    def test_large_programs_stay_interpreted(self):
+        """Test programs over the codegen limit are not promoted."""
+        program = compile_program("+".join(["1"] * (CODEGEN_MAX_INSTRUCTIONS // 2 + 1)))
+        assert not program.promote()
+        assert program.tier == 'interpreted'
+    
+    def test_engine_promotes_hot_shapes(self):
+        """Test expressions sharing a hot shape run as generated code on cache misses."""
+        engine = CalculatorEngine()
+        engine.tier_threshold = 3
+        
+        engine.evaluate_expression("2 * 3.5")
+        engine.evaluate_expression("2*3.5")  # Cached result: no code runs
+        assert engine.tier_info("2*3.5") == {'tier': 'interpreted', 'hits': 1, 'interpreted_runs': 1,
+                                             'compiled_runs': 0, 'instructions': 3}
+        engine.evaluate_expression("4 * 1.25")
+        engine.evaluate_expression("6 * 7")  # Third evaluation of the shape promotes it
+        assert engine.tier_info("6*7")['tier'] == 'compiled'
+        assert engine.cache_info()['compiled_shapes'] == 1
+        
+        # New expressions of the same shape run compiled from their first evaluation
+        for i in range(100):
+            assert engine.evaluate_expression(f"{i} * 1.5") == engine.evaluate_expression(f"{i} * 3 / 2")
+        info = engine.tier_info("99 * 1.5")
+        assert info['tier'] == 'compiled'
+        assert info['compiled_runs'] == 1 and info['interpreted_runs'] == 0
+        
+        # Settings changes re-run cached programs, on the compiled tier once promoted
+        engine.max_decimal_places = 0
+        assert engine.evaluate_expression("2*3.5") == "7"
+        assert engine.tier_info("2*3.5")['compiled_runs'] == 1
+        assert engine.tier_info("1+") is None
+    
+    def test_engine_promotes_without_result_cache(self):
+        """Test repeated evaluation promotes an expression even with the result cache disabled."""
+        engine = CalculatorEngine(cache_size=0)
+        plain = CalculatorEngine(cache_size=0)
+        plain.tier_threshold = 0
+        for _ in range(100):
+            assert engine.evaluate_expression("1.5*(2+3)") == "7.5"
+        assert engine.cache_info()['compiled_shapes'] == 1
+        assert plain.evaluate_expression("1.5*(2+3)") == "7.5"
+        assert plain.cache_info()['compiled_shapes'] == 0
+    
+    def test_engine_tier_semantics(self):
+        """Test compiled expressions keep division-by-zero and Too Small results."""
+        engine = CalculatorEngine()
+        engine.tier_threshold = 1
+        assert engine.evaluate_expression("5/(1-1)") == "?"
+        assert engine.evaluate_expression("1/1000000000") == "Too Small"
+        assert engine.tier_info("5/(1-1)")['tier'] == 'compiled'
+        assert engine.tier_info("1/1000000000")['interpreted_runs'] == 0
@@ -0,0 +1,47 @@
+"""
+Test Startup
+Import-time budget and lazy-import checks for the Qt-free modules, and the GUI's time to first frame.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / 'benchmarks'))
+from bench_gui_startup import measure_first_frame
+from bench_startup import measure_import
+
+
+# Ceilings on cumulative import time, with headroom for a loaded machine;
+# typical values are around 13 ms for the engine, which is mostly re and
+# typing, and 20 ms for history_manager, which also loads pathlib and json
+IMPORT_BUDGETS_MS = {'calculator_engine': 25, 'stream_evaluator': 25, 'history_manager': 35}
+
+# Generous ceiling on time to the window's first frame under the offscreen
+# platform, from interpreter start; typical values are around 100-150 ms
+FIRST_FRAME_BUDGET_MS = 600
+
+# Modules that must only load on the paths that need them
+DEFERRED_MODULES = {'PyQt6', 'ast', 'fractions', 'decimal', 'tempfile', 'numpy', 'calculator_app'}
+
+
+class TestStartup:
+    """Test cases for cold-start import cost."""
+    
+    @pytest.mark.parametrize('module', sorted(IMPORT_BUDGETS_MS))
+    def test_import_budget(self, module):
+        """Test modules import within budget and without deferred dependencies."""
+        result = measure_import(module, runs=3)
+        
+        loaded = {name.split('.')[0] for name in result['loaded']}
+        assert not loaded & DEFERRED_MODULES
+        assert result['microseconds'] / 1000 < IMPORT_BUDGETS_MS[module]
+    
+    def test_first_frame_budget(self):
+        """Test the calculator window paints its first frame within budget, before reading history."""
+        pytest.importorskip('PyQt6')
+        result = measure_first_frame(runs=2)
+        
+        assert not result['history_loaded_at_first_frame']
+        assert result['first_frame'] < FIRST_FRAME_BUDGET_MS
@@ -0,0 +1,95 @@
+"""
+Test Stream Evaluator
+Tests for the headless streaming evaluation mode.
+"""
+
+import io
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+from src.stream_evaluator import read_expressions, evaluate_stream, write_results, run_headless
+
+
+SRC_DIR = Path(__file__).parent.parent / 'src'
+
+
+class TestStreamEvaluator:
+    """Test cases for headless stream evaluation."""
+    
+    def setup_method(self):
+        """Setup test fixtures with temporary input file."""
+        self.temp_file = tempfile.NamedTemporaryFile('w', delete=False, suffix='.txt')
+        self.temp_file.write("2 + 3\n\n5 / 0\r\n1 / 100000000000\n(2)(3)")
+        self.temp_file.close()
+    
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.temp_file.name):
+            os.unlink(self.temp_file.name)
+    
+    def test_read_expressions(self):
+        """Test blank lines are skipped and line endings removed."""
+        lines = ["1+1\n", "\n", "   \n", "2*3\r\n", "4"]
+        assert list(read_expressions(lines)) == ["1+1", "2*3", "4"]
+    
+    def test_evaluate_stream_is_lazy(self):
+        """Test expressions are evaluated only as results are consumed."""
+        def expressions():
+            yield "2 + 3"
+            raise AssertionError("Stream consumed too eagerly")
+        
+        results = evaluate_stream(expressions())
+        assert next(results) == ("2 + 3", "5")
+    
+    def test_write_results(self):
+        """Test tab-separated output format."""
+        out = io.StringIO()
+        count = write_results([("2 + 3", "5"), ("5 / 0", "?")], out)
+        assert count == 2
+        assert out.getvalue() == "2 + 3\t5\n5 / 0\t?\n"
+    
+    def test_run_headless_file(self):
+        """Test evaluating expressions from a file."""
+        out = io.StringIO()
+        count = run_headless(self.temp_file.name, out)
+        
+        assert count == 4
+        assert out.getvalue().splitlines() == [
+            "2 + 3\t5",
+            "5 / 0\t?",
+            "1 / 100000000000\tToo Small",
+            "(2)(3)\t6",
+        ]
+    
+    def test_main_eval_stdin_without_qt(self):
+        """Test main.py --eval - reads stdin and never imports PyQt6."""
+        script = (
+            "import sys, main\n"
+            "code = main.main(['--eval', '-'])\n"
+            "assert not any(m.startswith('PyQt6') for m in sys.modules), 'PyQt6 imported'\n"
+            "sys.exit(code)\n"
+        )
+        completed = subprocess.run(
+            [sys.executable, '-c', script], input="2 * 3\n7 / 2\n",
+            capture_output=True, text=True, cwd=SRC_DIR, timeout=60
+        )
+        
+        assert completed.returncode == 0, completed.stderr
+        assert completed.stdout == "2 * 3\t6\n7 / 2\t3.5\n"
+    
+    def test_main_eval_missing_file(self):
+        """Test main.py --eval reports a missing source file without a traceback."""
+        missing = os.path.join(tempfile.gettempdir(), 'no_such_expressions.txt')
+        completed = subprocess.run(
+            [sys.executable, '-c', f"import sys, main\nsys.exit(main.main(['--eval', {missing!r}]))\n"],
+            capture_output=True, text=True, cwd=SRC_DIR, timeout=60
+        )
+        
+        assert completed.returncode == 1
+        assert completed.stdout == ""
+        assert "No such file or directory" in completed.stderr
+        assert "Traceback" not in completed.stderr
@@ -0,0 +1,76 @@
+"""
+Test Vectorized Evaluator
+Tests for shape-grouped NumPy batch evaluation.
+"""
+
+import pytest
+from src.calculator_engine import CalculatorEngine
+
+np = pytest.importorskip("numpy")
+from src.vectorized_evaluator import (VECTORIZE_THRESHOLD, evaluate_vectorized,
+                                      expression_template, template_shape)
+
+
+class TestVectorizedEvaluator:
+    """Test cases for vectorized batch evaluation."""
+    
+    def setup_method(self):
+        """Setup test fixtures."""
+        self.engine = CalculatorEngine()
+    
+    def expected(self, expressions):
+        """Results of evaluating each expression individually."""
+        return [self.engine.evaluate_expression(e) for e in expressions]
+    
+    def test_template_shares_shape(self):
+        """Test expressions differing only in constants share a template."""
+        assert expression_template("12*(3+4.5)") == ("9*(9+9.9)", ['12', '3', '4.5'])
+        assert expression_template("7 * (1+0.25)")[0] == "9*(9+9.9)"
+        assert expression_template("007+1")[0] is None
+        assert expression_template("1..5+1")[0] is None
+    
+    def test_shape_ignores_redundant_parentheses(self):
+        """Test templates that parse to the same tree share a shape."""
+        assert template_shape("(9)+9") == template_shape("9+9")
+        assert template_shape("9+9") != template_shape("9+9.9")
+    
+    def test_matches_engine(self):
+        """Test a mixed batch matches single evaluation in order."""
+        rows = VECTORIZE_THRESHOLD * 2
+        expressions = [f"{i}.5*({i}+2)/{i % 5}" for i in range(rows)]
+        expressions += [f"1/{10 ** (i % 12)}" for i in range(rows)]
+        expressions += ["2 + 3", "2 + + 3", "(1", "", "007", "2..5*2", "(2)(3)"]
+        assert evaluate_vectorized(expressions, self.engine) == self.expected(expressions)
+    
+    def test_division_by_zero_per_row(self):
+        """Test only rows dividing by zero become '?'."""
+        expressions = [f"6/{i % 3}" for i in range(VECTORIZE_THRESHOLD * 3)]
+        results = evaluate_vectorized(expressions, self.engine)
+        assert results == self.expected(expressions)
+        assert results[:3] == ["?", "6", "3"]
+    
+    def test_too_small_per_row(self):
+        """Test only rows below min_representable become 'Too Small'."""
+        expressions = [f"1/{10 ** (i % 10)}" for i in range(VECTORIZE_THRESHOLD * 2)]
+        results = evaluate_vectorized(expressions, self.engine)
+        assert results == self.expected(expressions)
+        assert "Too Small" in results and "0.00000001" in results
+    
+    def test_large_integers_stay_exact(self):
+        """Test integer arithmetic beyond float64 precision matches Python ints."""
+        expressions = [f"{10 ** 17 + i}*3-{i}" for i in range(VECTORIZE_THRESHOLD * 2)]
+        assert evaluate_vectorized(expressions, self.engine) == self.expected(expressions)
+    
+    def test_respects_engine_settings(self):
+        """Test formatting follows the engine's decimal places."""
+        self.engine.max_decimal_places = 3
+        expressions = [f"1/{i + 3}" for i in range(VECTORIZE_THRESHOLD * 2)]
+        assert evaluate_vectorized(expressions, self.engine) == self.expected(expressions)
+    
+    def test_adaptive_rows_match_engine(self):
+        """Test rows near a rounding boundary get the engine's exact result."""
+        expressions = [f"0.{i:09d}5*1" for i in range(VECTORIZE_THRESHOLD * 2)]
+        expressions += ["0.1+0.2-0.3"] * VECTORIZE_THRESHOLD
+        results = evaluate_vectorized(expressions, self.engine)
+        assert results == self.expected(expressions)
+        assert results[-1] == "0"